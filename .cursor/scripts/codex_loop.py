@@ -10,13 +10,27 @@ codex_loop.py (v2)
 from __future__ import annotations
 
 import argparse
+import ast
+import codecs
+import contextlib
 import hashlib
+import heapq
 import json
+import os
 import re
+import shlex
+import signal
+import stat
 import subprocess
-from dataclasses import dataclass
+import sys
+import threading
+import time
+import xml.etree.ElementTree as ET
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Optional, Tuple, Dict, List
+from typing import BinaryIO, Callable, Deque, Iterable, Optional, Set, TextIO, Tuple, Dict, List, Union
 
 
 # -------------------------
@@ -35,6 +49,11 @@ def tail(s: str, n: int = 4000) -> str:
     return s[-n:]
 
 
+def shell_quote(arg: str) -> str:
+    """Quote one argument for the shell run_shell / run_streamed use (cmd.exe on Windows)."""
+    return subprocess.list2cmdline([arg]) if os.name == "nt" else shlex.quote(arg)
+
+
 def run_shell(cmd: str, cwd: Path, *, timeout: int = 1800) -> "CmdResult":
     """Run a shell command; never raises FileNotFoundError (converted to exit=127)."""
     try:
@@ -79,6 +98,241 @@ def run_args(
         return CmdResult(1, "", f"EXCEPTION: {e}")
 
 
+# Characters of each stream kept in memory; the full output goes to the log file.
+STREAM_TAIL_CHARS = 16000
+# A "line" longer than this (e.g. a progress bar without newlines) is split.
+_STREAM_MAX_LINE = 65536
+_STREAM_CHUNK = 65536
+# Substrings the classifiers test for anywhere in the output. The tails alone could
+# miss them, so the capture records which of them occurred.
+CLASSIFY_MARKERS = (
+    "command not found",
+    "timeout",
+    "approval",
+    "required",
+    "needs",
+    "sandbox",
+    "denied",
+    "not allowed",
+    "permission denied",
+    "eacces",
+    "operation not permitted",
+    "--cov",
+    "unknown option",
+    "unrecognized arguments",
+    "node",
+)
+_COV_TOTAL_RE = re.compile(r"\bTOTAL\b.*\d%")
+# pytest report sections kept in full (up to FAILURE_SECTION_CHARS) for the digest,
+# wherever they fall in the output
+FAILURE_SECTIONS = ("FAILURES", "ERRORS", "short test summary info")
+FAILURE_SECTION_CHARS = 200000
+_PYTEST_SECTION_RE = re.compile(r"^={3,} (.+?) ={3,}\s*$")
+
+
+class StreamCapture:
+    """
+    Consumes one output stream line by line with constant memory:
+    - appends every line to a log file
+    - optionally echoes it live to the terminal
+    - keeps a tail ring buffer, the rolling key lines, classification markers and
+      the last coverage TOTAL line
+    """
+
+    def __init__(
+        self,
+        log_path: Optional[Path] = None,
+        echo: Optional[TextIO] = None,
+        tail_chars: int = STREAM_TAIL_CHARS,
+    ) -> None:
+        self._log = open(log_path, "w", encoding="utf-8") if log_path else None
+        self._echo = echo
+        self._tail: Deque[str] = deque()
+        self._tail_len = 0
+        self._tail_chars = tail_chars
+        self.keys = KeyLineExtractor()
+        self.markers: Set[str] = set()
+        self.total_line = ""
+        self._sections: List[str] = []
+        self._sections_len = 0
+        self._in_section = False
+
+    def feed(self, line: str) -> None:
+        if self._log is not None:
+            self._log.write(line)
+        if self._echo is not None:
+            with _ECHO_LOCK:
+                self._echo.write(line)
+                self._echo.flush()
+        self._tail.append(line)
+        self._tail_len += len(line)
+        while self._tail_len > self._tail_chars and len(self._tail) > 1:
+            self._tail_len -= len(self._tail.popleft())
+        plain = strip_ansi(line)
+        self.keys.feed(plain)
+        low = plain.lower()
+        for m in CLASSIFY_MARKERS:
+            if m in low:
+                self.markers.add(m)
+        if "TOTAL" in plain and _COV_TOTAL_RE.search(plain):
+            self.total_line = plain.strip()
+        if plain.startswith("==="):
+            m = _PYTEST_SECTION_RE.match(plain)
+            if m:
+                self._in_section = m.group(1) in FAILURE_SECTIONS
+        if self._in_section and self._sections_len < FAILURE_SECTION_CHARS:
+            self._sections.append(plain)
+            self._sections_len += len(plain)
+
+    def drain(self, pipe: BinaryIO) -> None:
+        """Read pipe to EOF, splitting into lines (thread target)."""
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        pending = ""
+        try:
+            for chunk in iter(lambda: pipe.read1(_STREAM_CHUNK), b""):  # type: ignore[attr-defined]
+                pending += decoder.decode(chunk)
+                start = 0
+                while True:
+                    nl = pending.find("\n", start)
+                    if nl < 0:
+                        break
+                    self.feed(pending[start : nl + 1])
+                    start = nl + 1
+                pending = pending[start:]
+                while len(pending) > _STREAM_MAX_LINE:
+                    self.feed(pending[:_STREAM_MAX_LINE])
+                    pending = pending[_STREAM_MAX_LINE:]
+            pending += decoder.decode(b"", final=True)
+            if pending:
+                self.feed(pending)
+        finally:
+            pipe.close()
+
+    def close(self) -> None:
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    @property
+    def tail(self) -> str:
+        return "".join(self._tail)
+
+    @property
+    def sections(self) -> str:
+        return "".join(self._sections)
+
+
+_ECHO_LOCK = threading.Lock()
+
+# Exit code of a command killed through run_streamed(cancel=...)
+CANCELLED_CODE = 130
+
+
+def run_streamed(
+    cmd: Union[str, List[str]],
+    cwd: Path,
+    *,
+    stdout_path: Optional[Path] = None,
+    stderr_path: Optional[Path] = None,
+    input_text: Optional[str] = None,
+    timeout: int = 1800,
+    echo: bool = True,
+    env: Optional[Dict[str, str]] = None,
+    cancel: Optional[threading.Event] = None,
+) -> "CmdResult":
+    """
+    Like run_shell (cmd is a str) / run_args (cmd is a list), but streams stdout/stderr
+    to log files (and the terminal) instead of buffering them. The result carries
+    only tails plus what the classifiers need, so memory stays constant however
+    verbose the command is. Setting `cancel` kills the command (CANCELLED_CODE).
+    """
+    out = StreamCapture(stdout_path, sys.stdout if echo else None)
+    err = StreamCapture(stderr_path, sys.stderr if echo else None)
+    code = 1
+    try:
+        try:
+            p = subprocess.Popen(
+                cmd,
+                cwd=str(cwd),
+                shell=isinstance(cmd, str),
+                stdin=subprocess.PIPE if input_text is not None else subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                env=env,
+                # own process group, so a timeout also kills grandchildren holding the pipes
+                start_new_session=os.name == "posix",
+            )
+        except FileNotFoundError as e:
+            err.feed(f"COMMAND NOT FOUND: {e}")
+            return CmdResult.from_capture(127, out, err)
+        except Exception as e:
+            err.feed(f"EXCEPTION: {e}")
+            return CmdResult.from_capture(1, out, err)
+
+        threads = [
+            threading.Thread(target=out.drain, args=(p.stdout,), daemon=True),
+            threading.Thread(target=err.drain, args=(p.stderr,), daemon=True),
+        ]
+        if input_text is not None:
+            threads.append(
+                threading.Thread(
+                    target=_write_stdin, args=(p.stdin, input_text), daemon=True
+                )
+            )
+        for t in threads:
+            t.start()
+        code = _wait(p, timeout, cancel)
+        for t in threads:
+            t.join()
+        if code == 124:
+            err.feed("\nTIMEOUT\n")
+        elif code == CANCELLED_CODE and cancel is not None and cancel.is_set():
+            err.feed("\nCANCELLED\n")
+        return CmdResult.from_capture(code, out, err)
+    finally:
+        out.close()
+        err.close()
+
+
+def _wait(
+    p: "subprocess.Popen[bytes]", timeout: int, cancel: Optional[threading.Event]
+) -> int:
+    """Exit code; 124 on timeout, CANCELLED_CODE once `cancel` is set."""
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = max(0.0, deadline - time.monotonic())
+        try:
+            return p.wait(timeout=min(remaining, 0.2) if cancel is not None else remaining)
+        except subprocess.TimeoutExpired:
+            if time.monotonic() >= deadline:
+                code = 124
+            elif cancel is not None and cancel.is_set():
+                code = CANCELLED_CODE
+            else:
+                continue
+            _kill_tree(p)
+            p.wait()
+            return code
+
+
+def _kill_tree(p: "subprocess.Popen[bytes]") -> None:
+    if os.name == "posix":
+        with contextlib.suppress(OSError):
+            os.killpg(p.pid, signal.SIGKILL)
+            return
+    p.kill()
+
+
+def _write_stdin(pipe: BinaryIO, text: str) -> None:
+    try:
+        pipe.write(text.encode("utf-8"))
+    except (BrokenPipeError, OSError):
+        pass
+    finally:
+        with contextlib.suppress(OSError):
+            pipe.close()
+
+
 def sha1(s: str) -> str:
     return hashlib.sha1((s or "").encode("utf-8")).hexdigest()
 
@@ -89,16 +343,176 @@ def ensure_git_repo(root: Path) -> None:
         raise SystemExit("ERROR: Not inside a git repository. Run from repo root.")
 
 
-def git_worktree_fingerprint(root: Path) -> str:
+# Files modified this recently are hashed but not cached: a second write within the
+# filesystem's mtime granularity could keep (mtime, size) unchanged.
+_HASH_MTIME_SLACK_SEC = 2.0
+
+# (mtime_ns, size, sha1) per absolute path
+HashCache = Dict[str, Tuple[int, int, str]]
+
+
+def file_content_hash(path: Path, cache: Optional[HashCache] = None) -> str:
+    """Streamed SHA-1 of a worktree file, reused while (mtime, size) are unchanged."""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return "missing"
+    if stat.S_ISLNK(st.st_mode):
+        return "link:" + os.readlink(path)
+    if not stat.S_ISREG(st.st_mode):
+        return "special"
+    key = str(path)
+    if cache is not None:
+        hit = cache.get(key)
+        if hit and hit[0] == st.st_mtime_ns and hit[1] == st.st_size:
+            return hit[2]
+    h = hashlib.sha1()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    except OSError:
+        return "unreadable"
+    digest = h.hexdigest()
+    if cache is not None and time.time() - st.st_mtime >= _HASH_MTIME_SLACK_SEC:
+        cache[key] = (st.st_mtime_ns, st.st_size, digest)
+    return digest
+
+
+# Untracked files the loop and its verify runs write themselves (when the repo does
+# not ignore them): they change every cycle without Codex touching anything
+_OWN_ARTIFACT_RE = re.compile(
+    r"^(?:\.cursor/\.hook_state/"
+    r"|(?:.*/)?(?:__pycache__|\.pytest_cache)/"
+    r"|(?:.*/)?\.coverage(?:\.[^/]*)?$"
+    r"|.*\.py[co]$)"
+)
+
+
+def git_worktree_fingerprint(root: Path, cache: Optional[HashCache] = None) -> str:
+    """
+    Fingerprint current worktree state vs HEAD, from a single
+    `git status --porcelain=v2 --branch -z -uall`:
+    - HEAD commit (a commit made by Codex counts as a change)
+    - every status entry (XY, modes, HEAD/index blob ids, paths)
+    - content hash of each file whose worktree copy differs from the index,
+      and of each untracked file (cached by (path, mtime, size))
+    Only changed files are read, and only when they changed since the last call, so
+    the cost no longer scales with diff size. Used to detect 'Codex ran but made no
+    net change' stuck cases: two fingerprints are equal iff HEAD, index and every
+    dirty file are identical.
+    """
+    # -uall: files inside new directories are listed (and hashed) one by one, so
+    # edits there change the fingerprint
+    r = run_args(
+        ["git", "status", "--porcelain=v2", "--branch", "-z", "-uall"], root, timeout=30
+    )
+    h = hashlib.sha1(f"{r.code}\0".encode("utf-8"))
+    for e in parse_porcelain_v2(r.stdout or ""):
+        # upstream / ahead-behind lines change on fetch, not on local edits
+        if e.kind == "#" and not e.record.startswith(("# branch.oid", "# branch.head")):
+            continue
+        if e.kind == "?" and _OWN_ARTIFACT_RE.match(e.path or ""):
+            continue
+        h.update(e.record.encode("utf-8", "surrogateescape") + b"\0")
+        if e.orig_path is not None:  # original path of the rename / copy
+            h.update(e.orig_path.encode("utf-8", "surrogateescape") + b"\0")
+        if e.path is not None and e.dirty:
+            h.update(file_content_hash(root / e.path, cache).encode("ascii") + b"\0")
+    return h.hexdigest()
+
+
+@dataclass
+class StatusEntry:
+    kind: str  # "#" header, "1" changed, "2" renamed/copied, "u" unmerged, "?" untracked
+    record: str  # raw porcelain v2 record
+    path: Optional[str] = None
+    orig_path: Optional[str] = None
+    # worktree copy differs from the index (and still exists)
+    dirty: bool = False
+    # deleted in the index or the worktree
+    deleted: bool = False
+
+
+def parse_porcelain_v2(out: str) -> List[StatusEntry]:
+    """Parse `git status --porcelain=v2 -z` output."""
+    entries: List[StatusEntry] = []
+    records = out.split("\0")
+    i = 0
+    while i < len(records):
+        rec = records[i]
+        i += 1
+        if not rec:
+            continue
+        kind = rec[0]
+        e = StatusEntry(kind=kind, record=rec)
+        if kind == "1":
+            parts = rec.split(" ", 8)
+            e.path, e.dirty = parts[8], parts[1][1] not in ".D"
+            e.deleted = "D" in parts[1]
+        elif kind == "2":
+            parts = rec.split(" ", 9)
+            e.path, e.dirty = parts[9], parts[1][1] not in ".D"
+            e.deleted = "D" in parts[1]
+            if i < len(records):
+                e.orig_path = records[i]
+            i += 1
+        elif kind == "u":
+            e.path, e.dirty = rec.split(" ", 10)[10], True
+        elif kind == "?":
+            e.path = rec[2:]
+            # untracked directories (default untracked mode) are not descended into
+            e.dirty = not e.path.endswith("/")
+        elif kind != "#":
+            continue
+        entries.append(e)
+    return entries
+
+
+def git_head(root: Path) -> Optional[str]:
+    r = run_args(["git", "rev-parse", "--verify", "-q", "HEAD"], root, timeout=30)
+    if r.code != 0:
+        return None
+    return (r.stdout or "").strip() or None
+
+
+def git_changed_files(root: Path, base: Optional[str]) -> Tuple[Set[str], Set[str]]:
     """
-    Fingerprint current worktree state vs HEAD:
-    - tracked diff (git diff)
-    - status porcelain (includes untracked)
-    Used to detect 'Codex ran but made no net change' stuck cases.
+    (changed, deleted) repo-relative paths since `base` (the HEAD the loop started
+    from): worktree / index changes, untracked files (expanded), and anything Codex
+    committed on top of `base`. Renames count as a change of the new path and a
+    deletion of the old one.
     """
-    d = run_shell("git diff --no-color", root, timeout=30).stdout
-    s = run_shell("git status --porcelain", root, timeout=30).stdout
-    return sha1((d or "") + "\n---\n" + (s or ""))
+    changed: Set[str] = set()
+    deleted: Set[str] = set()
+    r = run_args(["git", "status", "--porcelain=v2", "-z", "-uall"], root, timeout=60)
+    for e in parse_porcelain_v2(r.stdout or ""):
+        if e.path is None:
+            continue
+        if e.orig_path is not None:
+            deleted.add(e.orig_path)
+        (deleted if e.deleted else changed).add(e.path)
+    head = git_head(root)
+    if base and head and head != base:
+        d = run_args(
+            ["git", "diff", "--name-status", "-z", "--no-renames", base, head],
+            root,
+            timeout=60,
+        )
+        fields = (d.stdout or "").split("\0")
+        for status, path in zip(fields[0::2], fields[1::2]):
+            if status and path:
+                (deleted if status.startswith("D") else changed).add(path)
+    # a path deleted after being committed (or re-created after deletion) wins by
+    # what is on disk now
+    for path in list(changed | deleted):
+        if (root / path).exists():
+            deleted.discard(path)
+            changed.add(path)
+        else:
+            changed.discard(path)
+            deleted.add(path)
+    return changed, deleted
 
 
 def load_tooling(root: Path) -> dict:
@@ -139,8 +553,46 @@ def parse_pytest_cov_percent(output: str) -> Optional[float]:
 @dataclass
 class CmdResult:
     code: int
+    # full output for captured commands; only the tail for streamed ones
     stdout: str
     stderr: str
+    # streamed commands: key lines over the whole output (stdout first, then stderr),
+    # CLASSIFY_MARKERS seen anywhere, and the last coverage TOTAL line
+    key_lines: Optional[str] = None
+    markers: Set[str] = field(default_factory=set)
+    total_line: str = ""
+    # from the XML coverage report, when the verify run wrote one
+    coverage: Optional[float] = None
+    coverage_gaps: str = ""
+    # streamed commands: pytest FAILURES / ERRORS / short summary sections
+    failure_text: str = ""
+
+    @classmethod
+    def from_capture(cls, code: int, out: StreamCapture, err: StreamCapture) -> "CmdResult":
+        return cls(
+            code,
+            out.tail,
+            err.tail,
+            key_lines=KeyLineExtractor.combine(out.keys, err.keys).text(),
+            markers=out.markers | err.markers,
+            total_line=err.total_line or out.total_line,
+            failure_text=out.sections + err.sections,
+        )
+
+    def scan_text(self) -> str:
+        """Text for the classifiers (ANSI stripped, markers appended for streamed output)."""
+        out = strip_ansi((self.stdout or "") + "\n" + (self.stderr or ""))
+        if self.markers:
+            out += "\n" + "\n".join(sorted(self.markers))
+        return out
+
+    def key_text(self, out: str) -> str:
+        return self.key_lines if self.key_lines is not None else extract_key_lines(out)
+
+    def coverage_text(self) -> str:
+        if self.total_line:
+            return self.total_line + "\n" + (self.stdout or "") + "\n" + (self.stderr or "")
+        return (self.stdout or "") + "\n" + (self.stderr or "")
 
 
 @dataclass
@@ -172,80 +624,210 @@ BLOCKED_CATEGORIES = {
 }
 
 
+KEY_LINE_KEYWORDS = (
+    "permission",
+    "denied",
+    "not allowed",
+    "approval",
+    "sandbox",
+    "command not found",
+    "no module named",
+    "unknown option",
+    "error",
+    "traceback",
+    "refused",
+    "forbidden",
+    "unauthorized",
+    "eacces",
+    "eprem",
+)
+
+
+class KeyLineExtractor:
+    """
+    Rolling version of extract_key_lines: the first `limit` non-empty lines containing
+    a keyword, else the first `fallback` non-empty lines. Fed one line at a time, so a
+    streamed command never needs its whole output in memory.
+    """
+
+    def __init__(self, limit: int = 8, fallback: int = 4) -> None:
+        self.limit = limit
+        self.fallback = fallback
+        self.picked: List[str] = []
+        self.first: List[str] = []
+
+    def feed(self, line: str) -> None:
+        ln = line.strip()
+        if not ln:
+            return
+        if len(self.first) < self.fallback:
+            self.first.append(ln)
+        if len(self.picked) < self.limit:
+            low = ln.lower()
+            if any(k in low for k in KEY_LINE_KEYWORDS):
+                self.picked.append(ln)
+
+    @classmethod
+    def combine(cls, *parts: "KeyLineExtractor") -> "KeyLineExtractor":
+        """Same result as extracting from the concatenated streams, in order."""
+        out = cls()
+        for p in parts:
+            out.picked.extend(p.picked)
+            out.first.extend(p.first)
+        out.picked = out.picked[: out.limit]
+        out.first = out.first[: out.fallback]
+        return out
+
+    def text(self) -> str:
+        return "\n".join(self.picked or self.first)
+
+
 def extract_key_lines(text: str) -> str:
     """
     Pull a few lines likely to contain the core error, to make signatures stable.
     """
-    t = strip_ansi(text or "")
-    lines = [ln.strip() for ln in t.splitlines() if ln.strip()]
-    keywords = (
-        "permission",
-        "denied",
-        "not allowed",
-        "approval",
-        "sandbox",
-        "command not found",
-        "no module named",
-        "unknown option",
-        "error",
-        "traceback",
-        "refused",
-        "forbidden",
-        "unauthorized",
-        "eacces",
-        "eprem",
-    )
-    picked = []
-    for ln in lines:
-        low = ln.lower()
-        if any(k in low for k in keywords):
-            picked.append(ln)
-        if len(picked) >= 8:
-            break
-    if not picked:
-        picked = lines[:4]
-    return "\n".join(picked)
+    ex = KeyLineExtractor()
+    for ln in strip_ansi(text or "").splitlines():
+        ex.feed(ln)
+    return ex.text()
+
+
+# Volatile tokens masked before hashing, in order (earlier patterns win)
+_VOLATILE_PATTERNS: List[Tuple[re.Pattern, str]] = [
+    (
+        re.compile(r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"),
+        "<TS>",
+    ),
+    (re.compile(r"\b\d{4}-\d{2}-\d{2}\b|\b\d{2}:\d{2}:\d{2}(?:[.,]\d+)?\b"), "<TS>"),
+    (re.compile(r"\b0x[0-9a-fA-F]+\b"), "<ADDR>"),
+    (
+        re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"),
+        "<UUID>",
+    ),
+    (re.compile(r"\b(?=[0-9a-f]*\d)(?=[0-9a-f]*[a-f])[0-9a-f]{7,}\b"), "<HEX>"),
+    # temp dirs: /tmp/..., /var/folders/..., pytest-of-<user>/pytest-<n>/..., %TEMP%
+    (
+        re.compile(
+            r"(?:/private)?/(?:tmp|var/folders|var/tmp)/[^\s'\":]*"
+            r"|[A-Za-z]:\\[^\s'\":]*\\Temp\\[^\s'\":]*"
+            r"|pytest-of-[^\s/]+/pytest-\d+/[^\s'\":]*"
+        ),
+        "<TMP>",
+    ),
+    # absolute directory prefixes (repo / worktree / venv locations); the file name stays
+    (re.compile(r"(?:[A-Za-z]:)?(?:[/\\][\w.@+-]+)+[/\\](?=[\w.-]+)"), "<DIR>/"),
+    (re.compile(r"\bline \d+"), "line <N>"),
+    # file:line[:col], also after a masked temp path (<TMP>:123)
+    (re.compile(r"(\.\w+|<TMP>):\d+(?::\d+)?"), r"\1:<N>"),
+    (re.compile(r"\b\d+(?:\.\d+)?\s?(?:ms|s|sec|seconds)\b"), "<DUR>"),
+    # not a bare [N]: that is a parametrize id (test_x[1]), which tells failures apart
+    (re.compile(r"\bpid[ =:]?\d+|\bprocess \d+", re.IGNORECASE), "<PID>"),
+    (re.compile(r"\b\d{4,}\b"), "<N>"),
+]
+
+_TOKEN_RE = re.compile(r"<[A-Z]+>|[A-Za-z_][\w.]*|\d+|[^\w\s]")
+
+# Default Jaccard similarity above which two failure signatures count as one
+REPEAT_SIMILARITY = 0.8
+
+
+def normalize_key_text(text: str) -> str:
+    """Key lines with volatile tokens (times, paths, addresses, line numbers...) masked."""
+    out = strip_ansi(text or "")
+    for pat, repl in _VOLATILE_PATTERNS:
+        out = pat.sub(repl, out)
+    return "\n".join(" ".join(ln.split()) for ln in out.splitlines() if ln.strip())
 
 
 def fingerprint_failure(kind: str, category: str, exit_code: int, key_text: str) -> str:
-    base = f"{kind}|{category}|{exit_code}|{key_text}"
+    base = f"{kind}|{category}|{exit_code}|{normalize_key_text(key_text)}"
     return sha1(base)
 
 
+@dataclass
+class FailureGroup:
+    kind: str
+    category: str
+    signature: str  # fingerprint of the first failure in the group
+    tokens: Set[str]
+    count: int = 0
+    variants: Set[str] = field(default_factory=set)
+
+
+class FailureGroups:
+    """
+    Repeat counter for the blocked-failure guard. Failures of the same kind and
+    category whose normalized key lines share at least `threshold` of their tokens
+    (Jaccard) count as repeats of one group, so small differences that survive
+    normalization (a different module name in a traceback frame, reordered lines)
+    do not reset the count.
+    """
+
+    def __init__(self, threshold: float = REPEAT_SIMILARITY) -> None:
+        self.threshold = threshold
+        self.groups: List[FailureGroup] = []
+
+    @staticmethod
+    def similarity(a: Set[str], b: Set[str]) -> float:
+        if not a and not b:
+            return 1.0
+        return len(a & b) / len(a | b)
+
+    def observe(
+        self, kind: str, category: str, exit_code: int, key_text: str
+    ) -> FailureGroup:
+        sig = fingerprint_failure(kind, category, exit_code, key_text)
+        tokens = set(_TOKEN_RE.findall(normalize_key_text(key_text)))
+        tokens.add(f"<exit={exit_code}>")
+        best: Optional[FailureGroup] = None
+        best_sim = -1.0
+        for g in self.groups:
+            if g.kind != kind or g.category != category:
+                continue
+            sim = 1.0 if sig in g.variants else self.similarity(tokens, g.tokens)
+            if sim > best_sim:
+                best, best_sim = g, sim
+        if best is None or best_sim < self.threshold:
+            best = FailureGroup(kind, category, sig, tokens)
+            self.groups.append(best)
+        best.count += 1
+        best.variants.add(sig)
+        return best
+
+
 def classify_codex(
     root: Path, r: CmdResult, before_fp: str, after_fp: str
 ) -> Tuple[str, str]:
     """
     Returns (category, key_text).
     """
-    out = strip_ansi((r.stdout or "") + "\n" + (r.stderr or ""))
+    out = r.scan_text()
     low = out.lower()
+    key = r.key_text(out)
 
     if r.code == 127 and "command not found" in low:
-        return "ENV_MISSING_CODEX", extract_key_lines(out)
+        return "ENV_MISSING_CODEX", key
     if r.code == 124 or "timeout" in low:
-        return "CODEX_TIMEOUT", extract_key_lines(out)
+        return "CODEX_TIMEOUT", key
     if after_fp == before_fp:
         # Codex ran but produced no net change in worktree.
         # Often due to permissions/approval/sandbox restrictions.
-        return "NO_NET_CHANGE", extract_key_lines(
-            out
-        ) or "No net changes after codex exec"
+        return "NO_NET_CHANGE", key or "No net changes after codex exec"
 
     if "approval" in low and ("required" in low or "needs" in low):
-        return "APPROVAL_REQUIRED", extract_key_lines(out)
+        return "APPROVAL_REQUIRED", key
     if "sandbox" in low and ("denied" in low or "not allowed" in low):
-        return "SANDBOX_DENIED", extract_key_lines(out)
+        return "SANDBOX_DENIED", key
     if (
         "permission denied" in low
         or "eacces" in low
         or "operation not permitted" in low
     ):
-        return "PERMISSION_DENIED", extract_key_lines(out)
+        return "PERMISSION_DENIED", key
 
     # If codex exit is non-zero but not obviously blocked, still categorize as generic.
     if r.code != 0:
-        return "CODEX_ERROR", extract_key_lines(out)
+        return "CODEX_ERROR", key
 
     return "OK", ""
 
@@ -253,31 +835,37 @@ def classify_codex(
 def classify_verify(
     cmd: str, r: CmdResult, coverage: Optional[float]
 ) -> Tuple[str, str]:
-    out = strip_ansi((r.stdout or "") + "\n" + (r.stderr or ""))
+    out = r.scan_text()
     low = out.lower()
+    key = r.key_text(out)
+
+    # tests cancelled by a failing blocking check: the check is what failed, and the
+    # cancelled run has no output or coverage to classify
+    if r.code == CANCELLED_CODE:
+        return "CHECK_FAILED", key
 
     if r.code == 124 or "timeout" in low:
-        return "VERIFY_TIMEOUT", extract_key_lines(out)
+        return "VERIFY_TIMEOUT", key
 
     # shell: 127 often means command not found
     if r.code == 127 or "command not found" in low:
         # Distinguish missing node/pytest/etc if possible
         if "node" in low:
-            return "ENV_MISSING_NODE", extract_key_lines(out)
-        return "ENV_MISSING_TEST_TOOL", extract_key_lines(out)
+            return "ENV_MISSING_NODE", key
+        return "ENV_MISSING_TEST_TOOL", key
 
     # pytest-cov missing: "unknown option --cov" or similar
     if "--cov" in out and ("unknown option" in low or "unrecognized arguments" in low):
-        return "ENV_MISSING_PYTEST_COV", extract_key_lines(out)
+        return "ENV_MISSING_PYTEST_COV", key
 
     # coverage parse failed while cmd *claims* to be coverage
     if coverage is None and ("--cov" in cmd or "coverage" in cmd.lower()):
         # Not always blocked, but often indicates tooling mismatch
-        return "ENV_MISSING_PYTEST_COV", extract_key_lines(out)
+        return "ENV_MISSING_PYTEST_COV", key
 
     # normal failing tests
     if r.code != 0:
-        return "TEST_FAILURE", extract_key_lines(out)
+        return "TEST_FAILURE", key
 
     # tests pass but coverage may be low (not blocked)
     return "OK", ""
@@ -377,6 +965,1110 @@ def suggestions_for_category(category: str) -> List[str]:
     return m.get(category, [])
 
 
+# -------------------------
+# Selective verification
+# -------------------------
+
+IMPORT_GRAPH_VERSION = 1
+
+# Directories never scanned for Python sources (hidden directories are skipped too)
+_GRAPH_SKIP_DIRS = {
+    "node_modules",
+    "__pycache__",
+    "venv",
+    "build",
+    "dist",
+    "site-packages",
+}
+
+# Changes to these can affect any test: always verify with a full run
+FULL_RUN_FILES = {
+    "conftest.py",
+    "pyproject.toml",
+    "setup.py",
+    "setup.cfg",
+    "pytest.ini",
+    "tox.ini",
+    "noxfile.py",
+    "uv.lock",
+    "poetry.lock",
+}
+
+# Changes that never affect tests
+IGNORED_CHANGE_PREFIXES = (".cursor/", ".github/", "records/", "docs/")
+IGNORED_CHANGE_SUFFIXES = (".md", ".rst")
+
+# More selected test files than this is not worth a separate run
+SELECTIVE_MAX_TESTS = 200
+
+
+def is_test_file(rel: str) -> bool:
+    name = rel.rsplit("/", 1)[-1]
+    return name.endswith(".py") and (name.startswith("test_") or name.endswith("_test.py"))
+
+
+def scan_python_files(root: Path) -> Dict[str, os.stat_result]:
+    """Repo-relative path -> stat of every .py file outside hidden / build directories."""
+    found: Dict[str, os.stat_result] = {}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = [
+            d for d in dirnames if not d.startswith(".") and d not in _GRAPH_SKIP_DIRS
+        ]
+        rel_dir = Path(dirpath).relative_to(root).as_posix()
+        for name in filenames:
+            if not name.endswith(".py"):
+                continue
+            rel = name if rel_dir == "." else f"{rel_dir}/{name}"
+            try:
+                found[rel] = os.stat(os.path.join(dirpath, name))
+            except OSError:
+                continue
+    return found
+
+
+class ImportGraph:
+    """
+    Reverse import graph of the repo's Python files, from their `import` statements.
+    Parsed imports are cached per file by (mtime, size) in `cache_path`, so a
+    refresh only re-parses files that changed since the previous cycle.
+    """
+
+    def __init__(self, root: Path, cache_path: Path) -> None:
+        self.root = root
+        self.cache_path = cache_path
+        # rel path -> [mtime_ns, size, imports]; an import is [level, module, names]
+        self.files: Dict[str, list] = {}
+        self._importers: Dict[str, Set[str]] = {}
+        try:
+            data = json.loads(cache_path.read_text(encoding="utf-8"))
+            if data.get("version") == IMPORT_GRAPH_VERSION:
+                self.files = data.get("files") or {}
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    @staticmethod
+    def _parse(path: Path) -> list:
+        try:
+            tree = ast.parse(path.read_bytes(), filename=str(path))
+        except (OSError, SyntaxError, ValueError):
+            return []
+        imports: list = []
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                imports.extend([0, a.name, []] for a in node.names)
+            elif isinstance(node, ast.ImportFrom):
+                imports.append(
+                    [node.level or 0, node.module or "", [a.name for a in node.names]]
+                )
+        return imports
+
+    def refresh(self) -> None:
+        found = scan_python_files(self.root)
+        dirty = set(self.files) != set(found)
+        files: Dict[str, list] = {}
+        now = time.time()
+        for rel, st in found.items():
+            cached = self.files.get(rel)
+            if cached and cached[0] == st.st_mtime_ns and cached[1] == st.st_size:
+                files[rel] = cached
+                continue
+            # recently written files are re-parsed next time (see file_content_hash)
+            mtime = st.st_mtime_ns if now - st.st_mtime >= _HASH_MTIME_SLACK_SEC else -1
+            files[rel] = [mtime, st.st_size, self._parse(self.root / rel)]
+            dirty = True
+        self.files = files
+        self._build()
+        if dirty:
+            self._save()
+
+    def _save(self) -> None:
+        tmp = self.cache_path.with_name(self.cache_path.name + ".tmp")
+        try:
+            tmp.write_text(
+                json.dumps({"version": IMPORT_GRAPH_VERSION, "files": self.files}),
+                encoding="utf-8",
+            )
+            os.replace(tmp, self.cache_path)
+        except OSError:
+            pass
+
+    def _module_names(self, rel: str) -> Set[str]:
+        """
+        Importable names of a file: from the repo root, and from its import root
+        (the first ancestor directory that is not a package, e.g. `src/`).
+        """
+        parts = rel[: -len(".py")].split("/")
+        if parts[-1] == "__init__":
+            parts = parts[:-1]
+        names = {".".join(parts)} if parts else set()
+        dirs = rel.split("/")[:-1]
+        k = len(dirs)
+        while k > 0 and "/".join(dirs[:k] + ["__init__.py"]) in self.files:
+            k -= 1
+        if parts[k:]:
+            names.add(".".join(parts[k:]))
+        return names
+
+    def _build(self) -> None:
+        by_name: Dict[str, Set[str]] = {}
+        names_of: Dict[str, Set[str]] = {}
+        for rel in self.files:
+            names_of[rel] = self._module_names(rel)
+            for name in names_of[rel]:
+                by_name.setdefault(name, set()).add(rel)
+
+        importers: Dict[str, Set[str]] = {}
+        for rel, entry in self.files.items():
+            is_pkg = rel.endswith("/__init__.py") or rel == "__init__.py"
+            for level, module, names in entry[2]:
+                bases: List[str] = []
+                if level == 0:
+                    bases.append(module)
+                else:
+                    for own in names_of[rel]:
+                        pkg = own.split(".") if own else []
+                        if not is_pkg:
+                            pkg = pkg[:-1]
+                        if level - 1 > len(pkg):
+                            continue
+                        pkg = pkg[: len(pkg) - (level - 1)]
+                        bases.append(".".join(pkg + ([module] if module else [])))
+                targets: Set[str] = set()
+                for base in bases:
+                    # `import a.b.c` runs a/__init__ and a/b/__init__ too
+                    bits = base.split(".") if base else []
+                    targets.update(".".join(bits[:i]) for i in range(1, len(bits) + 1))
+                    # `from a import b` may name a submodule
+                    targets.update(f"{base}.{n}" if base else n for n in names if n != "*")
+                for t in targets:
+                    for dep in by_name.get(t, ()):
+                        if dep != rel:
+                            importers.setdefault(dep, set()).add(rel)
+        self._importers = importers
+
+    def tests_for(self, changed: Iterable[str]) -> Set[str]:
+        """Test files that import any of `changed`, directly or transitively."""
+        seen: Set[str] = set()
+        queue: Deque[str] = deque(p for p in changed if p in self.files)
+        seen.update(queue)
+        while queue:
+            rel = queue.popleft()
+            for importer in self._importers.get(rel, ()):
+                if importer not in seen:
+                    seen.add(importer)
+                    queue.append(importer)
+        return {p for p in seen if is_test_file(p)}
+
+
+@dataclass
+class SelectedTests:
+    tests: Optional[List[str]]  # None -> a full run is needed
+    reason: str
+
+
+def select_tests(
+    graph: ImportGraph, changed: Set[str], deleted: Set[str], scopes: Iterable[str] = ()
+) -> SelectedTests:
+    """
+    Map the files changed since the loop started to the tests that exercise them,
+    limited to the verify command's own path arguments (`scopes`) if it has any.
+    """
+
+    def ignored(p: str) -> bool:
+        return (
+            p.startswith(IGNORED_CHANGE_PREFIXES)
+            or p.endswith(IGNORED_CHANGE_SUFFIXES)
+            or bool(_OWN_ARTIFACT_RE.match(p))
+        )
+
+    def forces_full(p: str) -> bool:
+        name = p.rsplit("/", 1)[-1]
+        return name in FULL_RUN_FILES or name.startswith("requirements")
+
+    for p in sorted(deleted):
+        if forces_full(p) or not ignored(p):
+            return SelectedTests(None, f"deleted: {p}")
+    py_changed: List[str] = []
+    for p in sorted(changed):
+        if forces_full(p):
+            return SelectedTests(None, f"test configuration changed: {p}")
+        if ignored(p):
+            continue
+        if not p.endswith(".py"):
+            return SelectedTests(None, f"non-Python change: {p}")
+        py_changed.append(p)
+    if not py_changed:
+        return SelectedTests(None, "no Python changes to select tests for")
+
+    graph.refresh()
+    tests = graph.tests_for(py_changed)
+    if not tests:
+        return SelectedTests(None, "no tests import the changed files")
+    scopes = list(scopes)
+    if scopes:
+        tests = {t for t in tests if in_scope(t, scopes)}
+        if not tests:
+            return SelectedTests(None, "no affected tests in the verify scope")
+    if len(tests) > SELECTIVE_MAX_TESTS:
+        return SelectedTests(None, f"{len(tests)} test files affected")
+    return SelectedTests(sorted(tests), f"{len(py_changed)} changed Python files")
+
+
+_PYTEST_RE = re.compile(r"(?:^|\s)(?:py\.test|pytest)(?=\s|$)")
+
+# pytest / plugin options whose value is the next argument (unless given as --opt=v)
+_PYTEST_VALUE_OPTS = {
+    "-c", "-k", "-m", "-n", "-o", "-p", "-r", "-W",
+    "--basetemp", "--confcutdir", "--cov", "--cov-config", "--cov-fail-under",
+    "--cov-report", "--deselect", "--dist", "--durations", "--ignore", "--ignore-glob",
+    "--import-mode", "--junitxml", "--log-level", "--maxfail", "--override-ini",
+    "--rootdir", "--tb",
+}
+_SHELL_OPERATORS = {"&&", "||", "&", "|", ";"}
+
+
+def in_scope(rel: str, scopes: Iterable[str]) -> bool:
+    return any(sc == "." or rel == sc or rel.startswith(sc + "/") for sc in scopes)
+
+
+def split_pytest_scope(root: Path, cmd: str) -> Tuple[str, List[str]]:
+    """
+    Split a pytest command into the command without its path arguments and those
+    paths (repo-relative, "." for the whole repo). Other arguments are kept as
+    written, so the rest of the command runs unchanged in the same shell.
+    """
+    m = _PYTEST_RE.search(cmd)
+    if not m:
+        return cmd, []
+    try:
+        lex = shlex.shlex(cmd[m.end() :], posix=False)
+        lex.whitespace_split = True
+        tokens = list(lex)
+    except ValueError:
+        return cmd, []
+    root_res = root.resolve()
+    kept: List[str] = []
+    scopes: List[str] = []
+    value_of: Optional[str] = None
+    for i, t in enumerate(tokens):
+        if t in _SHELL_OPERATORS or t[0] in "<>":
+            kept.extend(tokens[i:])
+            break
+        # --cov takes an optional source: `--cov -q` leaves -q an option
+        if value_of is not None and not (value_of == "--cov" and t.startswith("-")):
+            value_of = None
+            kept.append(t)
+            continue
+        value_of = None
+        if t.startswith("-"):
+            if t in _PYTEST_VALUE_OPTS:
+                value_of = t
+            kept.append(t)
+            continue
+        path = t[1:-1] if len(t) >= 2 and t[0] == t[-1] and t[0] in "\"'" else t
+        try:
+            rel = (root / path).resolve().relative_to(root_res).as_posix()
+        except (OSError, ValueError):
+            rel = ""
+        if not rel or not (root / path).exists():
+            kept.append(t)  # test node ids, expressions, paths outside the repo
+            continue
+        scopes.append(rel)
+    if not scopes:
+        return cmd, []
+    return cmd[: m.end()] + "".join(" " + t for t in kept), scopes
+
+
+def selective_command(root: Path, base_cmd: str, tests: List[str]) -> str:
+    """base_cmd on `tests` only: its own path arguments would collect the whole scope."""
+    cmd, _ = split_pytest_scope(root, base_cmd)
+    return cmd + " " + " ".join(shell_quote(t) for t in tests)
+
+
+# -------------------------
+# Sharded verification
+# -------------------------
+
+TEST_DURATIONS_VERSION = 1
+
+# Merged stdout budget, split between the failing shards so each reaches the prompt
+_SHARD_TAIL_CHARS = 4000
+
+_COV_REPORT_OPT_RE = re.compile(r"\s--cov-report(?:=|\s+)\S*")
+_SHELL_SEPARATOR_RE = re.compile(r"&&|\|\||[;&|]")
+
+
+@dataclass
+class Shard:
+    index: int
+    files: List[str]
+    expected: float  # seconds, from historical durations
+
+
+def load_test_durations(path: Path) -> Dict[str, float]:
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get("version") != TEST_DURATIONS_VERSION:
+        return {}
+    return {k: float(v) for k, v in (data.get("files") or {}).items()}
+
+
+def save_test_durations(path: Path, durations: Dict[str, float]) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    try:
+        tmp.write_text(
+            json.dumps({"version": TEST_DURATIONS_VERSION, "files": durations}),
+            encoding="utf-8",
+        )
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def plan_shards(files: List[str], durations: Dict[str, float], n: int) -> List[Shard]:
+    """
+    Longest-processing-time-first: each file, slowest first, goes to the currently
+    lightest shard. Files without history count as the median known duration.
+    """
+    known = sorted(durations[f] for f in files if f in durations)
+    default = known[len(known) // 2] if known else 1.0
+    cost = {f: durations.get(f, default) for f in files}
+    shards = [Shard(i, [], 0.0) for i in range(max(1, min(n, len(files))))]
+    heap = [(0.0, i) for i in range(len(shards))]
+    for f in sorted(files, key=lambda f: (-cost[f], f)):
+        load, i = heapq.heappop(heap)
+        shards[i].files.append(f)
+        shards[i].expected = load + cost[f]
+        heapq.heappush(heap, (shards[i].expected, i))
+    return [sh for sh in shards if sh.files]
+
+
+def junit_file_durations(xml_path: Path) -> Dict[str, float]:
+    """Seconds per test file from a pytest junit xml written with junit_family=xunit1."""
+    out: Dict[str, float] = {}
+    try:
+        tree = ET.parse(str(xml_path))
+    except (OSError, ET.ParseError):
+        return out
+    for tc in tree.getroot().iter("testcase"):
+        f = tc.get("file")
+        if not f:
+            continue
+        try:
+            out[f] = out.get(f, 0.0) + float(tc.get("time") or 0.0)
+        except ValueError:
+            continue
+    return out
+
+
+def shardable_test_files(root: Path, verify_cmd: str) -> List[str]:
+    """
+    Test files the verify command would collect: every test_*.py / *_test.py, limited
+    to the paths given on the command line (if any).
+    """
+    files = sorted(p for p in scan_python_files(root) if is_test_file(p))
+    _, scopes = split_pytest_scope(root, verify_cmd)
+    if scopes:
+        files = [f for f in files if in_scope(f, scopes)]
+    return files
+
+
+def _merge_lines(texts: List[str]) -> str:
+    seen: Set[str] = set()
+    lines: List[str] = []
+    for text in texts:
+        for line in (text or "").splitlines():
+            if line and line not in seen:
+                seen.add(line)
+                lines.append(line)
+    return "\n".join(lines)
+
+
+def merge_shard_results(
+    results: List[Tuple[Shard, CmdResult]], cov: Optional[CmdResult]
+) -> CmdResult:
+    """
+    One result for the whole suite: the first real failure's exit code, a short
+    summary per shard followed by the tail of every failing shard, and the
+    combined coverage report.
+    """
+    n = len(results)
+    codes = [r.code for _, r in results]
+    bad = [c for c in codes if c not in (0, 5)]
+    code = bad[0] if bad else (5 if all(c == 5 for c in codes) else 0)
+
+    failing = [(sh, r) for sh, r in results if r.code not in (0, 5)]
+    budget = max(600, _SHARD_TAIL_CHARS // max(1, len(failing)))
+    out: List[str] = []
+    err: List[str] = []
+    if cov is not None:
+        out.append(tail(cov.stdout, 2000))
+        err.append(tail(cov.stderr, 1000))
+    for sh, r in results:
+        last = next((ln for ln in reversed((r.stdout or "").splitlines()) if ln.strip()), "")
+        out.append(f"shard {sh.index + 1}/{n}: exit={r.code}, {len(sh.files)} files: {last}")
+    for sh, r in failing:
+        out.append(f"\n=== shard {sh.index + 1}/{n} (exit={r.code}) ===\n{tail(r.stdout, budget)}")
+        if (r.stderr or "").strip():
+            err.append(f"=== shard {sh.index + 1}/{n} ===\n{tail(r.stderr, budget)}")
+
+    parts = [r for _, r in results] + ([cov] if cov is not None else [])
+    return CmdResult(
+        code,
+        "\n".join(out),
+        "\n".join(e for e in err if e.strip()),
+        key_lines=_merge_lines(
+            [r.key_lines if r.key_lines is not None else "" for r in parts]
+        ),
+        markers=set().union(*(r.markers for r in parts)),
+        total_line=cov.total_line if cov is not None else "",
+        failure_text="".join(r.failure_text for _, r in failing),
+    )
+
+
+def run_sharded_verify(
+    root: Path,
+    verify_cmd: str,
+    n: int,
+    logs_dir: Path,
+    log_prefix: str,
+    *,
+    timeout: int = 1800,
+    cancel: Optional[threading.Event] = None,
+    xml_path: Optional[Path] = None,
+) -> Optional[CmdResult]:
+    """
+    Run a pytest verify command as `n` concurrent shards of test files, balanced by
+    the durations recorded on previous runs, and merge their coverage data into
+    one report. Returns None when there is nothing to split (fewer than two test
+    files); the caller then runs verify_cmd as is.
+    """
+    m = _PYTEST_RE.search(verify_cmd)
+    files = shardable_test_files(root, verify_cmd) if m else []
+    if len(files) < 2:
+        return None
+    durations_path = logs_dir / "test_durations.json"
+    durations = load_test_durations(durations_path)
+    shards = plan_shards(files, durations, n)
+
+    shard_dir = logs_dir / "shards"
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    for old in shard_dir.glob(".coverage*"):
+        with contextlib.suppress(OSError):
+            old.unlink()
+    with_cov = "--cov" in verify_cmd
+    # each shard gets its files only: the command's own paths would collect the lot
+    shard_cmd, _ = split_pytest_scope(root, verify_cmd)
+    # shards cover part of the code each: no per-shard report or threshold
+    if with_cov:
+        shard_cmd = _COV_REPORT_OPT_RE.sub("", shard_cmd)
+
+    def run_one(sh: Shard) -> CmdResult:
+        junit = shard_dir / f"shard{sh.index}.xml"
+        with contextlib.suppress(OSError):
+            junit.unlink()
+        extra = ["-p", "no:cacheprovider", f"--junitxml={junit}", "-o", "junit_family=xunit1"]
+        if with_cov:
+            extra += ["--cov-report=", "--cov-fail-under=0"]
+        cmd = " ".join([shard_cmd] + [shell_quote(a) for a in extra + sh.files])
+        env = dict(os.environ, COVERAGE_FILE=str(shard_dir / f".coverage.shard{sh.index}"))
+        started = time.monotonic()
+        r = run_streamed(
+            cmd,
+            root,
+            stdout_path=logs_dir / f"{log_prefix}_shard{sh.index + 1}_stdout.txt",
+            stderr_path=logs_dir / f"{log_prefix}_shard{sh.index + 1}_stderr.txt",
+            timeout=timeout,
+            echo=False,
+            env=env,
+            cancel=cancel,
+        )
+        print(
+            f"   shard {sh.index + 1}/{len(shards)}: exit={r.code} "
+            f"({len(sh.files)} files, {time.monotonic() - started:.1f}s, "
+            f"expected {sh.expected:.1f}s)",
+            flush=True,
+        )
+        return r
+
+    with ThreadPoolExecutor(max_workers=len(shards)) as pool:
+        shard_results = list(pool.map(run_one, shards))
+
+    measured: Dict[str, float] = {}
+    for sh in shards:
+        measured.update(junit_file_durations(shard_dir / f"shard{sh.index}.xml"))
+    known = set(files)
+    durations = {f: d for f, d in durations.items() if f in known}
+    durations.update({f: d for f, d in measured.items() if f in known})
+    save_test_durations(durations_path, durations)
+
+    cov: Optional[CmdResult] = None
+    if with_cov and not (cancel is not None and cancel.is_set()):
+        data_files = sorted(str(p) for p in shard_dir.glob(".coverage.shard*"))
+        # "cd pkg && uv run pytest ...": the setup commands run once, the runner
+        # ("uv run ", "python -m ") prefixes each coverage step
+        prefix = verify_cmd[: m.start()]
+        cut = max((sm.end() for sm in _SHELL_SEPARATOR_RE.finditer(prefix)), default=0)
+        setup = prefix[:cut].strip()
+        launcher = prefix[cut:].strip()
+        setup += " " if setup else ""
+        launcher += " " if launcher else ""
+        env = dict(os.environ, COVERAGE_FILE=str(shard_dir / ".coverage"))
+        report = "coverage report" + (" -m" if "term-missing" in verify_cmd else "")
+        if xml_path is not None:
+            report += f" && {launcher}coverage xml -q -o {shell_quote(str(xml_path))}"
+        cov = run_streamed(
+            f"{setup}{launcher}coverage combine -q "
+            + " ".join(shell_quote(p) for p in data_files)
+            + f" && {launcher}{report}",
+            root,
+            stdout_path=logs_dir / f"{log_prefix}_coverage_stdout.txt",
+            stderr_path=logs_dir / f"{log_prefix}_coverage_stderr.txt",
+            timeout=600,
+            echo=False,
+            env=env,
+        )
+    return merge_shard_results(list(zip(shards, shard_results)), cov)
+
+
+def attach_coverage(
+    r: CmdResult, xml_path: Path, root: Path, base: Optional[str]
+) -> None:
+    """Fill r.coverage / r.coverage_gaps from the run's XML report, if it wrote one."""
+    if not xml_path.exists():
+        return
+    report = read_coverage_xml(xml_path, root, git_changed_lines(root, base))
+    if report is not None:
+        r.coverage = report.percent
+        r.coverage_gaps = report.gaps_text()
+
+
+# -------------------------
+# Coverage ingestion
+# -------------------------
+
+# Coverage gaps listed in the follow-up prompt
+COVERAGE_GAP_FILES = 15
+
+_HUNK_RE = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+
+@dataclass
+class FileCoverage:
+    path: str  # repo-relative
+    statements: int
+    covered: int
+    # changed executable lines of this file, and those not hit (changed files only)
+    changed: int = 0
+    uncovered_changed: List[int] = field(default_factory=list)
+
+    @property
+    def percent(self) -> float:
+        return 100.0 * self.covered / self.statements if self.statements else 100.0
+
+
+@dataclass
+class CoverageReport:
+    percent: Optional[float]
+    files: Dict[str, FileCoverage]
+    # changed source files missing from the report (no test imports them)
+    unmeasured: List[str] = field(default_factory=list)
+
+    def gaps_text(self, limit: int = COVERAGE_GAP_FILES) -> str:
+        """Changed files with uncovered changed lines; else the least covered files."""
+        parts: List[str] = []
+        if self.unmeasured:
+            parts.append(
+                "Changed files not in the coverage report (never imported by the tests):\n"
+                + "\n".join(f"- {p}" for p in self.unmeasured[:limit])
+            )
+        gaps = sorted(
+            (f for f in self.files.values() if f.uncovered_changed),
+            key=lambda f: (-len(f.uncovered_changed), f.path),
+        )
+        if gaps:
+            lines = [
+                f"- {f.path}: {len(f.uncovered_changed)} of {f.changed} changed statements "
+                f"uncovered (lines {line_ranges(f.uncovered_changed)}); file {f.percent:.0f}%"
+                for f in gaps[:limit]
+            ]
+            if len(gaps) > limit:
+                lines.append(f"- ... and {len(gaps) - limit} more changed files")
+            parts.append("Uncovered changed lines:\n" + "\n".join(lines))
+        else:
+            low = sorted(
+                (f for f in self.files.values() if f.covered < f.statements),
+                key=lambda f: (f.percent, f.path),
+            )[:5]
+            if low:
+                parts.append(
+                    "Least covered files (changed lines are all covered):\n"
+                    + "\n".join(
+                        f"- {f.path}: {f.percent:.0f}% "
+                        f"({f.statements - f.covered} statements missed)"
+                        for f in low
+                    )
+                )
+        return "\n".join(parts)
+
+
+def line_ranges(lines: List[int]) -> str:
+    out: List[str] = []
+    start = prev = None
+    for n in sorted(lines):
+        if prev is not None and n == prev + 1:
+            prev = n
+            continue
+        if start is not None:
+            out.append(f"{start}-{prev}" if prev != start else str(start))
+        start = prev = n
+    if start is not None:
+        out.append(f"{start}-{prev}" if prev != start else str(start))
+    return ", ".join(out)
+
+
+def git_changed_lines(root: Path, base: Optional[str]) -> Dict[str, Optional[Set[int]]]:
+    """
+    Lines added or modified since `base`, per repo-relative file (None: the whole
+    file, for untracked files).
+    """
+    changed: Dict[str, Optional[Set[int]]] = {}
+    if not base:
+        return changed
+    r = run_args(
+        ["git", "diff", "-U0", "--no-color", "--no-ext-diff", "--no-renames", base],
+        root,
+        timeout=120,
+    )
+    current: Optional[Set[int]] = None
+    for line in (r.stdout or "").splitlines():
+        if line.startswith("+++ "):
+            path = line[4:]
+            current = None
+            if path.startswith("b/"):
+                current = changed.setdefault(path[2:], set())
+            continue
+        m = _HUNK_RE.match(line)
+        if m and current is not None:
+            start, count = int(m.group(1)), int(m.group(2) or 1)
+            current.update(range(start, start + count))
+    u = run_args(["git", "ls-files", "--others", "--exclude-standard", "-z"], root, timeout=60)
+    for path in (u.stdout or "").split("\0"):
+        if path:
+            changed[path] = None
+    return changed
+
+
+def read_coverage_xml(
+    xml_path: Path, root: Path, changed: Optional[Dict[str, Optional[Set[int]]]] = None
+) -> Optional[CoverageReport]:
+    """
+    Stream a Cobertura XML report (pytest --cov-report=xml / coverage xml): total
+    percent (lines + branches, as coverage.py computes it), per-file statement
+    counts, and which of the `changed` lines are not covered.
+    """
+    changed = changed or {}
+    files: Dict[str, FileCoverage] = {}
+    sources: List[Path] = []
+    percent: Optional[float] = None
+    root_res = root.resolve()
+    try:
+        for event, elem in ET.iterparse(str(xml_path), events=("start", "end")):
+            if event == "start":
+                if elem.tag == "coverage":
+                    valid = int(elem.get("lines-valid") or 0) + int(
+                        elem.get("branches-valid") or 0
+                    )
+                    covered = int(elem.get("lines-covered") or 0) + int(
+                        elem.get("branches-covered") or 0
+                    )
+                    percent = 100.0 * covered / valid if valid else 100.0
+                continue
+            if elem.tag == "source" and elem.text:
+                sources.append(Path(elem.text.strip()))
+            elif elem.tag == "class":
+                name = elem.get("filename") or ""
+                rel = name
+                for src in sources:
+                    with contextlib.suppress(ValueError):
+                        rel = (src / name).resolve().relative_to(root_res).as_posix()
+                        break
+                statements = covered_n = 0
+                want = changed.get(rel, set())
+                missed_changed: List[int] = []
+                n_changed = 0
+                for line in elem.iter("line"):
+                    statements += 1
+                    hit = (line.get("hits") or "0") != "0"
+                    covered_n += hit
+                    if rel in changed:
+                        num = int(line.get("number") or 0)
+                        if want is None or num in want:
+                            n_changed += 1
+                            if not hit:
+                                missed_changed.append(num)
+                fc = files.get(rel)
+                if fc is None:
+                    files[rel] = FileCoverage(rel, statements, covered_n, n_changed, missed_changed)
+                else:  # a file split over several classes
+                    fc.statements += statements
+                    fc.covered += covered_n
+                    fc.changed += n_changed
+                    fc.uncovered_changed.extend(missed_changed)
+                elem.clear()
+            elif elem.tag == "package":
+                elem.clear()
+    except (OSError, ET.ParseError, ValueError):
+        return None
+    if percent is None:
+        return None
+    unmeasured = sorted(
+        p
+        for p in changed
+        if p.endswith(".py")
+        and p not in files
+        and not is_test_file(p)
+        and not p.startswith(IGNORED_CHANGE_PREFIXES)
+        and (root / p).exists()
+    )
+    return CoverageReport(percent, files, unmeasured)
+
+
+def with_coverage_xml(verify_cmd: str, xml_path: Path) -> str:
+    """verify_cmd that also writes an XML coverage report (pytest-cov commands only)."""
+    if "--cov" not in verify_cmd or not _PYTEST_RE.search(verify_cmd):
+        return verify_cmd
+    extra = " " + shell_quote(f"--cov-report=xml:{xml_path}")
+    if "--cov-report" not in verify_cmd:
+        # any --cov-report replaces the default terminal report: keep it
+        extra += " --cov-report=term"
+    return verify_cmd + extra
+
+
+# -------------------------
+# Verification cache
+# -------------------------
+
+VERIFY_CACHE_VERSION = 1
+
+# Bound on the serialized cache; least recently used entries are evicted first
+VERIFY_CACHE_MAX_BYTES = 2 * 1024 * 1024
+
+# Head of the pytest failure sections kept per entry (enough for any digest budget)
+_CACHED_FAILURE_CHARS = 32000
+
+# Timeouts, missing tools and cancelled runs say nothing about the tree: never replayed
+_UNCACHEABLE_CODES = {124, 127, CANCELLED_CODE}
+
+# pytest interrupted (collection errors such as ModuleNotFoundError), internal and
+# usage errors (e.g. --cov without pytest-cov): installing a package fixes them
+# without changing the tree, so a replay would repeat a stale failure
+_PYTEST_UNCACHEABLE_CODES = {2, 3, 4}
+
+
+def tooling_signature(tooling: dict) -> str:
+    # generatedAt changes on every detection, the commands do not
+    stable = {k: v for k, v in tooling.items() if k != "generatedAt"}
+    return sha1(json.dumps(stable, sort_keys=True))
+
+
+def verify_cache_key(fingerprint: str, cmd: str, tooling_sig: str) -> str:
+    return sha1("\0".join([fingerprint, cmd, tooling_sig]))
+
+
+class VerifyCache:
+    """
+    Verify results keyed by (worktree fingerprint, verify command, tooling
+    signature), so an identical tree is not verified twice. Entries keep what the
+    loop needs downstream: exit code, coverage, key lines and the output tails.
+    """
+
+    def __init__(self, path: Path, max_bytes: int = VERIFY_CACHE_MAX_BYTES) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.entries: Dict[str, dict] = {}
+        # hits only touch "used": written with the next put() or flush()
+        self._dirty = False
+        # pipeline stages read and write concurrently
+        self._lock = threading.RLock()
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("version") == VERIFY_CACHE_VERSION:
+                self.entries = data.get("entries") or {}
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def get(self, key: str) -> Optional[Tuple[CmdResult, dict]]:
+        with self._lock:
+            e = self.entries.get(key)
+            if not e:
+                return None
+            e["used"] = time.time()
+            self._dirty = True
+        r = CmdResult(
+            e["code"],
+            e.get("stdout", ""),
+            e.get("stderr", ""),
+            key_lines=e.get("key_lines"),
+            markers=set(e.get("markers") or []),
+            total_line=e.get("total_line", ""),
+            coverage=e.get("coverage") if e.get("structured_coverage") else None,
+            coverage_gaps=e.get("coverage_gaps", ""),
+            failure_text=e.get("failure_text", ""),
+        )
+        return r, e
+
+    def put(self, key: str, cmd: str, r: CmdResult, cycle: int) -> None:
+        if r.code in _UNCACHEABLE_CODES:
+            return
+        if r.code in _PYTEST_UNCACHEABLE_CODES and _PYTEST_RE.search(cmd):
+            return
+        cov = (
+            r.coverage
+            if r.coverage is not None
+            else parse_pytest_cov_percent(r.coverage_text())
+        )
+        if r.code != 0:
+            # missing test tool / pytest-cov, or a check whose tool is not installed
+            if classify_verify(cmd, r, cov)[0].startswith("ENV_") or _UNAVAILABLE_RE.search(
+                r.scan_text()
+            ):
+                return
+        entry = {
+            "code": r.code,
+            "coverage": cov,
+            "structured_coverage": r.coverage is not None,
+            "coverage_gaps": r.coverage_gaps,
+            "key_lines": r.key_text(r.scan_text()),
+            "markers": sorted(r.markers),
+            "total_line": r.total_line,
+            "failure_text": r.failure_text[:_CACHED_FAILURE_CHARS],
+            "stdout": tail(r.stdout, STREAM_TAIL_CHARS),
+            "stderr": tail(r.stderr, STREAM_TAIL_CHARS),
+            "cycle": cycle,
+            "created": time.time(),
+            "used": time.time(),
+        }
+        with self._lock:
+            self.entries[key] = entry
+            self._save()
+
+    def flush(self) -> None:
+        """Persist the recency of cache hits (once per cycle, not once per hit)."""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def _save(self) -> None:
+        self._dirty = False
+        sizes = {k: len(json.dumps(e)) + len(k) + 8 for k, e in self.entries.items()}
+        total = sum(sizes.values())
+        for k in sorted(self.entries, key=lambda k: self.entries[k].get("used", 0)):
+            if total <= self.max_bytes or len(self.entries) <= 1:
+                break
+            total -= sizes[k]
+            del self.entries[k]
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        try:
+            tmp.write_text(
+                json.dumps({"version": VERIFY_CACHE_VERSION, "entries": self.entries}),
+                encoding="utf-8",
+            )
+            os.replace(tmp, self.path)
+        except OSError:
+            pass
+
+
+def write_result_logs(r: CmdResult, stdout_path: Path, stderr_path: Path) -> None:
+    """Logs for results that were not streamed (merged shards, cache replays)."""
+    stdout_path.write_text(r.stdout or "", encoding="utf-8")
+    stderr_path.write_text(r.stderr or "", encoding="utf-8")
+
+
+# -------------------------
+# Verification pipeline
+# -------------------------
+
+# Checks that can run next to the tests (tooling detector command keys, python / node)
+CHECK_COMMANDS = {
+    "sanity": ("sanity", None),
+    "lint": ("lint", "lint"),
+    "format": ("format", "prettier"),
+    "types": ("types", "tsc"),
+}
+
+# A failure here makes every other stage's output noise (the code does not compile):
+# slower stages still running are cancelled
+BLOCKING_STAGES = {"sanity"}
+
+# The check could not run at all (tool or script missing); reported, not a failure
+_UNAVAILABLE_RE = re.compile(
+    r"command not found|No module named|Failed to spawn|Missing script|is not recognized",
+    re.IGNORECASE,
+)
+
+
+@dataclass
+class Stage:
+    name: str
+    cmd: str
+
+
+@dataclass
+class StageResult:
+    stage: Stage
+    result: CmdResult
+    seconds: float
+    cached: bool = False
+
+    @property
+    def status(self) -> str:
+        r = self.result
+        if r.code == 0:
+            return "ok"
+        if r.code == CANCELLED_CODE:
+            return "cancelled"
+        if r.code == 124:
+            return "timeout"
+        if r.code == 127 or _UNAVAILABLE_RE.search(r.scan_text()):
+            return "unavailable"
+        return "failed"
+
+
+def format_check_command(cmd: str) -> Optional[str]:
+    """Non-mutating variant of a formatter command, or None if unknown."""
+    if "prettier" in cmd and "--write" in cmd:
+        return cmd.replace("--write", "--check")
+    if "ruff format" in cmd or re.search(r"\bblack\b", cmd):
+        return cmd if "--check" in cmd else f"{cmd} --check"
+    return None
+
+
+def parse_checks(value: str) -> List[str]:
+    names = [n.strip() for n in (value or "").split(",") if n.strip()]
+    if names == ["all"]:
+        return list(CHECK_COMMANDS)
+    unknown = [n for n in names if n not in CHECK_COMMANDS]
+    if unknown:
+        raise SystemExit(
+            f"ERROR: unknown check(s): {', '.join(unknown)} "
+            f"(choose from {', '.join(CHECK_COMMANDS)} or all)"
+        )
+    return names
+
+
+def pipeline_stages(tooling: dict, names: List[str]) -> List[Stage]:
+    """
+    Stage commands from the tooling detector: python commands for a detected
+    python project (or when there is no node project), node ones for a node project.
+    """
+    py = tooling.get("python", {}) or {}
+    node = tooling.get("node", {}) or {}
+    sources: List[Tuple[str, dict, int]] = []
+    if py.get("manager", "unknown") != "unknown" or not node.get("present"):
+        sources.append(("", py.get("commands") or {}, 0))
+    if node.get("present"):
+        sources.append(("node-" if sources else "", node.get("commands") or {}, 1))
+
+    stages: List[Stage] = []
+    for name in names:
+        for prefix, cmds, which in sources:
+            key = CHECK_COMMANDS[name][which]
+            cmd = cmds.get(key) if key else None
+            if cmd and name == "format":
+                cmd = format_check_command(cmd)
+            if cmd:
+                stages.append(Stage(prefix + name, cmd))
+    return stages
+
+
+class VerifyPipeline:
+    """
+    Runs the check stages on a worker pool while the caller runs the tests. A
+    failing blocking stage sets `cancel`, which kills the stages (and the tests,
+    when their run_streamed gets the same event) still running.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        stages: List[Stage],
+        logs_dir: Path,
+        log_prefix: str,
+        *,
+        workers: int,
+        cache: Optional[VerifyCache] = None,
+        cache_key: Optional[Callable[[str], str]] = None,
+        cycle: int = 0,
+        timeout: int = 1800,
+    ) -> None:
+        self.root = root
+        self.stages = stages
+        self.logs_dir = logs_dir
+        self.log_prefix = log_prefix
+        self.cache = cache
+        self.cache_key = cache_key
+        self.cycle = cycle
+        self.timeout = timeout
+        self.cancel = threading.Event()
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers))
+        self._futures = [self._pool.submit(self._run, st) for st in stages]
+
+    def _run(self, st: Stage) -> StageResult:
+        if self.cancel.is_set():
+            return StageResult(st, CmdResult(CANCELLED_CODE, "", "CANCELLED"), 0.0)
+        key = self.cache_key(st.cmd) if self.cache is not None and self.cache_key else ""
+        hit = self.cache.get(key) if self.cache is not None and key else None
+        if hit is not None:
+            res = StageResult(st, hit[0], 0.0, cached=True)
+        else:
+            started = time.monotonic()
+            r = run_streamed(
+                st.cmd,
+                self.root,
+                stdout_path=self.logs_dir / f"{self.log_prefix}_{st.name}_stdout.txt",
+                stderr_path=self.logs_dir / f"{self.log_prefix}_{st.name}_stderr.txt",
+                timeout=self.timeout,
+                echo=False,
+                cancel=self.cancel,
+            )
+            res = StageResult(st, r, time.monotonic() - started)
+            if self.cache is not None and key:
+                self.cache.put(key, st.cmd, r, self.cycle)
+        print(
+            f"   {st.name}: {res.status}"
+            + (" (cached)" if res.cached else f" ({res.seconds:.1f}s)"),
+            flush=True,
+        )
+        if st.name.rsplit("-", 1)[-1] in BLOCKING_STAGES and res.status == "failed":
+            self.cancel.set()
+        return res
+
+    def finish(self) -> List[StageResult]:
+        results = [f.result() for f in self._futures]
+        self._pool.shutdown()
+        return results
+
+
+def checks_summary(results: List[StageResult], budget: int = 3000) -> str:
+    """Per-stage status lines, then the key output of every failed stage."""
+    lines = [
+        f"- {r.stage.name}: {r.status}"
+        + (f" (exit={r.result.code})" if r.status == "failed" else "")
+        + f" -> {r.stage.cmd}"
+        for r in results
+    ]
+    failed = [r for r in results if r.status in ("failed", "timeout")]
+    each = max(500, budget // max(1, len(failed)))
+    for r in failed:
+        # lint / type checkers print one line per finding: the tail is the report
+        out = strip_ansi((r.result.stdout or "") + "\n" + (r.result.stderr or "")).strip()
+        lines.append(f"--- {r.stage.name} ---\n{tail(out, each)}")
+    return "\n".join(lines)
+
+
 # -------------------------
 # Codex prompt building
 # -------------------------
@@ -388,6 +2080,197 @@ def read_request_text(request_path: Path) -> str:
     return request_path.read_text(encoding="utf-8")
 
 
+# Default size budget of the failure digest in the follow-up prompt (~1500 tokens)
+DIGEST_CHARS = 6000
+
+_PYTEST_BLOCK_RE = re.compile(r"^_{3,} (.+?) _{3,}\s*$")
+_SUMMARY_LINE_RE = re.compile(r"^(?:FAILED|ERROR) \S")
+_LOCATION_RE = re.compile(r"^[\w./\\-]+:\d+: \w")
+_EXC_LINE_RE = re.compile(r"^[A-Za-z_][\w.]*(?:Error|Exception|Exit|Interrupt|Failure)\b")
+# Per-block caps: the core (location / > / E lines) and the whole block
+_DIGEST_CORE_CHARS = 1200
+_DIGEST_BLOCK_CHARS = 3000
+
+
+@dataclass
+class DigestBlock:
+    title: str  # test id, "ERROR collecting ...", or "Traceback"
+    full: str
+    core: str
+    error: bool  # collection / setup errors and bare tracebacks rank first
+    tests: List[str] = field(default_factory=list)  # titles sharing this failure
+
+
+def _block_core(lines: List[str]) -> str:
+    """The lines that state the failure: `>` source lines (with context), E lines, locations."""
+    keep: List[int] = []
+    for i, ln in enumerate(lines):
+        if ln.startswith(">"):
+            keep.extend(range(max(0, i - 2), i + 1))
+        elif ln.startswith("E ") or ln == "E" or _LOCATION_RE.match(ln) or _EXC_LINE_RE.match(ln):
+            keep.append(i)
+    if not keep:
+        keep = list(range(max(0, len(lines) - 6), len(lines)))
+    out: List[str] = []
+    last = -2
+    for i in sorted(set(keep)):
+        if i != last + 1 and out:
+            out.append("...")
+        out.append(lines[i])
+        last = i
+    return tail("\n".join(out), _DIGEST_CORE_CHARS)
+
+
+def _block_key(b: DigestBlock) -> str:
+    """
+    What makes two failures the same: the E lines and the raising location, with
+    volatile tokens and all numbers masked (the test's own frames differ per test).
+    """
+    lines = b.full.splitlines()
+    picked = [ln for ln in lines if ln.startswith("E ") or _EXC_LINE_RE.match(ln)]
+    locations = [ln for ln in lines if _LOCATION_RE.match(ln)]
+    if locations:
+        picked.append(locations[-1])
+    if not picked:
+        picked = lines[-3:]
+    return re.sub(r"\d+", "N", normalize_key_text("\n".join(picked)))
+
+
+def _parse_failure_blocks(text: str) -> Tuple[List[str], List[DigestBlock]]:
+    """(short summary lines, per-test / traceback blocks) from pytest output."""
+    summary: List[str] = []
+    blocks: List[DigestBlock] = []
+    section = ""
+    title: Optional[str] = None
+    body: List[str] = []
+
+    def flush() -> None:
+        if title is not None and body:
+            full = "\n".join(body).strip("\n")
+            blocks.append(
+                DigestBlock(
+                    title,
+                    tail(full, _DIGEST_BLOCK_CHARS),
+                    _block_core(body),
+                    error=section == "ERRORS" or title.startswith("ERROR"),
+                )
+            )
+
+    lines = strip_ansi(text).splitlines()
+    i = 0
+    while i < len(lines):
+        ln = lines[i]
+        i += 1
+        m = _PYTEST_SECTION_RE.match(ln)
+        if m:
+            flush()
+            title, body, section = None, [], m.group(1)
+            continue
+        if section == "short test summary info":
+            if _SUMMARY_LINE_RE.match(ln):
+                summary.append(ln.strip())
+            continue
+        m = _PYTEST_BLOCK_RE.match(ln)
+        if m and section in ("FAILURES", "ERRORS"):
+            flush()
+            title, body = m.group(1), []
+            continue
+        if title is not None:
+            body.append(ln)
+            continue
+        # outside pytest sections: bare Python tracebacks (import errors, crashes)
+        if ln.startswith("Traceback (most recent call last)"):
+            tb = [ln]
+            while i < len(lines):
+                nxt = lines[i]
+                i += 1
+                tb.append(nxt)
+                if nxt and not nxt[0].isspace() and not nxt.startswith("Traceback"):
+                    break
+            full = "\n".join(tb)
+            blocks.append(
+                DigestBlock("Traceback", tail(full, _DIGEST_BLOCK_CHARS), _block_core(tb), True)
+            )
+    flush()
+    return summary, blocks
+
+
+def build_failure_digest(r: CmdResult, budget: int = DIGEST_CHARS) -> str:
+    """
+    The failing tests and their most relevant output within `budget` characters.
+
+    Sources: the pytest FAILURES / ERRORS / short summary sections recorded while
+    streaming (else the captured output) plus tracebacks in stderr. Blocks whose
+    normalized core is identical are merged ("same failure in N tests"). Ranking:
+    collection / setup errors and bare tracebacks first, then failures shared by
+    the most tests, then output order. Packing is breadth first: the core of
+    every distinct failure, then whole blocks as far as the budget allows.
+    Returns "" when nothing could be parsed (the caller falls back to output tails).
+    """
+    text = r.failure_text or (r.stdout or "")
+    summary, blocks = _parse_failure_blocks(text + "\n" + (r.stderr or ""))
+    if not summary and not blocks:
+        return ""
+
+    distinct: Dict[str, DigestBlock] = {}
+    for b in blocks:
+        key = _block_key(b)
+        first = distinct.get(key)
+        if first is None:
+            b.tests = [b.title]
+            distinct[key] = b
+        else:
+            first.tests.append(b.title)
+            first.error = first.error or b.error
+    ranked = sorted(
+        enumerate(distinct.values()), key=lambda ib: (not ib[1].error, -len(ib[1].tests), ib[0])
+    )
+    order = [b for _, b in ranked]
+
+    parts: List[str] = []
+    used = 0
+    if summary:
+        head = f"Failing tests ({len(summary)}):"
+        listed: List[str] = []
+        cap = budget // 4
+        size = len(head)
+        for ln in summary:
+            if size + len(ln) + 3 > cap:
+                break
+            listed.append(f"- {ln}")
+            size += len(ln) + 3
+        if len(listed) < len(summary):
+            listed.append(f"- ... and {len(summary) - len(listed)} more")
+        parts.append("\n".join([head] + listed))
+        used = len(parts[0])
+
+    def header(b: DigestBlock) -> str:
+        if len(b.tests) == 1:
+            return f"--- {b.title} ---"
+        others = ", ".join(b.tests[1:4]) + (", ..." if len(b.tests) > 4 else "")
+        return f"--- {b.title} (same failure in {len(b.tests) - 1} more: {others}) ---"
+
+    chosen: Dict[int, str] = {}
+    for i, b in enumerate(order):
+        piece = header(b) + "\n" + b.core
+        if used + len(piece) + 2 <= budget:
+            chosen[i] = piece
+            used += len(piece) + 2
+    for i, b in enumerate(order):
+        if i not in chosen or b.full == b.core:
+            continue
+        piece = header(b) + "\n" + b.full
+        extra = len(piece) - len(chosen[i])
+        if extra > 0 and used + extra <= budget:
+            chosen[i] = piece
+            used += extra
+    parts.extend(chosen[i] for i in sorted(chosen))
+    omitted = len(order) - len(chosen)
+    if omitted:
+        parts.append(f"({omitted} more distinct failures omitted; see the verify logs)")
+    return "\n\n".join(parts)
+
+
 def build_followup_prompt(
     request_path: Path,
     cycle: int,
@@ -396,11 +2279,41 @@ def build_followup_prompt(
     test_stderr: str,
     coverage: Optional[float],
     min_coverage: float,
+    selective: bool = False,
+    checks: str = "",
+    coverage_gaps: str = "",
+    digest: str = "",
 ) -> str:
-    cov_line = (
-        f"Coverage: {coverage:.1f}% (target >= {min_coverage:.1f}%)"
-        if coverage is not None
-        else f"Coverage: (could not parse; target >= {min_coverage:.1f}%)"
+    if selective:
+        cov_line = (
+            "Coverage: not measured (only the tests affected by your changes ran; "
+            f"target >= {min_coverage:.1f}% on the full run)"
+        )
+    elif coverage is not None:
+        cov_line = f"Coverage: {coverage:.1f}% (target >= {min_coverage:.1f}%)"
+    else:
+        cov_line = f"Coverage: (could not parse; target >= {min_coverage:.1f}%)"
+    gaps_block = f"\n{coverage_gaps}\n" if coverage_gaps else ""
+    if digest:
+        logs_block = f"Failure digest:\n{digest}"
+    else:
+        logs_block = f"""Failure logs (tail):
+--- STDOUT ---
+{tail(test_stdout)}
+--- STDERR ---
+{tail(test_stderr)}"""
+    checks_block = (
+        f"""
+Other checks (run in the same cycle):
+{checks}
+"""
+        if checks
+        else ""
+    )
+    fix_line = (
+        "Fix failing tests and checks and/or add tests to reach coverage target."
+        if checks
+        else "Fix failing tests and/or add tests to reach coverage target."
     )
     return f"""You are continuing an implementation defined by:
 - REQUEST: {request_path.as_posix()}
@@ -412,18 +2325,14 @@ Verification command:
 
 Result:
 - {cov_line}
-
+{gaps_block}{checks_block}
 Please:
 1) Read the REQUEST file and follow its constraints (no scope expansion).
-2) Fix failing tests and/or add tests to reach coverage target.
+2) {fix_line}
 3) Keep changes minimal.
 4) STOP (outer loop reruns verification).
 
-Failure logs (tail):
---- STDOUT ---
-{tail(test_stdout)}
---- STDERR ---
-{tail(test_stderr)}
+{logs_block}
 """
 
 
@@ -435,6 +2344,9 @@ def codex_exec(
     ask_for_approval: str,
     output_last_message: Path,
     timeout: int = 3600,
+    stdout_path: Optional[Path] = None,
+    stderr_path: Optional[Path] = None,
+    echo: bool = True,
 ) -> CmdResult:
     output_last_message.parent.mkdir(parents=True, exist_ok=True)
     args = [
@@ -448,7 +2360,219 @@ def codex_exec(
         str(output_last_message),
         "-",
     ]
-    return run_args(args, root, input_text=prompt, timeout=timeout)
+    return run_streamed(
+        args,
+        root,
+        stdout_path=stdout_path,
+        stderr_path=stderr_path,
+        input_text=prompt,
+        timeout=timeout,
+        echo=echo,
+    )
+
+
+# -------------------------
+# Multi-request scheduler
+# -------------------------
+
+# Upper bound for one request's whole loop (each codex exec / verify has its own)
+SCHEDULED_RUN_TIMEOUT = 24 * 3600
+
+_STOP_REASON_RE = re.compile(r"^## Stop reason\n- (.+)$", re.MULTILINE)
+
+
+@dataclass
+class ScheduledRun:
+    request: Path
+    slug: str
+    branch: str
+    worktree: Path
+    logs_dir: Path
+    outcome: str = "PENDING"  # SUCCESS | STOPPED | ERROR
+    detail: str = ""
+    code: Optional[int] = None
+    cycles: int = 0
+    seconds: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "request": self.request.as_posix(),
+            "outcome": self.outcome,
+            "detail": self.detail,
+            "exit_code": self.code,
+            "cycles": self.cycles,
+            "seconds": round(self.seconds, 1),
+            "branch": self.branch,
+            "worktree": self.worktree.as_posix(),
+            "logs_dir": self.logs_dir.as_posix(),
+        }
+
+
+def request_slug(request: Path, taken: Set[str]) -> str:
+    base = re.sub(r"[^A-Za-z0-9._-]+", "-", request.stem).strip("-.") or "request"
+    slug, n = base, 2
+    while slug in taken:
+        slug, n = f"{base}-{n}", n + 1
+    taken.add(slug)
+    return slug
+
+
+def run_in_worktree(root: Path, run: ScheduledRun, child_args: List[str]) -> None:
+    """Create the run's worktree and run this script's loop for its request there."""
+    started = time.monotonic()
+    run.logs_dir.mkdir(parents=True, exist_ok=True)
+    run.worktree.parent.mkdir(parents=True, exist_ok=True)
+    wt = run_args(
+        ["git", "worktree", "add", "-b", run.branch, str(run.worktree), "HEAD"],
+        root,
+        timeout=600,
+    )
+    if wt.code != 0:
+        run.outcome, run.code = "ERROR", wt.code
+        run.detail = "git worktree add failed: " + (wt.stderr or wt.stdout).strip()[-300:]
+        run.seconds = time.monotonic() - started
+        return
+
+    # the worktree's copy of a tracked request file, so Codex reads it from its workspace
+    request = run.request
+    with contextlib.suppress(ValueError):
+        copy = run.worktree / request.relative_to(root)
+        if copy.exists():
+            request = copy
+    cmd = [
+        sys.executable,
+        str(Path(__file__).resolve()),
+        "--request",
+        str(request),
+        "--root",
+        str(run.worktree),
+        "--logs-dir",
+        str(run.logs_dir),
+    ] + child_args
+    r = run_streamed(
+        cmd,
+        run.worktree,
+        stdout_path=run.logs_dir / "loop_stdout.txt",
+        stderr_path=run.logs_dir / "loop_stderr.txt",
+        timeout=SCHEDULED_RUN_TIMEOUT,
+        echo=False,
+    )
+    run.seconds = time.monotonic() - started
+    run.code = r.code
+    run.cycles = len(list(run.logs_dir.glob("cycle_*_codex_stdout.txt")))
+    report = run.logs_dir / "final_report.md"
+    if r.code == 0:
+        run.outcome = "SUCCESS"
+    elif report.exists():
+        m = _STOP_REASON_RE.search(report.read_text(encoding="utf-8", errors="replace"))
+        run.outcome, run.detail = "STOPPED", m.group(1) if m else ""
+    else:
+        last = [ln for ln in (r.stderr or r.stdout or "").splitlines() if ln.strip()]
+        run.outcome, run.detail = "ERROR", last[-1][-300:] if last else f"exit={r.code}"
+
+
+def _fmt_duration(seconds: float) -> str:
+    m, s = divmod(int(seconds), 60)
+    h, m = divmod(m, 60)
+    return f"{h}h{m:02d}m{s:02d}s" if h else f"{m}m{s:02d}s"
+
+
+def build_scheduler_report(runs: List[ScheduledRun], wall: float, jobs: int) -> str:
+    busy = sum(r.seconds for r in runs)
+    done = sum(1 for r in runs if r.outcome == "SUCCESS")
+    rows = "\n".join(
+        f"| {r.slug} | {r.outcome}{(': ' + r.detail) if r.detail else ''} | {r.cycles} "
+        f"| {_fmt_duration(r.seconds)} | `{r.branch}` | {r.logs_dir.as_posix()} |"
+        for r in runs
+    )
+    per_hour = len(runs) * 3600 / wall if wall > 0 else 0.0
+    return f"""# codex-loop SCHEDULER REPORT
+
+## Throughput
+- requests: {len(runs)} (success {done}, other {len(runs) - done})
+- jobs: {jobs}
+- wall time: {_fmt_duration(wall)}
+- summed run time: {_fmt_duration(busy)} (parallel speedup x{busy / wall if wall > 0 else 0:.1f})
+- throughput: {per_hour:.2f} requests/hour
+
+## Requests
+| request | outcome | cycles | time | branch | logs |
+|---|---|---|---|---|---|
+{rows}
+
+Worktrees are kept for review; remove one with `git worktree remove <path>`.
+"""
+
+
+def run_scheduler(
+    root: Path,
+    requests: List[Path],
+    *,
+    jobs: int,
+    worktrees_dir: Path,
+    logs_dir: Path,
+    child_args: List[str],
+) -> int:
+    """
+    Run the loop for several requests at once, each in its own git worktree on a
+    new branch from HEAD (uncommitted changes in `root` are not included).
+    """
+    for req in requests:
+        if not req.exists():
+            raise SystemExit(f"ERROR: request file not found: {req}")
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    run_dir = logs_dir / "runs" / stamp
+    taken: Set[str] = set()
+    runs: List[ScheduledRun] = []
+    for req in requests:
+        slug = request_slug(req, taken)
+        runs.append(
+            ScheduledRun(
+                request=req,
+                slug=slug,
+                branch=f"codex-loop/{slug}-{stamp}",
+                worktree=worktrees_dir / f"{slug}-{stamp}",
+                logs_dir=run_dir / slug,
+            )
+        )
+    jobs = max(1, min(jobs, len(runs)))
+    print(f"=== Scheduler: {len(runs)} requests, {jobs} at a time ===", flush=True)
+
+    finished = 0
+    lock = threading.Lock()
+
+    def work(run: ScheduledRun) -> None:
+        nonlocal finished
+        with lock:
+            print(f"-> start {run.slug} ({run.worktree})", flush=True)
+        run_in_worktree(root, run, child_args)
+        with lock:
+            finished += 1
+            print(
+                f"<- [{finished}/{len(runs)}] {run.slug}: {run.outcome}"
+                f"{(' (' + run.detail + ')') if run.detail else ''} "
+                f"in {_fmt_duration(run.seconds)}, {run.cycles} cycles",
+                flush=True,
+            )
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        list(pool.map(work, runs))
+    wall = time.monotonic() - started
+
+    report = build_scheduler_report(runs, wall, jobs)
+    run_dir.mkdir(parents=True, exist_ok=True)
+    (run_dir / "scheduler_report.md").write_text(report, encoding="utf-8")
+    (run_dir / "scheduler_report.json").write_text(
+        json.dumps(
+            {"wall_seconds": round(wall, 1), "jobs": jobs, "runs": [r.to_dict() for r in runs]},
+            ensure_ascii=False,
+            indent=2,
+        ),
+        encoding="utf-8",
+    )
+    print(report)
+    return 0 if all(r.outcome == "SUCCESS" for r in runs) else 1
 
 
 # -------------------------
@@ -456,9 +2580,14 @@ def codex_exec(
 # -------------------------
 
 
-def main() -> None:
+def main() -> int:
     ap = argparse.ArgumentParser()
-    ap.add_argument("--request", required=True, help="Path to codex_request_*.md")
+    ap.add_argument(
+        "--request",
+        required=True,
+        nargs="+",
+        help="Path to codex_request_*.md (several: run them concurrently in git worktrees)",
+    )
     ap.add_argument("--min-coverage", type=float, default=80.0)
 
     # NEW: separate caps
@@ -480,19 +2609,120 @@ def main() -> None:
         default="blocked",
         help="Count repeats for blocked failures only (default) or for all failures",
     )
+    ap.add_argument(
+        "--repeat-similarity",
+        type=float,
+        default=REPEAT_SIMILARITY,
+        help="Token similarity (0-1) above which two failures count as the same repeat "
+        "(1: only identical normalized signatures)",
+    )
 
     ap.add_argument("--sandbox", default="workspace-write", help="codex exec --sandbox")
     ap.add_argument(
         "--ask-for-approval", default="never", help="codex exec --ask-for-approval"
     )
     ap.add_argument("--root", default=".", help="Repo root (default: .)")
+    ap.add_argument(
+        "--no-echo",
+        dest="echo",
+        action="store_false",
+        help="Do not echo codex / verify output live (it is still written to the logs)",
+    )
+    ap.add_argument(
+        "--selective-tests",
+        action="store_true",
+        help="Run only the tests that import the changed files first (pytest only); "
+        "the full verify still runs before SUCCESS",
+    )
+    ap.add_argument(
+        "--shards",
+        type=int,
+        default=1,
+        help="Split the full pytest verify into N concurrent shards of test files "
+        "with merged coverage (0: one per CPU core)",
+    )
+    ap.add_argument(
+        "--no-verify-cache",
+        dest="verify_cache",
+        action="store_false",
+        help="Always re-run verification, even for a worktree state verified before",
+    )
+    ap.add_argument(
+        "--checks",
+        default="",
+        help="Comma-separated checks run concurrently with the tests: "
+        f"{', '.join(CHECK_COMMANDS)} (format in check mode), or all",
+    )
+    ap.add_argument(
+        "--digest-chars",
+        type=int,
+        default=DIGEST_CHARS,
+        help="Size budget (characters) of the failure digest in follow-up prompts",
+    )
+    ap.add_argument(
+        "--jobs",
+        type=int,
+        default=0,
+        help="With several requests: how many loops run at once (0: one per CPU core)",
+    )
+    ap.add_argument(
+        "--worktrees-dir",
+        default="",
+        help="With several requests: where the per-request worktrees go "
+        "(default: <root>.codex-worktrees next to the repo)",
+    )
+    ap.add_argument(
+        "--logs-dir",
+        default="",
+        help="Logs / cache directory (default: <root>/.cursor/.hook_state/codex_loop)",
+    )
     args = ap.parse_args()
 
     root = Path(args.root).resolve()
-    request_path = Path(args.request).resolve()
+    request_paths = [Path(p).resolve() for p in args.request]
 
     ensure_git_repo(root)
 
+    logs_dir = (
+        Path(args.logs_dir).resolve()
+        if args.logs_dir
+        else root / ".cursor" / ".hook_state" / "codex_loop"
+    )
+    logs_dir.mkdir(parents=True, exist_ok=True)
+
+    if len(request_paths) > 1:
+        child_args = [
+            f"--min-coverage={args.min_coverage}",
+            f"--max-quality-cycles={args.max_quality_cycles}",
+            f"--max-blocked-repeats={args.max_blocked_repeats}",
+            f"--repeat-guard-scope={args.repeat_guard_scope}",
+            f"--repeat-similarity={args.repeat_similarity}",
+            f"--sandbox={args.sandbox}",
+            f"--ask-for-approval={args.ask_for_approval}",
+            f"--shards={args.shards}",
+            f"--checks={args.checks}",
+            f"--digest-chars={args.digest_chars}",
+        ]
+        if not args.echo:
+            child_args.append("--no-echo")
+        if args.selective_tests:
+            child_args.append("--selective-tests")
+        if not args.verify_cache:
+            child_args.append("--no-verify-cache")
+        return run_scheduler(
+            root,
+            request_paths,
+            jobs=args.jobs if args.jobs > 0 else (os.cpu_count() or 1),
+            worktrees_dir=(
+                Path(args.worktrees_dir).resolve()
+                if args.worktrees_dir
+                else root.parent / f"{root.name}.codex-worktrees"
+            ),
+            logs_dir=logs_dir,
+            child_args=child_args,
+        )
+    request_path = request_paths[0]
+
     tooling = load_tooling(root)
     py_cmds = (tooling.get("python", {}) or {}).get("commands", {}) or {}
     node_cmds = (tooling.get("node", {}) or {}).get("commands", {}) or {}
@@ -506,20 +2736,40 @@ def main() -> None:
         else:
             verify_cmd = ""
 
-    logs_dir = root / ".cursor" / ".hook_state" / "codex_loop"
-    logs_dir.mkdir(parents=True, exist_ok=True)
+    # Selective verification: tests command without coverage, plus the affected tests
+    selective_base = py_cmds.get("tests") or verify_cmd
+    graph: Optional[ImportGraph] = None
+    _, selective_scopes = split_pytest_scope(root, selective_base)
+    if args.selective_tests:
+        if "pytest" in selective_base:
+            graph = ImportGraph(root, logs_dir / "import_graph.json")
+        else:
+            print("-> selective tests disabled: verify command is not pytest", flush=True)
+    base_head = git_head(root)
+
+    tooling_sig = tooling_signature(tooling)
+    vcache = VerifyCache(logs_dir / "verify_cache.json") if args.verify_cache else None
+
+    check_stages = pipeline_stages(tooling, parse_checks(args.checks))
+    if check_stages:
+        print(
+            "-> checks: " + ", ".join(f"{st.name} ({st.cmd})" for st in check_stages),
+            flush=True,
+        )
 
     base_request_text = read_request_text(request_path)
 
-    # Counts for repeated failures (fingerprint -> count)
-    repeat_counts: Dict[str, int] = {}
+    # Repeated failures, grouped by normalized, similar signatures
+    failure_groups = FailureGroups(args.repeat_similarity)
+    # Content hashes of dirty files, shared by every worktree fingerprint in this run
+    hash_cache: HashCache = {}
 
     last_followup_prompt = ""
     for cycle in range(1, args.max_quality_cycles + 1):
         print(f"\n=== Cycle {cycle}/{args.max_quality_cycles} ===", flush=True)
 
         # --- Codex exec
-        before_fp = git_worktree_fingerprint(root)
+        before_fp = git_worktree_fingerprint(root, hash_cache)
         out_msg = logs_dir / f"cycle_{cycle:02d}_codex_last_message.md"
         prompt = base_request_text if cycle == 1 else last_followup_prompt
 
@@ -530,15 +2780,11 @@ def main() -> None:
             sandbox=args.sandbox,
             ask_for_approval=args.ask_for_approval,
             output_last_message=out_msg,
+            stdout_path=logs_dir / f"cycle_{cycle:02d}_codex_stdout.txt",
+            stderr_path=logs_dir / f"cycle_{cycle:02d}_codex_stderr.txt",
+            echo=args.echo,
         )
-        after_fp = git_worktree_fingerprint(root)
-
-        (logs_dir / f"cycle_{cycle:02d}_codex_stdout.txt").write_text(
-            cr.stdout, encoding="utf-8"
-        )
-        (logs_dir / f"cycle_{cycle:02d}_codex_stderr.txt").write_text(
-            cr.stderr, encoding="utf-8"
-        )
+        after_fp = git_worktree_fingerprint(root, hash_cache)
 
         codex_category, codex_key = classify_codex(root, cr, before_fp, after_fp)
 
@@ -546,17 +2792,16 @@ def main() -> None:
         if codex_category in BLOCKED_CATEGORIES or (
             args.repeat_guard_scope == "all" and codex_category != "OK"
         ):
-            sig = fingerprint_failure("codex", codex_category, cr.code, codex_key)
-            repeat_counts[sig] = repeat_counts.get(sig, 0) + 1
+            group = failure_groups.observe("codex", codex_category, cr.code, codex_key)
 
             if (
                 codex_category in BLOCKED_CATEGORIES
-                and repeat_counts[sig] >= args.max_blocked_repeats
+                and group.count >= args.max_blocked_repeats
             ):
                 failure = Failure(
                     kind="codex",
                     category=codex_category,
-                    signature=sig,
+                    signature=group.signature,
                     cmd="codex exec",
                     exit_code=cr.code,
                     coverage=None,
@@ -566,27 +2811,26 @@ def main() -> None:
                 report = build_stop_report(
                     reason="REPEATED_BLOCKED_FAILURE",
                     failure=failure,
-                    repeats=repeat_counts[sig],
+                    repeats=group.count,
                     max_repeats=args.max_blocked_repeats,
                     logs_dir=logs_dir,
                     suggestions=suggestions_for_category(codex_category),
                 )
                 (logs_dir / "final_report.md").write_text(report, encoding="utf-8")
                 print(report)
-                return
+                return 1
 
         # --- Verify
         if not verify_cmd.strip():
             # No test command found -> treat as blocked
             cat = "NO_TEST_COMMAND"
             key = "No verify command available"
-            sig = fingerprint_failure("verify", cat, 0, key)
-            repeat_counts[sig] = repeat_counts.get(sig, 0) + 1
+            group = failure_groups.observe("verify", cat, 0, key)
 
             failure = Failure(
                 kind="verify",
                 category=cat,
-                signature=sig,
+                signature=group.signature,
                 cmd="(none)",
                 exit_code=0,
                 coverage=None,
@@ -597,51 +2841,172 @@ def main() -> None:
             report = build_stop_report(
                 reason="BLOCKED_NO_VERIFY_COMMAND",
                 failure=failure,
-                repeats=repeat_counts[sig],
+                repeats=group.count,
                 max_repeats=args.max_blocked_repeats,
                 logs_dir=logs_dir,
                 suggestions=suggestions_for_category(cat),
             )
             (logs_dir / "final_report.md").write_text(report, encoding="utf-8")
             print(report)
-            return
-
-        print(f"-> verify: {verify_cmd}", flush=True)
-        vr = run_shell(verify_cmd, root, timeout=1800)
-        (logs_dir / f"cycle_{cycle:02d}_verify_stdout.txt").write_text(
-            vr.stdout, encoding="utf-8"
-        )
-        (logs_dir / f"cycle_{cycle:02d}_verify_stderr.txt").write_text(
-            vr.stderr, encoding="utf-8"
+            return 1
+
+        # Checks run on the pool while the tests run here
+        pipeline: Optional[VerifyPipeline] = None
+        if check_stages:
+            pipeline = VerifyPipeline(
+                root,
+                check_stages,
+                logs_dir,
+                f"cycle_{cycle:02d}_check",
+                workers=min(len(check_stages), os.cpu_count() or 1),
+                cache=vcache,
+                cache_key=lambda cmd, fp=after_fp: verify_cache_key(fp, cmd, tooling_sig),
+                cycle=cycle,
+            )
+        cancel = pipeline.cancel if pipeline is not None else None
+
+        # A cached result for this exact tree replaces the whole verify step
+        vr: Optional[CmdResult] = None
+        run_cmd = verify_cmd
+        selective = False
+        full_key = verify_cache_key(after_fp, verify_cmd, tooling_sig)
+        stdout_path = logs_dir / f"cycle_{cycle:02d}_verify_stdout.txt"
+        stderr_path = logs_dir / f"cycle_{cycle:02d}_verify_stderr.txt"
+        hit = vcache.get(full_key) if vcache is not None else None
+        if hit is not None:
+            vr, entry = hit
+            print(
+                f"-> verify: unchanged tree, replaying result of cycle {entry.get('cycle')} "
+                f"(exit={vr.code})",
+                flush=True,
+            )
+            write_result_logs(vr, stdout_path, stderr_path)
+
+        # Selective run first; only its failure short-cuts the full verify
+        if vr is None and graph is not None:
+            changed, deleted = git_changed_files(root, base_head)
+            sel = select_tests(graph, changed, deleted, selective_scopes)
+            if sel.tests is None:
+                print(f"-> selective: full run ({sel.reason})", flush=True)
+            else:
+                sel_cmd = selective_command(root, selective_base, sel.tests)
+                sel_key = verify_cache_key(after_fp, sel_cmd, tooling_sig)
+                sel_stdout = logs_dir / f"cycle_{cycle:02d}_verify_selective_stdout.txt"
+                sel_stderr = logs_dir / f"cycle_{cycle:02d}_verify_selective_stderr.txt"
+                hit = vcache.get(sel_key) if vcache is not None else None
+                if hit is not None:
+                    sr, entry = hit
+                    print(
+                        f"-> verify (selective): unchanged tree, replaying result of "
+                        f"cycle {entry.get('cycle')} (exit={sr.code})",
+                        flush=True,
+                    )
+                    write_result_logs(sr, sel_stdout, sel_stderr)
+                else:
+                    print(
+                        f"-> verify (selective, {len(sel.tests)} test files, "
+                        f"{sel.reason}): {sel_cmd}",
+                        flush=True,
+                    )
+                    sr = run_streamed(
+                        sel_cmd,
+                        root,
+                        stdout_path=sel_stdout,
+                        stderr_path=sel_stderr,
+                        timeout=1800,
+                        echo=args.echo,
+                        cancel=cancel,
+                    )
+                    if vcache is not None:
+                        vcache.put(sel_key, sel_cmd, sr, cycle)
+                # 5: pytest collected no tests
+                if sr.code in (0, 5) and not (cancel is not None and cancel.is_set()):
+                    print("-> selected tests pass; running the full verify", flush=True)
+                else:
+                    vr, run_cmd, selective = sr, sel_cmd, True
+
+        # Coverage is read from this XML report; the TOTAL line is only a fallback
+        xml_path = logs_dir / f"cycle_{cycle:02d}_coverage.xml"
+        with contextlib.suppress(OSError):
+            xml_path.unlink()
+        shards = args.shards if args.shards > 0 else (os.cpu_count() or 1)
+        if vr is None and shards > 1 and "pytest" in verify_cmd:
+            print(f"-> verify ({shards} shards): {verify_cmd}", flush=True)
+            vr = run_sharded_verify(
+                root,
+                verify_cmd,
+                shards,
+                logs_dir,
+                f"cycle_{cycle:02d}_verify",
+                cancel=cancel,
+                xml_path=xml_path,
+            )
+            if vr is not None:
+                attach_coverage(vr, xml_path, root, base_head)
+                write_result_logs(vr, stdout_path, stderr_path)
+                if args.echo:
+                    print(vr.stdout, flush=True)
+                if vcache is not None:
+                    vcache.put(full_key, verify_cmd, vr, cycle)
+        if vr is None:
+            print(f"-> verify: {verify_cmd}", flush=True)
+            vr = run_streamed(
+                with_coverage_xml(verify_cmd, xml_path),
+                root,
+                stdout_path=stdout_path,
+                stderr_path=stderr_path,
+                timeout=1800,
+                echo=args.echo,
+                cancel=cancel,
+            )
+            attach_coverage(vr, xml_path, root, base_head)
+            if vcache is not None:
+                vcache.put(full_key, verify_cmd, vr, cycle)
+
+        stage_results = pipeline.finish() if pipeline is not None else []
+        if vcache is not None:
+            vcache.flush()
+        failed_checks = [
+            r for r in stage_results if r.status not in ("ok", "unavailable")
+        ]
+
+        cov = (
+            vr.coverage
+            if vr.coverage is not None
+            else parse_pytest_cov_percent(vr.coverage_text())
         )
-
-        cov = parse_pytest_cov_percent(vr.stdout + "\n" + vr.stderr)
         ok_cov = (cov is not None) and (cov >= args.min_coverage)
         ok_tests = vr.code == 0
 
-        if ok_tests and ok_cov:
+        if ok_tests and ok_cov and not selective and not failed_checks:
             print(
                 f"\n✅ SUCCESS: tests pass and coverage {cov:.1f}% >= {args.min_coverage:.1f}%"
             )
             print(f"Logs: {logs_dir}")
-            return
+            return 0
 
-        verify_category, verify_key = classify_verify(verify_cmd, vr, cov)
+        verify_category, verify_key = classify_verify(run_cmd, vr, cov)
+        if selective:
+            # coverage of a subset says nothing about the target
+            cov = None
 
-        # Repeat guard applies to blocked verify failures
+        # Repeat guard applies to blocked verify failures (not to cancelled runs: their
+        # "failure" is the check's, reported below)
         is_blocked_verify = verify_category in BLOCKED_CATEGORIES
-        if is_blocked_verify or (
-            args.repeat_guard_scope == "all" and verify_category != "OK"
+        if vr.code != CANCELLED_CODE and (
+            is_blocked_verify
+            or (args.repeat_guard_scope == "all" and verify_category != "OK")
         ):
-            sig = fingerprint_failure("verify", verify_category, vr.code, verify_key)
-            repeat_counts[sig] = repeat_counts.get(sig, 0) + 1
+            group = failure_groups.observe(
+                "verify", verify_category, vr.code, verify_key
+            )
 
-            if is_blocked_verify and repeat_counts[sig] >= args.max_blocked_repeats:
+            if is_blocked_verify and group.count >= args.max_blocked_repeats:
                 failure = Failure(
                     kind="verify",
                     category=verify_category,
-                    signature=sig,
-                    cmd=verify_cmd,
+                    signature=group.signature,
+                    cmd=run_cmd,
                     exit_code=vr.code,
                     coverage=cov,
                     stdout_tail=tail(vr.stdout),
@@ -650,33 +3015,44 @@ def main() -> None:
                 report = build_stop_report(
                     reason="REPEATED_BLOCKED_FAILURE",
                     failure=failure,
-                    repeats=repeat_counts[sig],
+                    repeats=group.count,
                     max_repeats=args.max_blocked_repeats,
                     logs_dir=logs_dir,
                     suggestions=suggestions_for_category(verify_category),
                 )
                 (logs_dir / "final_report.md").write_text(report, encoding="utf-8")
                 print(report)
-                return
+                return 1
 
         # Non-blocked failures proceed as normal improvement loop
         reason_parts = []
-        if not ok_tests:
-            reason_parts.append(f"tests failed (exit={vr.code})")
-        if cov is None:
-            reason_parts.append("coverage unknown (could not parse)")
-        elif not ok_cov:
-            reason_parts.append(f"coverage {cov:.1f}% < {args.min_coverage:.1f}%")
+        if vr.code == CANCELLED_CODE:
+            reason_parts.append("tests cancelled (blocking check failed)")
+        elif selective:
+            reason_parts.append(f"selected tests failed (exit={vr.code})")
+            reason_parts.append("coverage not measured (selective run)")
+        else:
+            if not ok_tests:
+                reason_parts.append(f"tests failed (exit={vr.code})")
+            if cov is None:
+                reason_parts.append("coverage unknown (could not parse)")
+            elif not ok_cov:
+                reason_parts.append(f"coverage {cov:.1f}% < {args.min_coverage:.1f}%")
+        reason_parts.extend(f"{r.stage.name} {r.status}" for r in failed_checks)
         print(f"\n❌ VERIFICATION FAILED: {', '.join(reason_parts)}")
 
         last_followup_prompt = build_followup_prompt(
             request_path=request_path,
             cycle=cycle,
-            verify_cmd=verify_cmd,
+            verify_cmd=run_cmd,
             test_stdout=vr.stdout,
             test_stderr=vr.stderr,
             coverage=cov,
             min_coverage=args.min_coverage,
+            selective=selective,
+            checks=checks_summary(stage_results) if failed_checks else "",
+            coverage_gaps="" if selective else vr.coverage_gaps,
+            digest=build_failure_digest(vr, args.digest_chars) if not ok_tests else "",
         )
 
     # Quality cycles exhausted
@@ -704,7 +3080,8 @@ def main() -> None:
     )
     (logs_dir / "final_report.md").write_text(report, encoding="utf-8")
     print(report)
+    return 1
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -15,20 +15,65 @@ ops.py — Cursor運用（Records → Plan → Codex依頼 → 検証 → 引き
   python .cursor/scripts/ops.py uow
   python .cursor/scripts/ops.py validate
   python .cursor/scripts/ops.py handover
+  python .cursor/scripts/ops.py tasks --state open --sort id
+  python .cursor/scripts/ops.py next --parallel 3   # 依存が解けた独立タスクを3件
+  python .cursor/scripts/ops.py archive --days 30   # 古い handover/依頼書/decision を月別 zip へ
+  python .cursor/scripts/ops.py archive --show WP1.2  # アーカイブ済みを ID で表示
+  python .cursor/scripts/ops.py search WP1.2 "レジーム 検証" --kind request,decision
+  python .cursor/scripts/ops.py serve   # 常駐（以降の validate/tasks 等は自動でソケット経由）
+
+ライブラリとして（サブプロセス起動や出力のパース無しで）:
+  sys.path.insert(0, ".cursor/scripts"); import ops
+  ctx = ops.get_repo_context()
+  res = ops.create_codex_request(ctx, ops.RequestSpec(task_id="WP1.6", title="..."))
+  res.written / res.skipped / res.errors, ops.validate_records(ctx).reports[0].problems
+  （init_records / create_codex_request / create_codex_requests_for_open_tasks /
+    create_handover / validate_records。CLI はこれらの結果を表示するだけ。--json で同じ内容を出力）
 
 注意:
 - 既存ファイルは原則上書きしません（--force で上書き）。
+- records の一覧は .cursor/.hook_state/ops/records_index.json にキャッシュします
+  （ディレクトリ mtime で差分更新。無効化: config の records_index_enabled=false）。
+- records_root がネットワーク共有など遅いストレージにある場合は config の records_mirror_dir
+  （例: ".cursor/.hook_state/records_mirror"）を設定すると、読み込み・glob・存在確認を手元の
+  ミラーで済ませます（元ツリーは records_mirror_sync_sec ごとに1回だけ走査して size/mtime を
+  確認し、変わったファイルだけ読むときにコピーし直す）。
+- serve 起動中は validate / codex-request / handover / uow / tasks / search / next を daemon が処理します
+  （停止: serve --stop、一時的に使わない: 環境変数 OPS_NO_DAEMON=1）。
 """
 
 from __future__ import annotations
 
 import argparse
+import contextlib
+import ctypes
+import ctypes.util
 import datetime as _dt
+import fnmatch
+import hashlib
+import heapq
 import json
+import math
+import mmap
 import os
 import re
+import select
 import shutil
-from dataclasses import dataclass
+import socket
+import socketserver
+import stat
+import string
+import struct
+import sys
+import tempfile
+import threading
+import traceback
+import time
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field, fields, replace
+from functools import lru_cache
+from io import StringIO
 from pathlib import Path
 from typing import Any, Dict, Iterable, List, Optional, Tuple
 
@@ -62,8 +107,559 @@ DEFAULT_CONFIG: Dict[str, Any] = {
     "sandbox_default": "workspace-write",
     "approval_policy_default": "never",
     "language": "ja",
+    "records_index_enabled": True,
+    # 遅いストレージ上の records_root を手元にミラーする（空 = 無効）
+    "records_mirror_dir": "",
+    # ミラーが元ツリーを同期し直す間隔（秒）。この間の読み込み・glob は元ストレージに触れない
+    "records_mirror_sync_sec": 30,
+    "placeholder_markers": ["TODO", "（タイトル未設定）", "TASK-UNKNOWN"],
+    # ops.py archive: 古い handover / 依頼書 / decision の退避先と既定の経過日数
+    "archive_dirname": "archive",
+    "archive_after_days": 30,
+    # ops.py next: 同じ親の下の兄弟タスクを番号順に直列化する（WP1.2 は WP1.1 の後）
+    "task_sibling_order": False,
 }
 
+# 状態ファイル置き場（codex_loop.py と同じ .cursor/.hook_state 配下）
+STATE_DIRNAME = ".hook_state"
+RECORDS_INDEX_FILENAME = "records_index.json"
+RECORDS_INDEX_VERSION = 1
+RECORDS_MIRROR_MANIFEST = "records_mirror.json"
+RECORDS_MIRROR_VERSION = 2
+# アーカイブ索引（records/<project>/<archive_dirname>/index.json）
+ARCHIVE_INDEX_FILENAME = "index.json"
+ARCHIVE_INDEX_VERSION = 1
+# mtime の粒度より新しいディレクトリは「次回も再スキャン」扱いにする（秒）
+_INDEX_MTIME_SLACK_SEC = 2.0
+_GLOB_CHARS = ("*", "?", "[")
+VALIDATE_CACHE_FILENAME = "validate_cache.json"
+# チェック内容を変えたら上げる（古いキャッシュ結果を無効化するため）
+VALIDATE_CACHE_VERSION = 3
+TASKS_CACHE_FILENAME = "tasks_cache.json"
+TASKS_CACHE_VERSION = 3
+# 検知結果に載せる行番号の上限（マーカーごと）
+_SCAN_MAX_LINES = 10
+
+
+class RecordsIndex:
+    """
+    records ツリーのディレクトリ一覧を JSON で永続化するインデックス。
+
+    - ディレクトリごとに mtime_ns / ファイル名 / サブディレクトリ名を保持する
+    - 更新はディレクトリの stat 1回で判定し、mtime が変わったものだけ scandir し直す
+    - glob 候補の解決を Path.glob の全走査ではなく、インデックス照会で行う
+    """
+
+    def __init__(self, repo_root: Path, path: Optional[Path] = None) -> None:
+        self.repo_root = repo_root
+        self.path = path
+        # rel_dir(posix, repo_root 相対) -> {"mtime_ns": int, "files": [...], "dirs": [...]}
+        self._dirs: Dict[str, Dict[str, Any]] = {}
+        self._fresh: Dict[str, List[str]] = {}
+        self._dirty = False
+        # --all-projects の並列検証から同時に照会されるため
+        self._lock = threading.RLock()
+
+    @classmethod
+    def load(cls, repo_root: Path, path: Path) -> "RecordsIndex":
+        idx = cls(repo_root, path)
+        data = _load_json(path)
+        if (
+            data
+            and data.get("version") == RECORDS_INDEX_VERSION
+            and data.get("repo_root") == str(repo_root)
+            and isinstance(data.get("dirs"), dict)
+        ):
+            idx._dirs = data["dirs"]
+        return idx
+
+    def save(self) -> None:
+        with self._lock:
+            self._save_locked()
+
+    def _save_locked(self) -> None:
+        if not self._dirty or self.path is None:
+            return
+        payload = {
+            "version": RECORDS_INDEX_VERSION,
+            "repo_root": str(self.repo_root),
+            "dirs": self._dirs,
+        }
+        # インデックスはキャッシュなので、書けなくても本処理は続行する
+        if _save_json_state(self.path, payload):
+            self._dirty = False
+
+    def _scan_dir(self, abs_dir: Path, mtime_ns: int) -> Dict[str, Any]:
+        files: List[str] = []
+        dirs: List[str] = []
+        try:
+            with os.scandir(abs_dir) as it:
+                for e in it:
+                    try:
+                        if e.is_dir():
+                            dirs.append(e.name)
+                        elif e.is_file():
+                            files.append(e.name)
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        # 直近に更新されたディレクトリは同じ mtime のまま再変更され得るので信用しない
+        if time.time() - mtime_ns / 1e9 < _INDEX_MTIME_SLACK_SEC:
+            mtime_ns = -1
+        return {"mtime_ns": mtime_ns, "files": sorted(files), "dirs": sorted(dirs)}
+
+    def _refresh(self, base: str) -> None:
+        fresh: Dict[str, Dict[str, Any]] = {}
+        seen_inodes = set()
+        stack = [base]
+        while stack:
+            rel = stack.pop()
+            abs_dir = self.repo_root / rel
+            try:
+                st = os.stat(abs_dir)
+            except OSError:
+                continue
+            if not stat.S_ISDIR(st.st_mode):
+                continue
+            # シンボリックリンクの循環対策
+            inode = (st.st_dev, st.st_ino)
+            if st.st_ino and inode in seen_inodes:
+                continue
+            seen_inodes.add(inode)
+
+            entry = self._dirs.get(rel)
+            if entry is None or entry.get("mtime_ns") != st.st_mtime_ns:
+                entry = self._scan_dir(abs_dir, st.st_mtime_ns)
+                self._dirty = True
+            fresh[rel] = entry
+            stack.extend(f"{rel}/{d}" for d in entry["dirs"])
+
+        # base 配下で消えたディレクトリを掃除
+        prefix = base + "/"
+        for k in list(self._dirs):
+            if (k == base or k.startswith(prefix)) and k not in fresh:
+                del self._dirs[k]
+                self._dirty = True
+        self._dirs.update(fresh)
+
+    def invalidate(self) -> None:
+        """プロセス内の照会結果を捨て、次回照会時に mtime を再確認させる。"""
+        with self._lock:
+            self._fresh.clear()
+
+    def files_under(self, base: str) -> List[str]:
+        """base（repo_root 相対）配下の全ファイルを repo_root 相対 posix パスで返す。"""
+        with self._lock:
+            if base not in self._fresh:
+                self._refresh(base)
+                prefix = base + "/"
+                out: List[str] = []
+                for rel, entry in self._dirs.items():
+                    if rel == base or rel.startswith(prefix):
+                        out.extend(f"{rel}/{name}" for name in entry["files"])
+                out.sort()
+                self._fresh[base] = out
+            return self._fresh[base]
+
+    def glob(self, pattern: str) -> Optional[List[Path]]:
+        """
+        repo_root 起点の glob をインデックスで解決する（ファイルのみ返す）。
+        インデックスで扱えないパターン（先頭からワイルドカード、末尾 **、絶対パス、..）は None。
+        """
+        parts = pattern.replace("\\", "/").split("/")
+        literal: List[str] = []
+        for part in parts:
+            if any(c in part for c in _GLOB_CHARS):
+                break
+            literal.append(part)
+        if not literal or len(literal) == len(parts) or parts[-1] == "**":
+            return None
+        if ".." in parts or Path(pattern).is_absolute():
+            return None
+        base = "/".join(literal)
+        rx = _glob_to_regex("/".join(parts))
+        return [
+            self.repo_root / rel for rel in self.files_under(base) if rx.match(rel)
+        ]
+
+
+def _glob_to_regex(pattern: str) -> re.Pattern:
+    """Path.glob 相当（** は0個以上のディレクトリ、* と ? は / を跨がない）の正規表現。"""
+    out: List[str] = []
+    parts = pattern.split("/")
+    for i, part in enumerate(parts):
+        last = i == len(parts) - 1
+        if part == "**":
+            out.append(".*" if last else "(?:[^/]+/)*")
+            continue
+        j = 0
+        while j < len(part):
+            c = part[j]
+            if c == "*":
+                out.append("[^/]*")
+            elif c == "?":
+                out.append("[^/]")
+            elif c == "[":
+                k = part.find("]", j + 2)
+                if k == -1:
+                    out.append(re.escape(c))
+                else:
+                    body = part[j + 1 : k]
+                    if body.startswith("!"):
+                        body = "^" + body[1:]
+                    out.append("[" + body.replace("\\", "\\\\") + "]")
+                    j = k
+            else:
+                out.append(re.escape(c))
+            j += 1
+        if not last:
+            out.append("/")
+    flags = re.IGNORECASE if os.name == "nt" else 0
+    return re.compile("".join(out) + r"\Z", flags)
+
+
+@dataclass(frozen=True)
+class RecordStat:
+    """ミラーのマニフェストに記録した元ファイルの (size, mtime)。os.stat_result の代わりに使う。"""
+
+    st_size: int
+    st_mtime_ns: int
+
+    @property
+    def st_mtime(self) -> float:
+        return self.st_mtime_ns / 1e9
+
+
+class RecordsMirror:
+    """
+    records_root（遅いストレージ）の読み取り専用ミラー。
+    - 同期: 元ツリーを1回走査して各ファイルの (size, mtime_ns) とディレクトリ一覧をマニフェストに
+      取り直す。前回の同期から sync_interval 秒以内なら元ストレージには触れない
+    - 読み込み / 一覧 / glob / 存在確認 / stat: マニフェストとローカルコピーだけで答える。
+      ローカルコピーはマニフェストの (size, mtime_ns) と食い違うときだけ元からコピーし直す
+    - 書き込み: ops.py 自身の書き込みは元とミラーの両方に反映する
+    """
+
+    def __init__(
+        self,
+        source: Path,
+        local: Path,
+        manifest_path: Optional[Path],
+        sync_interval: float = 30.0,
+        alias: Optional[Path] = None,
+    ) -> None:
+        self.source = source
+        self.local = local
+        self.manifest_path = manifest_path
+        self.sync_interval = sync_interval
+        # 同じツリーを指す別名（records_root が外部なら、そこへリンクした repo_root/records）
+        self.alias = alias
+        # rel_file -> [size, mtime_ns]（最後の同期時点の元ファイル）
+        self._files: Dict[str, List[int]] = {}
+        # rel_file -> [size, mtime_ns]（ローカルコピーの元になった版）
+        self._copies: Dict[str, List[int]] = {}
+        # rel_dir -> {"files": [...], "dirs": [...]}
+        self._dirs: Dict[str, Dict[str, List[str]]] = {}
+        self._synced_at = 0.0
+        self._dirty = False
+        self._lock = threading.RLock()
+
+    @classmethod
+    def load(
+        cls,
+        source: Path,
+        local: Path,
+        manifest_path: Path,
+        sync_interval: float = 30.0,
+        alias: Optional[Path] = None,
+    ) -> "RecordsMirror":
+        mirror = cls(source, local, manifest_path, sync_interval, alias)
+        data = _load_json(manifest_path)
+        if (
+            data
+            and data.get("version") == RECORDS_MIRROR_VERSION
+            and data.get("source") == str(source)
+            and data.get("local") == str(local)
+        ):
+            mirror._files = data.get("files") or {}
+            mirror._copies = data.get("copies") or {}
+            mirror._dirs = data.get("dirs") or {}
+            mirror._synced_at = float(data.get("synced_at") or 0.0)
+        return mirror
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty or self.manifest_path is None:
+                return
+            payload = {
+                "version": RECORDS_MIRROR_VERSION,
+                "source": str(self.source),
+                "local": str(self.local),
+                "synced_at": self._synced_at,
+                "files": dict(self._files),
+                "copies": dict(self._copies),
+                "dirs": dict(self._dirs),
+            }
+            if _save_json_state(self.manifest_path, payload):
+                self._dirty = False
+
+    def _rel(self, path: Path) -> Optional[str]:
+        for base in (self.source, self.alias):
+            if base is None:
+                continue
+            try:
+                rel = path.relative_to(base).as_posix()
+            except ValueError:
+                continue
+            if ".." in rel.split("/"):
+                return None
+            return rel if rel != "." else ""
+        return None
+
+    def sync(self, force: bool = False) -> None:
+        """元ツリーを走査してマニフェストを取り直す（force でなければ sync_interval ごとに1回）。"""
+        with self._lock:
+            now = time.time()
+            if not force and 0 <= now - self._synced_at < self.sync_interval:
+                return
+            files: Dict[str, List[int]] = {}
+            dirs: Dict[str, Dict[str, List[str]]] = {}
+            seen_inodes = set()
+            stack = [""]
+            while stack:
+                rel = stack.pop()
+                abs_dir = self.source / rel if rel else self.source
+                try:
+                    st = os.stat(abs_dir)
+                except OSError:
+                    continue
+                # シンボリックリンクの循環対策
+                inode = (st.st_dev, st.st_ino)
+                if st.st_ino and inode in seen_inodes:
+                    continue
+                seen_inodes.add(inode)
+                names: List[str] = []
+                subdirs: List[str] = []
+                try:
+                    with os.scandir(abs_dir) as it:
+                        for e in it:
+                            try:
+                                if e.is_dir():
+                                    subdirs.append(e.name)
+                                elif e.is_file():
+                                    est = e.stat()
+                                    child = f"{rel}/{e.name}" if rel else e.name
+                                    files[child] = [est.st_size, est.st_mtime_ns]
+                                    names.append(e.name)
+                            except OSError:
+                                continue
+                except OSError:
+                    continue
+                dirs[rel] = {"files": sorted(names), "dirs": sorted(subdirs)}
+                stack.extend(f"{rel}/{d}" if rel else d for d in subdirs)
+            # 元で消えたファイルのローカルコピーは捨てる
+            for rel in [r for r in self._copies if r not in files]:
+                del self._copies[rel]
+                with contextlib.suppress(OSError):
+                    (self.local / rel).unlink()
+            self._files = files
+            self._dirs = dirs
+            self._synced_at = now
+            self._dirty = True
+
+    def expire(self) -> None:
+        """次の照会で元ツリーを同期し直させる。"""
+        with self._lock:
+            self._synced_at = 0.0
+
+    def stat(self, path: Path) -> Optional[RecordStat]:
+        """ミラー対象外なら None。対象で元に無ければ FileNotFoundError。"""
+        rel = self._rel(path)
+        if rel is None:
+            return None
+        with self._lock:
+            self.sync()
+            sig = self._files.get(rel)
+        if sig is None:
+            raise FileNotFoundError(str(path))
+        return RecordStat(sig[0], sig[1])
+
+    def kind(self, path: Path) -> Optional[str]:
+        """'file' / 'dir' / None（存在しない）。ミラー対象外のパスは呼び出し側で判定する。"""
+        rel = self._rel(path)
+        with self._lock:
+            self.sync()
+            if rel in self._files:
+                return "file"
+            if rel in self._dirs:
+                return "dir"
+        return None
+
+    def covers(self, path: Path) -> bool:
+        return self._rel(path) is not None
+
+    def key(self, path: Path) -> Optional[str]:
+        """records_root 相対のパス（別名経由でも同じ）。ミラー対象外なら None。"""
+        return self._rel(path)
+
+    def is_file(self, path: Path) -> Optional[bool]:
+        """ミラー対象外なら None。"""
+        if not self.covers(path):
+            return None
+        return self.kind(path) == "file"
+
+    def fetch(self, path: Path) -> Path:
+        """
+        読み込み用のパス。ミラー対象外 / コピーできない場合は元のパス、
+        最後の同期で元に無かったファイルは（存在しない）ミラー側のパスを返す。
+        """
+        rel = self._rel(path)
+        if rel is None:
+            return path
+        local = self.local / rel
+        with self._lock:
+            self.sync()
+            sig = self._files.get(rel)
+            if sig is None:
+                return local
+            if self._copies.get(rel) == sig and local.exists():
+                return local
+        try:
+            local.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(path, local)
+        except OSError:
+            return path
+        with self._lock:
+            # コピー中に元が更新されていても、次の同期で size/mtime が変わって取り直される
+            self._copies[rel] = sig
+            self._dirty = True
+        return local
+
+    def list_files(self, directory: Path) -> Optional[List[str]]:
+        """directory 直下のファイル名。ミラー対象外なら None、存在しなければ []。"""
+        return self._list(directory, "files")
+
+    def list_dirs(self, directory: Path) -> Optional[List[str]]:
+        """directory 直下のディレクトリ名。ミラー対象外なら None、存在しなければ []。"""
+        return self._list(directory, "dirs")
+
+    def _list(self, directory: Path, key: str) -> Optional[List[str]]:
+        rel = self._rel(directory)
+        if rel is None:
+            return None
+        with self._lock:
+            self.sync()
+            entry = self._dirs.get(rel)
+            return list(entry[key]) if entry else []
+
+    def glob(self, repo_root: Path, pattern: str) -> Optional[List[Path]]:
+        """
+        repo_root 起点の glob をマニフェストで解決する（ファイルのみ返す）。
+        records_root 配下に収まらないパターンは None。
+        """
+        parts = pattern.replace("\\", "/").split("/")
+        if ".." in parts or Path(pattern).is_absolute():
+            return None
+        for base in (self.source, self.alias):
+            if base is None:
+                continue
+            try:
+                prefix = base.relative_to(repo_root).as_posix().split("/")
+            except ValueError:
+                continue
+            n = len(prefix)
+            if len(parts) > n and [os.path.normcase(p) for p in parts[:n]] == [
+                os.path.normcase(p) for p in prefix
+            ]:
+                break
+        else:
+            return None
+        rx = _glob_to_regex("/".join(parts[n:]))
+        with self._lock:
+            self.sync()
+            return [base / rel for rel in sorted(self._files) if rx.match(rel)]
+
+    def _add_entry(self, rel: str, key: str = "files") -> None:
+        """親ディレクトリの一覧に rel を足す（親が未知なら親も足す）。"""
+        parent, _, name = rel.rpartition("/")
+        entry = self._dirs.get(parent)
+        if entry is None:
+            entry = self._dirs[parent] = {"files": [], "dirs": []}
+            if parent:
+                self._add_entry(parent, "dirs")
+        if name not in entry[key]:
+            entry[key] = sorted(entry[key] + [name])
+
+    def _drop_entry(self, rel: str) -> None:
+        self._files.pop(rel, None)
+        if self._copies.pop(rel, None) is not None:
+            with contextlib.suppress(OSError):
+                (self.local / rel).unlink()
+        parent, _, name = rel.rpartition("/")
+        entry = self._dirs.get(parent)
+        if entry and name in entry["files"]:
+            entry["files"] = [n for n in entry["files"] if n != name]
+
+    def refresh(self, paths: Iterable[Path]) -> None:
+        """変更を検知したファイルだけ元を stat してマニフェストに反映する（watch 用）。"""
+        for path in paths:
+            rel = self._rel(path)
+            if not rel:
+                continue
+            try:
+                st = path.stat()
+            except OSError:
+                sig: Optional[List[int]] = None
+            else:
+                if not stat.S_ISREG(st.st_mode):
+                    continue
+                sig = [st.st_size, st.st_mtime_ns]
+            with self._lock:
+                if sig is None:
+                    self._drop_entry(rel)
+                else:
+                    self._files[rel] = sig
+                    self._add_entry(rel)
+                self._dirty = True
+
+    def forget(self, path: Path) -> None:
+        """ops.py が元のファイルを消した後に呼ぶ。"""
+        rel = self._rel(path)
+        if not rel:
+            return
+        with self._lock:
+            self._drop_entry(rel)
+            self._dirty = True
+
+    def write_through(self, path: Path, content: str) -> None:
+        """
+        元への書き込み後に呼ぶ。書いた内容をそのままミラーにも書き、(size, mtime_ns) を更新する
+        （元からコピーし直さない。元ストレージへのアクセスは stat 1回だけ）。
+        """
+        rel = self._rel(path)
+        if not rel:
+            return
+        sig: Optional[List[int]] = None
+        try:
+            st = path.stat()
+            local = self.local / rel
+            local.parent.mkdir(parents=True, exist_ok=True)
+            local.write_text(content, encoding="utf-8")
+            sig = [st.st_size, st.st_mtime_ns]
+        except OSError:
+            pass
+        with self._lock:
+            if sig is not None:
+                self._files[rel] = sig
+                self._copies[rel] = sig
+                self._add_entry(rel)
+            else:
+                # 次の同期で取り直す
+                self._copies.pop(rel, None)
+                self.expire()
+            self._dirty = True
+
 
 @dataclass(frozen=True)
 class RepoContext:
@@ -71,6 +667,8 @@ class RepoContext:
     cursor_root: Path
     config_path: Path
     config: Dict[str, Any]
+    records_index: Optional[RecordsIndex] = None
+    records_mirror: Optional[RecordsMirror] = None
 
 
 def _now_local(date_format: str) -> str:
@@ -105,6 +703,21 @@ def _load_json(path: Path) -> Optional[Dict[str, Any]]:
     return None
 
 
+def _save_json_state(path: Path, payload: Dict[str, Any]) -> bool:
+    """キャッシュ/インデックス用 JSON を atomic に書く。失敗しても例外にしない。"""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp.write_text(
+            json.dumps(payload, ensure_ascii=False, separators=(",", ":")),
+            encoding="utf-8",
+        )
+        os.replace(tmp, path)
+        return True
+    except OSError:
+        return False
+
+
 def _merge_config(
     base: Dict[str, Any], override: Optional[Dict[str, Any]]
 ) -> Dict[str, Any]:
@@ -123,11 +736,40 @@ def get_repo_context(cwd: Optional[Path] = None) -> RepoContext:
     config_path = cursor_root / "scripts" / "ops_config.json"
     override = _load_json(config_path)
     config = _merge_config(DEFAULT_CONFIG, override)
+    records_index = None
+    if config.get("records_index_enabled", True):
+        records_index = RecordsIndex.load(
+            repo_root, cursor_root / STATE_DIRNAME / "ops" / RECORDS_INDEX_FILENAME
+        )
+    records_mirror = None
+    mirror_dir = str(config.get("records_mirror_dir") or "").strip()
+    if mirror_dir:
+        records_root = repo_root / str(config.get("records_root", "records"))
+        # candidates / @参照の records/... が外部の records_root へのリンク（symlink / junction）なら、
+        # それもミラー対象（リンク自体を読むだけで、リンク先のストレージには触れない）
+        alias: Optional[Path] = None
+        link = repo_root / "records"
+        with contextlib.suppress(OSError, ValueError):
+            target = os.readlink(link)
+            if target.startswith("\\\\?\\"):
+                target = target[4:]
+            target = os.path.normpath(os.path.join(repo_root, target))
+            if os.path.normcase(target) == os.path.normcase(os.path.normpath(records_root)):
+                alias = link
+        records_mirror = RecordsMirror.load(
+            records_root,
+            repo_root / mirror_dir,
+            cursor_root / STATE_DIRNAME / "ops" / RECORDS_MIRROR_MANIFEST,
+            float(config.get("records_mirror_sync_sec", 30)),
+            alias,
+        )
     return RepoContext(
         repo_root=repo_root,
         cursor_root=cursor_root,
         config_path=config_path,
         config=config,
+        records_index=records_index,
+        records_mirror=records_mirror,
     )
 
 
@@ -141,16 +783,28 @@ def _format_candidates(candidates: Iterable[str], project: str) -> List[str]:
     return out
 
 
-def _expand_globs(repo_root: Path, patterns: Iterable[str]) -> List[Path]:
+def _expand_globs(
+    repo_root: Path,
+    patterns: Iterable[str],
+    index: Optional[RecordsIndex] = None,
+    mirror: Optional[RecordsMirror] = None,
+) -> List[Path]:
     results: List[Path] = []
     for pat in patterns:
-        # glob は repo_root 起点
-        results.extend(sorted(repo_root.glob(pat)))
+        # glob は repo_root 起点（ミラー / インデックスがあれば照会で済ませる）
+        hits = mirror.glob(repo_root, pat) if mirror is not None else None
+        if hits is None and index is not None:
+            hits = index.glob(pat)
+        if hits is None:
+            hits = sorted(repo_root.glob(pat))
+        results.extend(hits)
     # 重複排除（順序維持）
     seen = set()
     uniq: List[Path] = []
     for p in results:
-        rp = str(p.resolve())
+        # ミラー対象は records_root 相対パスで比べる（resolve で元ストレージに触れない）
+        key = mirror.key(p) if mirror is not None else None
+        rp = f"records:{key}" if key is not None else str(p.resolve())
         if rp in seen:
             continue
         seen.add(rp)
@@ -158,14 +812,33 @@ def _expand_globs(repo_root: Path, patterns: Iterable[str]) -> List[Path]:
     return uniq
 
 
-def _first_existing(paths: Iterable[Path]) -> Optional[Path]:
+def _is_file(path: Path, mirror: Optional[RecordsMirror] = None) -> bool:
+    """ミラー対象のパスはマニフェストで、それ以外は実ファイルで判定する。"""
+    known = mirror.is_file(path) if mirror is not None else None
+    return path.is_file() if known is None else known
+
+
+def _stat(path: Path, mirror: Optional[RecordsMirror] = None) -> Any:
+    """ミラー対象のパスはマニフェストの RecordStat、それ以外は path.stat()。無ければ OSError。"""
+    st = mirror.stat(path) if mirror is not None else None
+    return path.stat() if st is None else st
+
+
+def _first_existing(
+    paths: Iterable[Path], mirror: Optional[RecordsMirror] = None
+) -> Optional[Path]:
     for p in paths:
-        if p.exists() and p.is_file():
+        if _is_file(p, mirror):
             return p
     return None
 
 
-def _detect_projects(records_root: Path) -> List[str]:
+def _detect_projects(
+    records_root: Path, mirror: Optional[RecordsMirror] = None
+) -> List[str]:
+    names = mirror.list_dirs(records_root) if mirror is not None else None
+    if names is not None:
+        return sorted(n for n in names if not n.startswith("."))
     if not records_root.exists():
         return []
     return sorted(
@@ -185,7 +858,7 @@ def _pick_project(ctx: RepoContext, arg_project: Optional[str]) -> str:
         return cfg_default
     # auto detect if only one project exists
     records_root = ctx.repo_root / str(ctx.config.get("records_root", "records"))
-    projects = _detect_projects(records_root)
+    projects = _detect_projects(records_root, ctx.records_mirror)
     if len(projects) == 1:
         return projects[0]
     # fallback
@@ -202,28 +875,171 @@ def _resolve_plan_and_status(
         ctx.config.get("status_candidates", []), project
     )
 
-    plan_paths = _expand_globs(ctx.repo_root, plan_candidates)
-    status_paths = _expand_globs(ctx.repo_root, status_candidates)
+    plan_paths = _expand_globs(
+        ctx.repo_root, plan_candidates, ctx.records_index, ctx.records_mirror
+    )
+    status_paths = _expand_globs(
+        ctx.repo_root, status_candidates, ctx.records_index, ctx.records_mirror
+    )
+    if ctx.records_index is not None:
+        ctx.records_index.save()
 
-    plan = _first_existing(plan_paths)
-    status = _first_existing(status_paths)
+    plan = _first_existing(plan_paths, ctx.records_mirror)
+    status = _first_existing(status_paths, ctx.records_mirror)
     return plan, status
 
 
-def _read_text(path: Path) -> str:
+def _read_text(path: Path, mirror: Optional[RecordsMirror] = None) -> str:
+    if mirror is not None:
+        path = mirror.fetch(path)
     return path.read_text(encoding="utf-8")
 
 
-def _write_text(path: Path, content: str, force: bool = False) -> None:
+def _write_text(
+    path: Path,
+    content: str,
+    force: bool = False,
+    mirror: Optional[RecordsMirror] = None,
+) -> None:
     path.parent.mkdir(parents=True, exist_ok=True)
     if path.exists() and not force:
         raise FileExistsError(f"File exists: {path}")
     path.write_text(content, encoding="utf-8")
+    if mirror is not None:
+        mirror.write_through(path, content)
+
+
+def _list_md(
+    directory: Path, pattern: str, mirror: Optional[RecordsMirror] = None
+) -> List[Path]:
+    """directory 直下で pattern に合うファイル（ミラーがあれば一覧はミラーから）。"""
+    names = mirror.list_files(directory) if mirror is not None else None
+    if names is not None:
+        return [directory / n for n in names if fnmatch.fnmatchcase(n, pattern)]
+    if not directory.exists():
+        return []
+    return sorted(p for p in directory.glob(pattern) if p.is_file())
+
+
+class TemplateError(ValueError):
+    """テンプレートの構文エラー / プレースホルダ不足。"""
+
+
+class CompiledTemplate:
+    """
+    str.format 形式のテンプレートを (literal, field, spec, conversion) 列に事前分解したもの。
+    読み込み・構文解析は1回だけで、render は連結のみ。
+    """
+
+    def __init__(self, name: str, raw: str) -> None:
+        self.name = name
+        self._parts: List[Tuple[str, Optional[str], str, Optional[str]]] = []
+        names: List[str] = []
+        try:
+            parsed = list(string.Formatter().parse(raw))
+        except ValueError as e:
+            raise TemplateError(f"{name}: テンプレート構文エラー: {e}") from e
+        for literal, field_name, spec, conv in parsed:
+            if field_name is not None:
+                if not field_name or not field_name.isidentifier():
+                    raise TemplateError(
+                        f"{name}: 未対応のプレースホルダ {{{field_name}}}（名前付きのみ対応）"
+                    )
+                if field_name not in names:
+                    names.append(field_name)
+            self._parts.append((literal, field_name, spec or "", conv))
+        self.fields: Tuple[str, ...] = tuple(names)
+
+    def missing(self, keys: Iterable[str]) -> List[str]:
+        provided = set(keys)
+        return [f for f in self.fields if f not in provided]
+
+    def render(self, **kwargs: Any) -> str:
+        missing = self.missing(kwargs)
+        if missing:
+            raise TemplateError(f"{self.name}: 値が未指定のプレースホルダ: {', '.join(missing)}")
+        out: List[str] = []
+        for literal, field_name, spec, conv in self._parts:
+            out.append(literal)
+            if field_name is None:
+                continue
+            val = kwargs[field_name]
+            if conv == "r":
+                val = repr(val)
+            elif conv == "a":
+                val = ascii(val)
+            elif conv == "s":
+                val = str(val)
+            out.append(format(val, spec) if spec else str(val))
+        return "".join(out)
+
+
+class TemplateEngine:
+    """
+    scripts/templates/** をプロセス内で1回だけ読み込み・コンパイルする。
+    構文エラーは load 時に errors へ集約し、プレースホルダ不足は check() で書き込み前に検出する。
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.templates: Dict[str, CompiledTemplate] = {}
+        self.errors: Dict[str, str] = {}
+        # 長寿命プロセス（serve）でテンプレート更新を検知するための mtime
+        self._stamps: Dict[Path, int] = {}
+        if root.exists():
+            for path in sorted(root.rglob("*.md")):
+                name = path.relative_to(root).as_posix()
+                try:
+                    self._stamps[path] = path.stat().st_mtime_ns
+                    self.templates[name] = CompiledTemplate(
+                        name, path.read_text(encoding="utf-8")
+                    )
+                except (OSError, UnicodeDecodeError, TemplateError) as e:
+                    self.errors[name] = str(e)
 
+    def get(self, name: str) -> Optional[CompiledTemplate]:
+        return self.templates.get(name)
 
-def _render_template(template_path: Path, **kwargs: Any) -> str:
-    raw = template_path.read_text(encoding="utf-8")
-    return raw.format(**kwargs)
+    def is_stale(self) -> bool:
+        for path, mtime_ns in self._stamps.items():
+            try:
+                if path.stat().st_mtime_ns != mtime_ns:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def check(self, name: str, keys: Iterable[str]) -> Optional[str]:
+        """name を keys で描画できなければエラーメッセージを返す。"""
+        if name in self.errors:
+            return self.errors[name]
+        tpl = self.templates.get(name)
+        if tpl is None:
+            return f"template not found: {self.root / name}"
+        missing = tpl.missing(keys)
+        if missing:
+            return f"{name}: 値が未指定のプレースホルダ: {', '.join(missing)}"
+        return None
+
+    def render(self, name: str, **kwargs: Any) -> str:
+        err = self.check(name, kwargs)
+        if err:
+            raise TemplateError(err)
+        return self.templates[name].render(**kwargs)
+
+
+@lru_cache(maxsize=4)
+def _load_template_engine(root: str) -> TemplateEngine:
+    return TemplateEngine(Path(root))
+
+
+def _template_engine(ctx: RepoContext) -> TemplateEngine:
+    root = str(ctx.cursor_root / "scripts" / "templates")
+    engine = _load_template_engine(root)
+    if engine.is_stale():
+        _load_template_engine.cache_clear()
+        engine = _load_template_engine(root)
+    return engine
 
 
 def _safe_task_id(task_id: str) -> str:
@@ -243,6 +1059,25 @@ def _compile_task_patterns(patterns: Iterable[str]) -> List[re.Pattern]:
     return out
 
 
+_OPEN_CHECKBOX_RE = re.compile(r"^\s*-\s*\[\s*\]\s+")
+
+
+def _pick_task_from_line(
+    line: str, patterns: List[re.Pattern]
+) -> Tuple[Optional[str], Optional[str]]:
+    """行から task_id を抽出し、タイトルっぽい残りを返す。"""
+    for pat in patterns:
+        m = pat.search(line)
+        if m:
+            task_id = m.group(0)
+            # タイトル: task_id を除いた残り（記号を軽く掃除）
+            title = line.replace(task_id, "")
+            title = re.sub(r"^\s*-\s*\[\s*\]\s*", "", title)
+            title = title.strip(" -—–:\t")
+            return task_id, title or None
+    return None, None
+
+
 def _extract_next_task_from_status(
     status_text: str, patterns: List[re.Pattern]
 ) -> Tuple[Optional[str], Optional[str]]:
@@ -251,28 +1086,11 @@ def _extract_next_task_from_status(
     - 最初に見つかった未チェックの行（- [ ]）を優先
     - 行から task_id を抽出し、タイトルっぽい残りを返す
     """
-    lines = status_text.splitlines()
-    candidate_lines: List[str] = []
-    for ln in lines:
-        if re.search(r"^\s*-\s*\[\s*\]\s+", ln):
-            candidate_lines.append(ln)
-
-    def pick_from_line(line: str) -> Tuple[Optional[str], Optional[str]]:
-        for pat in patterns:
-            m = pat.search(line)
-            if m:
-                task_id = m.group(0)
-                # タイトル: task_id を除いた残り（記号を軽く掃除）
-                title = line.replace(task_id, "")
-                title = re.sub(r"^\s*-\s*\[\s*\]\s*", "", title)
-                title = title.strip(" -—–:\t")
-                return task_id, title or None
-        return None, None
-
-    for ln in candidate_lines:
-        tid, title = pick_from_line(ln)
-        if tid:
-            return tid, title
+    for ln in status_text.splitlines():
+        if _OPEN_CHECKBOX_RE.search(ln):
+            tid, title = _pick_task_from_line(ln, patterns)
+            if tid:
+                return tid, title
 
     # fallback: status 全体から最初にマッチ
     for pat in patterns:
@@ -283,302 +1101,2244 @@ def _extract_next_task_from_status(
     return None, None
 
 
-def cmd_init(ctx: RepoContext, args: argparse.Namespace) -> int:
-    project = _pick_project(ctx, args.project)
-    records_root = ctx.repo_root / str(ctx.config.get("records_root", "records"))
-    proj_root = records_root / project
+def _extract_open_tasks_from_status(
+    status_text: str, patterns: List[re.Pattern]
+) -> List[Tuple[str, Optional[str]]]:
+    """
+    status.md の未チェック行（- [ ]）から、全ての (task_id, title) を出現順に返す。
+    同じ task_id が複数行にあれば最初の行を採用する。
+    """
+    out: List[Tuple[str, Optional[str]]] = []
+    seen = set()
+    for ln in status_text.splitlines():
+        if not _OPEN_CHECKBOX_RE.search(ln):
+            continue
+        tid, title = _pick_task_from_line(ln, patterns)
+        if tid and tid not in seen:
+            seen.add(tid)
+            out.append((tid, title))
+    return out
 
-    # テンプレート配置
-    templates_root = ctx.cursor_root / "scripts" / "templates"
-    records_tpl = templates_root / "records"
 
-    today = _now_local(str(ctx.config.get("date_format", "%Y-%m-%d")))
+@dataclass
+class TaskEntry:
+    task_id: str
+    title: str
+    state: str  # "open" | "done" | "none"（チェックボックス無し: 見出し等）
+    source: str  # "plan" | "status"
+    section: str  # 直近の Markdown 見出し
+    line: int  # 1-based
+    deps: List[str] = field(default_factory=list)  # 明示された依存（depends on: ...）
 
-    if not records_tpl.exists():
-        print(f"[ERR] templates not found: {records_tpl}")
-        print("      このテンプレパックが壊れている可能性があります。")
-        return 2
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "task_id": self.task_id,
+            "title": self.title,
+            "state": self.state,
+            "source": self.source,
+            "section": self.section,
+            "line": self.line,
+            "deps": self.deps,
+        }
 
-    # ディレクトリ作成
-    (proj_root / str(ctx.config.get("codex_requests_dirname", "requests"))).mkdir(
-        parents=True, exist_ok=True
-    )
-    (proj_root / str(ctx.config.get("handover_dirname", "handover"))).mkdir(
-        parents=True, exist_ok=True
-    )
-    (proj_root / str(ctx.config.get("decisions_dirname", "decisions"))).mkdir(
-        parents=True, exist_ok=True
-    )
 
-    # status.md
-    status_dst = proj_root / "status.md"
-    if not status_dst.exists() or args.force:
-        content = _render_template(
-            records_tpl / "status.md", project=project, today=today
-        )
-        _write_text(status_dst, content, force=args.force)
-        print(f"[OK] wrote {status_dst.relative_to(ctx.repo_root)}")
-    else:
-        print(f"[SKIP] exists {status_dst.relative_to(ctx.repo_root)}")
+_HEADING_RE = re.compile(r"^\s{0,3}(#{1,6})\s+(.*?)\s*#*\s*$")
+_CHECKBOX_RE = re.compile(r"^\s*[-*+]\s*\[([ xX])\]\s*")
+_LIST_ITEM_RE = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+")
+# 依存の明示: 「depends on WP1.1」「deps: WP1.1, WP1.2」「依存: WP1.1」など（以降の ID を全て拾う）
+_DEPENDS_RE = re.compile(
+    r"(?:depends\s+on|blocked\s+by|deps?\s*[:：]|requires\s*[:：]|after\s*[:：]"
+    r"|依存\s*[:：]?|前提\s*[:：])\s*",
+    re.IGNORECASE,
+)
 
-    # implementation_plan.md（既存が無い場合のみ）
-    plan_dst = proj_root / f"{project}_implementation_plan.md"
-    if not plan_dst.exists() or args.force:
-        content = _render_template(
-            records_tpl / "implementation_plan.md", project=project, today=today
-        )
-        _write_text(plan_dst, content, force=args.force)
-        print(f"[OK] wrote {plan_dst.relative_to(ctx.repo_root)}")
-    else:
-        print(f"[SKIP] exists {plan_dst.relative_to(ctx.repo_root)}")
-
-    # decision template
-    decision_tpl_dst = (
-        proj_root
-        / str(ctx.config.get("decisions_dirname", "decisions"))
-        / "_TEMPLATE_decision.md"
-    )
-    if not decision_tpl_dst.exists() or args.force:
-        content = _render_template(
-            records_tpl / "decision.md",
-            project=project,
-            decision_id="DEC-XXXX",
-            today=today,
-        )
-        _write_text(decision_tpl_dst, content, force=args.force)
-        print(f"[OK] wrote {decision_tpl_dst.relative_to(ctx.repo_root)}")
-    else:
-        print(f"[SKIP] exists {decision_tpl_dst.relative_to(ctx.repo_root)}")
 
-    # handover template
-    handover_tpl_dst = (
-        proj_root
-        / str(ctx.config.get("handover_dirname", "handover"))
-        / "_TEMPLATE_handover.md"
-    )
-    if not handover_tpl_dst.exists() or args.force:
-        content = _render_template(
-            records_tpl / "handover.md", project=project, today=today
+def _parse_tasks(text: str, source: str, patterns: List[re.Pattern]) -> List[TaskEntry]:
+    """
+    plan / status の Markdown から Task ID を含む行（見出し・チェックボックス・箇条書き）を抽出する。
+    - section は直前の見出し（Task ID を含む見出し自身はその親見出し）
+    - 1行に複数 ID がある場合は task_id_patterns の優先順で最初の1つ
+    - 「depends on: ID...」以降の ID は依存として deps に入れる。行頭が依存の記述だけの行
+      （タスク直下の「- depends on: WP1.1」等）は直前のタスクの deps に足す
+    """
+    if not patterns:
+        return []
+    # 大半の行は ID を含まないので、まず1本の正規表現でふるい落とす
+    any_id = re.compile("|".join(f"(?:{p.pattern})" for p in patterns))
+    out: List[TaskEntry] = []
+    section = ""
+    for lineno, ln in enumerate(text.splitlines(), start=1):
+        hm = _HEADING_RE.match(ln)
+        first_id = any_id.search(ln)
+        if hm and first_id is None:
+            section = hm.group(2)
+            continue
+        if first_id is None:
+            continue
+        deps: List[str] = []
+        dm = _DEPENDS_RE.search(ln)
+        if dm:
+            deps = any_id.findall(ln, dm.end())
+            if not deps:
+                dm = None
+            elif dm.start() < first_id.start():
+                if out:
+                    out[-1].deps.extend(d for d in deps if d not in out[-1].deps)
+                continue
+        head = ln[: dm.start()] if dm else ln
+        cm = _CHECKBOX_RE.match(ln)
+        if not (hm or cm or _LIST_ITEM_RE.match(ln)):
+            continue
+        tid, _ = _pick_task_from_line(head, patterns)
+        if not tid:
+            continue
+        if hm:
+            body = _HEADING_RE.match(head.rstrip() or ln).group(2)
+            state = "none"
+        elif cm:
+            body = head[cm.end() :]
+            state = "done" if cm.group(1) in "xX" else "open"
+        else:
+            body = _LIST_ITEM_RE.sub("", head, count=1)
+            state = "none"
+        title = body.replace(tid, "", 1)
+        title = re.sub(r"^\s*(?:Task|タスク)\s*[:：]\s*", "", title.strip(), flags=re.IGNORECASE)
+        title = title.strip(" -—–:：*`\t([（")
+        out.append(
+            TaskEntry(
+                task_id=tid,
+                title=title,
+                state=state,
+                source=source,
+                section=section,
+                line=lineno,
+                deps=[d for d in dict.fromkeys(deps) if d != tid],
+            )
         )
-        _write_text(handover_tpl_dst, content, force=args.force)
-        print(f"[OK] wrote {handover_tpl_dst.relative_to(ctx.repo_root)}")
-    else:
-        print(f"[SKIP] exists {handover_tpl_dst.relative_to(ctx.repo_root)}")
+    return out
 
-    print("\nNext:")
-    print("  - status.md の Now/Next を埋める")
-    print(
-        "  - 実装計画を {project}_implementation_plan.md に書く（Task: WP1.1 ... の形式推奨）"
-    )
-    return 0
 
+class TaskModelCache:
+    """
+    plan / status のパース結果（TaskEntry 列）のキャッシュ。
+    (path, size, mtime_ns, task_id_patterns) が一致すればファイルを読まずに再利用する。
+    """
 
-def cmd_codex_request(ctx: RepoContext, args: argparse.Namespace) -> Tuple[int, Optional[Path]]:
-    project = _pick_project(ctx, args.project)
-    plan_path, status_path = _resolve_plan_and_status(ctx, project)
+    def __init__(self, path: Optional[Path] = None, signature: str = "") -> None:
+        self.path = path
+        self.signature = signature
+        # abs_path -> {"size", "mtime_ns", "source", "rows": [[task_id, title, state, section, line, deps], ...]}
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        # project -> {"key": [...], "graph": TaskGraph.to_dict()}
+        self._graphs: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
 
-    records_root = ctx.repo_root / str(ctx.config.get("records_root", "records"))
-    proj_root = records_root / project
-    requests_dir = proj_root / str(ctx.config.get("codex_requests_dirname", "requests"))
-    requests_dir.mkdir(parents=True, exist_ok=True)
+    @classmethod
+    def load(cls, path: Path, signature: str = "") -> "TaskModelCache":
+        cache = cls(path, signature)
+        data = _load_json(path)
+        if (
+            data
+            and data.get("version") == TASKS_CACHE_VERSION
+            and data.get("signature") == signature
+            and isinstance(data.get("entries"), dict)
+        ):
+            cache._entries = data["entries"]
+            cache._graphs = data.get("graphs") or {}
+        return cache
 
-    patterns = _compile_task_patterns(ctx.config.get("task_id_patterns", []))
+    def save(self) -> None:
+        if not self._dirty or self.path is None:
+            return
+        with self._lock:
+            payload = {
+                "version": TASKS_CACHE_VERSION,
+                "signature": self.signature,
+                "entries": dict(self._entries),
+                "graphs": dict(self._graphs),
+            }
+        if _save_json_state(self.path, payload):
+            self._dirty = False
 
-    task_id = args.task_id
-    title = args.title
+    def graph(self, project: str, key: List[Any]) -> Optional[Dict[str, Any]]:
+        """plan / status の署名 key が一致すれば、前回組み立てた依存グラフを返す。"""
+        with self._lock:
+            entry = self._graphs.get(project)
+        if entry and entry.get("key") == key:
+            return entry["graph"]
+        return None
 
-    # task_id 未指定なら status から拾う
-    if not task_id and status_path and status_path.exists():
-        tid, maybe_title = _extract_next_task_from_status(
-            _read_text(status_path), patterns
-        )
-        task_id = tid
-        if not title:
-            title = maybe_title
+    def put_graph(self, project: str, key: List[Any], graph: Dict[str, Any]) -> None:
+        with self._lock:
+            self._graphs[project] = {"key": key, "graph": graph}
+            self._dirty = True
 
-    if not task_id:
-        task_id = "TASK-UNKNOWN"
+    def rows(
+        self,
+        path: Path,
+        source: str,
+        patterns: List[re.Pattern],
+        mirror: Optional[RecordsMirror] = None,
+    ) -> List[List[Any]]:
+        """[task_id, title, state, section, line, deps] の配列を返す（未変更ならファイルを読まない）。"""
+        key = str(path)
+        try:
+            st = _stat(path, mirror)
+        except OSError:
+            return []
+        with self._lock:
+            entry = self._entries.get(key)
+        if (
+            entry
+            and entry.get("source") == source
+            and entry.get("size") == st.st_size
+            and entry.get("mtime_ns") == st.st_mtime_ns
+        ):
+            return entry["rows"]
 
-    if not title:
-        title = "（タイトル未設定）"
+        # 大きな plan でも読み込みが速いよう、dict ではなく配列で持つ
+        rows = [
+            [t.task_id, t.title, t.state, t.section, t.line, t.deps]
+            for t in _parse_tasks(_read_text(path, mirror), source, patterns)
+        ]
+        mtime_ns = st.st_mtime_ns
+        if time.time() - mtime_ns / 1e9 < _INDEX_MTIME_SLACK_SEC:
+            mtime_ns = -1
+        with self._lock:
+            self._entries[key] = {
+                "size": st.st_size,
+                "mtime_ns": mtime_ns,
+                "source": source,
+                "rows": rows,
+            }
+            self._dirty = True
+        return rows
 
-    safe_tid = _safe_task_id(task_id)
-    filename_tmpl = str(
-        ctx.config.get("codex_request_filename_template", "codex_request_{task_id}.md")
-    )
-    out_name = filename_tmpl.format(task_id=safe_tid)
-    out_path = requests_dir / out_name
 
-    date_format = str(ctx.config.get("date_format", "%Y-%m-%d"))
-    today = _now_local(date_format)
+@dataclass
+class TaskModel:
+    """plan / status のパース済みタスク。照会は配列のままフィルタし、結果だけ TaskEntry にする。"""
 
-    title_line = str(
-        ctx.config.get(
-            "codex_request_title_template", "Codex 依頼: {task_id} — {title}"
-        )
-    ).format(task_id=task_id, title=title)
+    plan_path: Optional[Path]
+    status_path: Optional[Path]
+    plan_rows: List[List[Any]] = field(default_factory=list)
+    status_rows: List[List[Any]] = field(default_factory=list)
 
-    # 参照パス（markdown の @path 用に repo_root 相対へ）
-    rel_plan = (
-        plan_path.relative_to(ctx.repo_root).as_posix()
-        if plan_path
-        else f"records/{project}/{project}_implementation_plan.md"
-    )
-    rel_status = (
-        status_path.relative_to(ctx.repo_root).as_posix()
-        if status_path
-        else f"records/{project}/status.md"
-    )
+    def query(
+        self,
+        source: str = "all",
+        state: str = "any",
+        id_prefix: Optional[str] = None,
+        section: Optional[str] = None,
+        grep: Optional[str] = None,
+    ) -> List[TaskEntry]:
+        sec_needle = section.lower() if section else None
+        grep_needle = grep.lower() if grep else None
+        out: List[TaskEntry] = []
+        for src, rows in (("plan", self.plan_rows), ("status", self.status_rows)):
+            if source not in ("all", src):
+                continue
+            for tid, title, st, sec, line, deps in rows:
+                if state != "any" and st != state:
+                    continue
+                if id_prefix and not tid.startswith(id_prefix):
+                    continue
+                if sec_needle and sec_needle not in sec.lower():
+                    continue
+                if grep_needle and not (
+                    grep_needle in title.lower() or grep_needle in tid.lower()
+                ):
+                    continue
+                out.append(TaskEntry(tid, title, st, src, sec, line, list(deps)))
+        return out
 
-    # テンプレート
-    tpl_path = ctx.cursor_root / "scripts" / "templates" / "codex_request.md"
-    if not tpl_path.exists():
-        print(f"[ERR] template not found: {tpl_path}")
-        return 2, None
 
-    content = _render_template(
-        tpl_path,
-        title=title_line,
-        today=today,
-        approval_status="未承認",
-        implementation_plan_path=rel_plan,
-        status_path=rel_status,
-        purpose=args.purpose or "TODO: このUoWの目的を1〜3行で",
-        non_goals=args.non_goals or "- TODO: やらないこと",
-        repo_root=".",
-        sandbox=str(ctx.config.get("sandbox_default", "workspace-write")),
-        approval_policy=str(ctx.config.get("approval_policy_default", "never")),
-        network_access=str(ctx.config.get("network_access_default", "disabled")),
-        shell_policy="禁止"
-        if str(ctx.config.get("shell_execution_policy_default", "forbid")) == "forbid"
-        else "許可（必要な場合のみ）",
-        editable_files=args.editable_files
-        or "- TODO: 編集対象ファイルを列挙（相対パス）",
-        reference_files=args.reference_files or f"- @{rel_plan}\n- @{rel_status}",
-        tasks=args.tasks or "- TODO: 実装ステップを箇条書き",
-        dod=args.dod or "- [ ] TODO: 受け入れ条件（チェックリスト）",
-        tests=args.tests or "- TODO: テスト追加/更新方針（TDD推奨）",
+def _task_sort_key(task_id: str) -> Tuple[Any, ...]:
+    """WP1.10 が WP1.9 の後に来るよう、数字部分を数値として比較する。"""
+    return tuple(
+        (0, int(tok), "") if tok.isdigit() else (1, 0, tok)
+        for tok in re.findall(r"\d+|\D+", task_id)
     )
 
-    try:
-        _write_text(out_path, content, force=args.force)
-    except FileExistsError:
-        print(
-            f"[SKIP] exists {out_path.relative_to(ctx.repo_root)}  (use --force to overwrite)"
-        )
-        return 0, out_path
 
-    print(f"[OK] wrote {out_path.relative_to(ctx.repo_root)}")
-    print("\nHints:")
-    print("  - 依頼書の TODO を埋めてから Codex CLI に渡してください。")
-    print("  - 自動ループ（推奨）: python .cursor/scripts/codex_loop.py --request <path> --min-coverage 80")
-    return 0, out_path
+@dataclass
+class TaskNode:
+    task_id: str
+    title: str
+    state: str  # plan / status を合わせた状態（どちらかで done なら done）
+    order: int  # plan → status の出現順（同順位の並びに使う）
+    parent: Optional[str] = None
+    children: List[str] = field(default_factory=list)
+    deps: List[str] = field(default_factory=list)  # 実効依存（明示 + 兄弟順 + 祖先の依存）
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "task_id": self.task_id,
+            "title": self.title,
+            "state": self.state,
+            "parent": self.parent,
+            "children": self.children,
+            "deps": self.deps,
+        }
 
-def _scan_codex_requests(requests_dir: Path) -> List[Path]:
-    if not requests_dir.exists():
-        return []
-    return sorted([p for p in requests_dir.glob("codex_request_*.md") if p.is_file()])
 
+def _task_parent(task_id: str, known: Dict[str, Any]) -> Optional[str]:
+    """番号の親（WP1.2.3 → WP1.2 → WP1、P1-T2.1 → P1-T2）のうち、実在する最も近いもの。"""
+    cur = task_id
+    while True:
+        m = re.match(r"^(.*\d)[.\-][^.\-]+$", cur)
+        if not m:
+            return None
+        cur = m.group(1)
+        if cur in known:
+            return cur
 
-def cmd_handover(ctx: RepoContext, args: argparse.Namespace) -> int:
-    project = _pick_project(ctx, args.project)
-    plan_path, status_path = _resolve_plan_and_status(ctx, project)
 
-    records_root = ctx.repo_root / str(ctx.config.get("records_root", "records"))
-    proj_root = records_root / project
-    handover_dir = proj_root / str(ctx.config.get("handover_dirname", "handover"))
-    handover_dir.mkdir(parents=True, exist_ok=True)
+class TaskGraph:
+    """
+    plan / status のタスクから組み立てた依存グラフ。
+    - 番号の階層: 親は子が全て終わるまで完了しない（親自身は実行単位にしない）
+    - 明示の依存: depends on / 依存: 等。祖先の依存は子孫にも効く
+    - sibling_order=True なら同じ親の下の前の番号の兄弟にも依存する
+    """
 
-    date_format = str(ctx.config.get("date_format", "%Y-%m-%d"))
-    today = _now_local(date_format)
+    def __init__(self) -> None:
+        self.nodes: Dict[str, TaskNode] = {}
+        # task_id -> グラフに無い依存先
+        self.unknown: Dict[str, List[str]] = {}
+        # 循環に含まれる未完了タスク（ready にならない）
+        self.cyclic: List[str] = []
+        # 未完了タスクのトポロジカル順
+        self.topo: List[str] = []
+        self._done: Dict[str, bool] = {}
 
-    out_path = handover_dir / f"handover_{today}.md"
+    @classmethod
+    def build(cls, model: TaskModel, sibling_order: bool = False) -> "TaskGraph":
+        g = cls()
+        explicit: Dict[str, List[str]] = {}
+        for rows in (model.plan_rows, model.status_rows):
+            for tid, title, st, _sec, _line, deps in rows:
+                node = g.nodes.get(tid)
+                if node is None:
+                    node = g.nodes[tid] = TaskNode(tid, title, st, len(g.nodes))
+                elif st == "done" or (st == "open" and node.state == "none"):
+                    node.state = st
+                if not node.title and title:
+                    node.title = title
+                explicit.setdefault(tid, []).extend(deps)
 
-    tpl_path = ctx.cursor_root / "scripts" / "templates" / "records" / "handover.md"
-    if not tpl_path.exists():
-        print(f"[ERR] template not found: {tpl_path}")
-        return 2
+        for tid, node in g.nodes.items():
+            node.parent = _task_parent(tid, g.nodes)
+            if node.parent:
+                g.nodes[node.parent].children.append(tid)
+        if sibling_order:
+            # 番号上の親（実在しなくてもよい）ごとにまとめる: WP1.x と WP2.x は別系列
+            groups: Dict[str, List[str]] = {}
+            for tid in g.nodes:
+                m = re.match(r"^(.*\d)[.\-][^.\-]+$", tid)
+                groups.setdefault(m.group(1) if m else "", []).append(tid)
+            for sibs in groups.values():
+                sibs.sort(key=_task_sort_key)
+                for prev, cur in zip(sibs, sibs[1:]):
+                    explicit[cur].append(prev)
 
-    codex_requests_dir = str(ctx.config.get("codex_requests_dirname", "requests"))
-    content = _render_template(
-        tpl_path, project=project, today=today, codex_requests_dir=codex_requests_dir
-    )
+        # 祖先の依存を子孫へ。祖先・子孫への依存は階層と矛盾するので捨てる
+        def lineage(tid: str) -> List[str]:
+            out = []
+            cur: Optional[str] = tid
+            while cur:
+                out.append(cur)
+                cur = g.nodes[cur].parent
+            return out
 
-    try:
-        _write_text(out_path, content, force=args.force)
-    except FileExistsError:
-        print(
-            f"[SKIP] exists {out_path.relative_to(ctx.repo_root)}  (use --force to overwrite)"
+        for tid, node in g.nodes.items():
+            chain = lineage(tid)
+            deps: List[str] = []
+            for anc in chain:
+                for d in explicit.get(anc, []):
+                    if d in g.nodes and tid in lineage(d):
+                        continue
+                    if d not in chain and d not in deps:
+                        deps.append(d)
+            node.deps = deps
+            missing = [d for d in deps if d not in g.nodes]
+            if missing:
+                g.unknown[tid] = missing
+        g._order()
+        return g
+
+    def is_done(self, tid: str) -> bool:
+        """自身が done、または子があり全て done。"""
+        if tid in self._done:
+            return self._done[tid]
+        node = self.nodes.get(tid)
+        if node is None:
+            return False
+        done = node.state == "done" or (
+            bool(node.children) and all(self.is_done(c) for c in node.children)
         )
-        return 0
+        self._done[tid] = done
+        return done
 
-    print(f"[OK] wrote {out_path.relative_to(ctx.repo_root)}")
+    def _order(self) -> None:
+        """未完了タスクを Kahn 法で並べる（同順位は出現順）。並べられなかったものが循環。"""
+        pending = [t for t in self.nodes if not self.is_done(t)]
+        pend = set(pending)
+        indeg = {t: 0 for t in pending}
+        succ: Dict[str, List[str]] = {t: [] for t in pending}
 
-    # 参照情報も出す
-    if plan_path:
-        print(f"  plan   : {plan_path.relative_to(ctx.repo_root)}")
-    if status_path:
-        print(f"  status : {status_path.relative_to(ctx.repo_root)}")
-    return 0
+        def edge(a: str, b: str) -> None:
+            succ[a].append(b)
+            indeg[b] += 1
 
+        for t in pending:
+            node = self.nodes[t]
+            for d in node.deps:
+                if d in pend:
+                    edge(d, t)
+            for c in node.children:
+                if c in pend:
+                    edge(c, t)
+        heap = [(self.nodes[t].order, t) for t in pending if indeg[t] == 0]
+        heapq.heapify(heap)
+        topo: List[str] = []
+        while heap:
+            _, t = heapq.heappop(heap)
+            topo.append(t)
+            for nxt in succ[t]:
+                indeg[nxt] -= 1
+                if indeg[nxt] == 0:
+                    heapq.heappush(heap, (self.nodes[nxt].order, nxt))
+        self.topo = topo
+        placed = set(topo)
+        self.cyclic = sorted(
+            (t for t in pending if t not in placed), key=lambda t: self.nodes[t].order
+        )
 
-def cmd_validate(ctx: RepoContext, args: argparse.Namespace) -> int:
-    project = _pick_project(ctx, args.project)
-    plan_path, status_path = _resolve_plan_and_status(ctx, project)
+    def ready(self) -> List[TaskNode]:
+        """今すぐ着手できる葉タスク（依存が全て完了）をトポロジカル順に。互いに独立。"""
+        cyc = set(self.cyclic)
+        out = []
+        for t in self.topo:
+            node = self.nodes[t]
+            if node.children or t in cyc or t in self.unknown:
+                continue
+            if all(self.is_done(d) for d in node.deps):
+                out.append(node)
+        return out
 
-    records_root = ctx.repo_root / str(ctx.config.get("records_root", "records"))
-    proj_root = records_root / project
-    requests_dir = proj_root / str(ctx.config.get("codex_requests_dirname", "requests"))
+    def blocked_by(self, tid: str) -> List[str]:
+        return [d for d in self.nodes[tid].deps if not self.is_done(d)]
 
-    problems: List[str] = []
-    warnings: List[str] = []
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "nodes": [
+                [n.task_id, n.title, n.state, n.parent, n.children, n.deps]
+                for n in sorted(self.nodes.values(), key=lambda n: n.order)
+            ],
+            "unknown": self.unknown,
+            "cyclic": self.cyclic,
+            "topo": self.topo,
+        }
 
-    if not plan_path:
-        problems.append("実装計画が見つかりません（config の candidates を確認）")
-    if not status_path:
-        problems.append("status.md が見つかりません（config の candidates を確認）")
-
-    # requests
-    reqs = _scan_codex_requests(requests_dir)
-    if not reqs:
-        warnings.append("Codex依頼書（codex_request_*.md）がまだありません")
-
-    # status TODO 検知
-    if status_path and status_path.exists():
-        st = _read_text(status_path)
-        if "TODO" in st:
-            warnings.append(
-                "status.md に TODO が残っています（運用開始前に埋める推奨）"
-            )
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TaskGraph":
+        g = cls()
+        for i, (tid, title, st, parent, children, deps) in enumerate(data["nodes"]):
+            g.nodes[tid] = TaskNode(tid, title, st, i, parent, children, deps)
+        g.unknown = data.get("unknown") or {}
+        g.cyclic = data.get("cyclic") or []
+        g.topo = data.get("topo") or []
+        return g
 
-    # plan TODO 検知
-    if plan_path and plan_path.exists():
-        pl = _read_text(plan_path)
-        if "TODO" in pl:
-            warnings.append("実装計画に TODO が残っています（必要に応じて）")
-
-    # request TODO 検知（最新3件だけ）
-    for rp in reqs[-3:]:
-        txt = _read_text(rp)
-        if "TODO" in txt or "（タイトル未設定）" in txt or "TASK-UNKNOWN" in txt:
-            warnings.append(
-                f"{rp.relative_to(ctx.repo_root)} に未埋めのプレースホルダが残っています"
-            )
 
-    # 出力
-    if problems:
+def _task_cache(ctx: RepoContext) -> TaskModelCache:
+    raw_patterns = [str(p) for p in ctx.config.get("task_id_patterns", [])]
+    return TaskModelCache.load(
+        ctx.cursor_root / STATE_DIRNAME / "ops" / TASKS_CACHE_FILENAME,
+        "\x1f".join(raw_patterns),
+    )
+
+
+def _load_task_model(
+    ctx: RepoContext, project: str, cache: Optional[TaskModelCache] = None
+) -> TaskModel:
+    """project の plan / status をキャッシュ経由でパースする（cache を渡した場合は保存しない）。"""
+    plan_path, status_path = _resolve_plan_and_status(ctx, project)
+    patterns = _compile_task_patterns(ctx.config.get("task_id_patterns", []))
+    own_cache = cache is None
+    if cache is None:
+        cache = _task_cache(ctx)
+    model = TaskModel(plan_path=plan_path, status_path=status_path)
+    if plan_path:
+        model.plan_rows = cache.rows(plan_path, "plan", patterns, ctx.records_mirror)
+    if status_path:
+        model.status_rows = cache.rows(status_path, "status", patterns, ctx.records_mirror)
+    if own_cache:
+        cache.save()
+    return model
+
+
+def _load_task_graph(ctx: RepoContext, project: str) -> TaskGraph:
+    """依存グラフ。plan / status が前回と同じ (size, mtime) なら組み立て済みのものを使う。"""
+    plan_path, status_path = _resolve_plan_and_status(ctx, project)
+    sibling_order = bool(ctx.config.get("task_sibling_order", False))
+    key: Optional[List[Any]] = [sibling_order]
+    for path in (plan_path, status_path):
+        if path is None:
+            key.append(None)
+            continue
+        try:
+            st = _stat(path, ctx.records_mirror)
+        except OSError:
+            key = None
+            break
+        if time.time() - st.st_mtime < _INDEX_MTIME_SLACK_SEC:
+            key = None
+            break
+        key.append([str(path), st.st_size, st.st_mtime_ns])
+
+    cache = _task_cache(ctx)
+    if key is not None:
+        cached = cache.graph(project, key)
+        if cached is not None:
+            return TaskGraph.from_dict(cached)
+    graph = TaskGraph.build(_load_task_model(ctx, project, cache), sibling_order)
+    if key is not None:
+        cache.put_graph(project, key, graph.to_dict())
+    cache.save()
+    return graph
+
+
+@dataclass
+class NextResult:
+    project: str
+    ready: List[TaskNode] = field(default_factory=list)
+    ready_total: int = 0
+    open_total: int = 0
+    done_total: int = 0
+    cyclic: List[str] = field(default_factory=list)
+    unknown: Dict[str, List[str]] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "project": self.project,
+            "ready": [n.to_dict() for n in self.ready],
+            "ready_total": self.ready_total,
+            "open_total": self.open_total,
+            "done_total": self.done_total,
+            "cyclic": self.cyclic,
+            "unknown": self.unknown,
+        }
+
+
+def next_tasks(
+    ctx: RepoContext, project: Optional[str] = None, parallel: int = 1
+) -> NextResult:
+    """
+    依存が全て完了している葉タスクを最大 parallel 件、トポロジカル順に返す。
+    返すタスク同士は依存関係も親子関係も無いので、並行して codex_loop を回せる。
+    """
+    project = _pick_project(ctx, project)
+    graph = _load_task_graph(ctx, project)
+    ready = graph.ready()
+    leaves = [n for n in graph.nodes.values() if not n.children]
+    done = sum(1 for n in leaves if graph.is_done(n.task_id))
+    return NextResult(
+        project=project,
+        ready=ready[: max(1, parallel)],
+        ready_total=len(ready),
+        open_total=len(leaves) - done,
+        done_total=done,
+        cyclic=graph.cyclic,
+        unknown=graph.unknown,
+    )
+
+
+# -------------------------
+# Library API（import して使う。print せず dataclass を返す）
+# -------------------------
+
+
+@dataclass
+class RequestSpec:
+    """codex_request.md に埋める任意項目（CLI 引数と API 引数の共通形）。"""
+
+    task_id: Optional[str] = None
+    title: Optional[str] = None
+    purpose: Optional[str] = None
+    non_goals: Optional[str] = None
+    editable_files: Optional[str] = None
+    reference_files: Optional[str] = None
+    tasks: Optional[str] = None
+    dod: Optional[str] = None
+    tests: Optional[str] = None
+
+    @classmethod
+    def from_args(cls, args: argparse.Namespace) -> "RequestSpec":
+        return cls(**{f.name: getattr(args, f.name, None) for f in fields(cls)})
+
+
+@dataclass
+class WriteResult:
+    """ファイル生成系 API の結果（パスは絶対パス）。"""
+
+    project: str
+    written: List[Path] = field(default_factory=list)
+    skipped: List[Path] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+
+    @property
+    def exit_code(self) -> int:
+        return 2 if self.errors else 0
+
+    def to_dict(self, repo_root: Optional[Path] = None) -> Dict[str, Any]:
+        return {
+            "project": self.project,
+            "exit_code": self.exit_code,
+            "written": [_rel_path(p, repo_root) for p in self.written],
+            "skipped": [_rel_path(p, repo_root) for p in self.skipped],
+            "errors": self.errors,
+        }
+
+
+@dataclass
+class CodexRequestResult(WriteResult):
+    # (task_id, 出力パス)。生成 / スキップの別は written / skipped で判定する
+    requests: List[Tuple[str, Path]] = field(default_factory=list)
+
+    @property
+    def path(self) -> Optional[Path]:
+        return self.requests[0][1] if self.requests else None
+
+    def to_dict(self, repo_root: Optional[Path] = None) -> Dict[str, Any]:
+        d = super().to_dict(repo_root)
+        d["requests"] = [
+            {
+                "task_id": tid,
+                "path": _rel_path(p, repo_root),
+                "status": "OK" if p in self.written else "SKIP",
+            }
+            for tid, p in self.requests
+        ]
+        return d
+
+
+@dataclass
+class HandoverResult(WriteResult):
+    path: Optional[Path] = None
+    plan_path: Optional[Path] = None
+    status_path: Optional[Path] = None
+
+    def to_dict(self, repo_root: Optional[Path] = None) -> Dict[str, Any]:
+        d = super().to_dict(repo_root)
+        d["path"] = _rel_path(self.path, repo_root) if self.path else None
+        d["plan"] = _rel_path(self.plan_path, repo_root) if self.plan_path else None
+        d["status"] = _rel_path(self.status_path, repo_root) if self.status_path else None
+        return d
+
+
+def _rel_path(path: Path, repo_root: Optional[Path]) -> str:
+    if repo_root is not None:
+        with contextlib.suppress(ValueError):
+            return path.relative_to(repo_root).as_posix()
+    return path.as_posix()
+
+
+def _flush_state(ctx: RepoContext) -> None:
+    """インデックス / ミラーのマニフェストを保存（変更が無ければ何もしない）。"""
+    if ctx.records_index is not None:
+        ctx.records_index.save()
+    if ctx.records_mirror is not None:
+        ctx.records_mirror.save()
+
+
+def init_records(
+    ctx: RepoContext, project: Optional[str] = None, force: bool = False
+) -> WriteResult:
+    """records/<project> の雛形（status / plan / decision・handover テンプレ）を作る。"""
+    project = _pick_project(ctx, project)
+    result = WriteResult(project=project)
+    records_root = ctx.repo_root / str(ctx.config.get("records_root", "records"))
+    proj_root = records_root / project
+
+    # テンプレート配置
+    templates_root = ctx.cursor_root / "scripts" / "templates"
+    records_tpl = templates_root / "records"
+
+    today = _now_local(str(ctx.config.get("date_format", "%Y-%m-%d")))
+
+    if not records_tpl.exists():
+        result.errors.append(
+            f"templates not found: {records_tpl}（テンプレパックが壊れている可能性があります）"
+        )
+        return result
+
+    requests_dirname = str(ctx.config.get("codex_requests_dirname", "requests"))
+    handover_dirname = str(ctx.config.get("handover_dirname", "handover"))
+    decisions_dirname = str(ctx.config.get("decisions_dirname", "decisions"))
+
+    # (出力先, テンプレート名, 値)。書き込み前に全テンプレートのプレースホルダを検証する
+    jobs: List[Tuple[Path, str, Dict[str, Any]]] = [
+        (
+            proj_root / "status.md",
+            "records/status.md",
+            {"project": project, "today": today, "codex_requests_dir": requests_dirname},
+        ),
+        # implementation_plan.md（既存が無い場合のみ）
+        (
+            proj_root / f"{project}_implementation_plan.md",
+            "records/implementation_plan.md",
+            {"project": project, "today": today},
+        ),
+        # decision template
+        (
+            proj_root / decisions_dirname / "_TEMPLATE_decision.md",
+            "records/decision.md",
+            {"project": project, "decision_id": "DEC-XXXX", "today": today},
+        ),
+        # handover template
+        (
+            proj_root / handover_dirname / "_TEMPLATE_handover.md",
+            "records/handover.md",
+            {
+                "project": project,
+                "today": today,
+                "codex_requests_dir": requests_dirname,
+            },
+        ),
+    ]
+    engine = _template_engine(ctx)
+    errors = [engine.check(name, values) for _, name, values in jobs]
+    result.errors.extend(e for e in errors if e)
+    if result.errors:
+        return result
+
+    # ディレクトリ作成
+    for dirname in (requests_dirname, handover_dirname, decisions_dirname):
+        (proj_root / dirname).mkdir(parents=True, exist_ok=True)
+
+    for dst, name, values in jobs:
+        if not dst.exists() or force:
+            _write_text(
+                dst, engine.render(name, **values), force=force, mirror=ctx.records_mirror
+            )
+            result.written.append(dst)
+        else:
+            result.skipped.append(dst)
+    _flush_state(ctx)
+    return result
+
+
+def _request_out_path(ctx: RepoContext, requests_dir: Path, task_id: str) -> Path:
+    filename_tmpl = str(
+        ctx.config.get("codex_request_filename_template", "codex_request_{task_id}.md")
+    )
+    return requests_dir / filename_tmpl.format(task_id=_safe_task_id(task_id))
+
+
+def _request_values(
+    ctx: RepoContext,
+    spec: RequestSpec,
+    project: str,
+    task_id: str,
+    title: str,
+    today: str,
+    plan_path: Optional[Path],
+    status_path: Optional[Path],
+) -> Dict[str, Any]:
+    """codex_request.md テンプレートに渡す値。"""
+    title_line = str(
+        ctx.config.get(
+            "codex_request_title_template", "Codex 依頼: {task_id} — {title}"
+        )
+    ).format(task_id=task_id, title=title)
+
+    # 参照パス（markdown の @path 用に repo_root 相対へ）
+    rel_plan = (
+        plan_path.relative_to(ctx.repo_root).as_posix()
+        if plan_path
+        else f"records/{project}/{project}_implementation_plan.md"
+    )
+    rel_status = (
+        status_path.relative_to(ctx.repo_root).as_posix()
+        if status_path
+        else f"records/{project}/status.md"
+    )
+
+    return dict(
+        title=title_line,
+        today=today,
+        approval_status="未承認",
+        implementation_plan_path=rel_plan,
+        status_path=rel_status,
+        purpose=spec.purpose or "TODO: このUoWの目的を1〜3行で",
+        non_goals=spec.non_goals or "- TODO: やらないこと",
+        repo_root=".",
+        sandbox=str(ctx.config.get("sandbox_default", "workspace-write")),
+        approval_policy=str(ctx.config.get("approval_policy_default", "never")),
+        network_access=str(ctx.config.get("network_access_default", "disabled")),
+        shell_policy="禁止"
+        if str(ctx.config.get("shell_execution_policy_default", "forbid")) == "forbid"
+        else "許可（必要な場合のみ）",
+        editable_files=spec.editable_files
+        or "- TODO: 編集対象ファイルを列挙（相対パス）",
+        reference_files=spec.reference_files or f"- @{rel_plan}\n- @{rel_status}",
+        tasks=spec.tasks or "- TODO: 実装ステップを箇条書き",
+        dod=spec.dod or "- [ ] TODO: 受け入れ条件（チェックリスト）",
+        tests=spec.tests or "- TODO: テスト追加/更新方針（TDD推奨）",
+    )
+
+
+def create_codex_request(
+    ctx: RepoContext,
+    spec: Optional[RequestSpec] = None,
+    project: Optional[str] = None,
+    force: bool = False,
+) -> CodexRequestResult:
+    """Codex依頼書を1件生成する（task_id / title 未指定なら status.md から推測）。"""
+    spec = spec or RequestSpec()
+    project = _pick_project(ctx, project)
+    result = CodexRequestResult(project=project)
+    plan_path, status_path = _resolve_plan_and_status(ctx, project)
+
+    records_root = ctx.repo_root / str(ctx.config.get("records_root", "records"))
+    proj_root = records_root / project
+    requests_dir = proj_root / str(ctx.config.get("codex_requests_dirname", "requests"))
+    requests_dir.mkdir(parents=True, exist_ok=True)
+
+    patterns = _compile_task_patterns(ctx.config.get("task_id_patterns", []))
+
+    task_id = spec.task_id
+    title = spec.title
+
+    # task_id 未指定なら status から拾う
+    if not task_id and status_path and _is_file(status_path, ctx.records_mirror):
+        tid, maybe_title = _extract_next_task_from_status(
+            _read_text(status_path, ctx.records_mirror), patterns
+        )
+        task_id = tid
+        if not title:
+            title = maybe_title
+
+    if not task_id:
+        task_id = "TASK-UNKNOWN"
+
+    if not title:
+        title = "（タイトル未設定）"
+
+    out_path = _request_out_path(ctx, requests_dir, task_id)
+
+    date_format = str(ctx.config.get("date_format", "%Y-%m-%d"))
+    today = _now_local(date_format)
+
+    # テンプレート
+    engine = _template_engine(ctx)
+    tpl = engine.get("codex_request.md")
+    if tpl is None:
+        result.errors.append(str(engine.check("codex_request.md", ())))
+        return result
+
+    values = _request_values(
+        ctx, spec, project, task_id, title, today, plan_path, status_path
+    )
+    err = engine.check("codex_request.md", values)
+    if err:
+        result.errors.append(err)
+        return result
+    content = tpl.render(**values)
+
+    result.requests.append((task_id, out_path))
+    try:
+        _write_text(out_path, content, force=force, mirror=ctx.records_mirror)
+    except FileExistsError:
+        result.skipped.append(out_path)
+    else:
+        result.written.append(out_path)
+    _flush_state(ctx)
+    return result
+
+
+def create_codex_requests_for_open_tasks(
+    ctx: RepoContext,
+    spec: Optional[RequestSpec] = None,
+    project: Optional[str] = None,
+    force: bool = False,
+) -> CodexRequestResult:
+    """
+    status.md の未チェック項目（- [ ]）全てについて、未作成の依頼書をまとめて生成する。
+    既存ファイルはレンダリングせずにスキップする（force で上書き）。
+    spec の task_id / title は使わない（各タスクの値を使う）。
+    """
+    spec = spec or RequestSpec()
+    project = _pick_project(ctx, project)
+    result = CodexRequestResult(project=project)
+    plan_path, status_path = _resolve_plan_and_status(ctx, project)
+    if not status_path or not _is_file(status_path, ctx.records_mirror):
+        result.errors.append("status.md が見つかりません（config の candidates を確認）")
+        return result
+
+    patterns = _compile_task_patterns(ctx.config.get("task_id_patterns", []))
+    tasks = _extract_open_tasks_from_status(
+        _read_text(status_path, ctx.records_mirror), patterns
+    )
+    if not tasks:
+        return result
+
+    engine = _template_engine(ctx)
+    tpl = engine.get("codex_request.md")
+    if tpl is None:
+        result.errors.append(str(engine.check("codex_request.md", ())))
+        return result
+
+    records_root = ctx.repo_root / str(ctx.config.get("records_root", "records"))
+    requests_dir = (
+        records_root / project / str(ctx.config.get("codex_requests_dirname", "requests"))
+    )
+    requests_dir.mkdir(parents=True, exist_ok=True)
+    today = _now_local(str(ctx.config.get("date_format", "%Y-%m-%d")))
+
+    for task_id, title in tasks:
+        out_path = _request_out_path(ctx, requests_dir, task_id)
+        result.requests.append((task_id, out_path))
+        if out_path.exists() and not force:
+            result.skipped.append(out_path)
+            continue
+        values = _request_values(
+            ctx,
+            spec,
+            project,
+            task_id,
+            title or "（タイトル未設定）",
+            today,
+            plan_path,
+            status_path,
+        )
+        err = engine.check("codex_request.md", values)
+        if err:
+            result.errors.append(err)
+            break
+        _write_text(
+            out_path, tpl.render(**values), force=force, mirror=ctx.records_mirror
+        )
+        result.written.append(out_path)
+    _flush_state(ctx)
+    return result
+
+
+def _scan_codex_requests(
+    requests_dir: Path, mirror: Optional[RecordsMirror] = None
+) -> List[Path]:
+    return _list_md(requests_dir, "codex_request_*.md", mirror)
+
+
+def create_handover(
+    ctx: RepoContext, project: Optional[str] = None, force: bool = False
+) -> HandoverResult:
+    """今日付けの handover_{today}.md を生成する。"""
+    project = _pick_project(ctx, project)
+    plan_path, status_path = _resolve_plan_and_status(ctx, project)
+    result = HandoverResult(project=project, plan_path=plan_path, status_path=status_path)
+
+    records_root = ctx.repo_root / str(ctx.config.get("records_root", "records"))
+    proj_root = records_root / project
+    handover_dir = proj_root / str(ctx.config.get("handover_dirname", "handover"))
+    handover_dir.mkdir(parents=True, exist_ok=True)
+
+    date_format = str(ctx.config.get("date_format", "%Y-%m-%d"))
+    today = _now_local(date_format)
+
+    out_path = handover_dir / f"handover_{today}.md"
+    result.path = out_path
+
+    codex_requests_dir = str(ctx.config.get("codex_requests_dirname", "requests"))
+    values = dict(project=project, today=today, codex_requests_dir=codex_requests_dir)
+    engine = _template_engine(ctx)
+    err = engine.check("records/handover.md", values)
+    if err:
+        result.errors.append(err)
+        return result
+    content = engine.render("records/handover.md", **values)
+
+    try:
+        _write_text(out_path, content, force=force, mirror=ctx.records_mirror)
+    except FileExistsError:
+        result.skipped.append(out_path)
+    else:
+        result.written.append(out_path)
+    _flush_state(ctx)
+    return result
+
+
+class RecordsArchive:
+    """
+    records/<project>/<archive_dirname>/ の月別 zip（YYYY-MM.zip）と索引 index.json。
+    索引は元の相対パス（プロジェクト直下から）をキーに
+    {id, kind, month, member, size, mtime, title} を持ち、ID / パス / タイトルで引ける。
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root
+        self.entries: Dict[str, Dict[str, Any]] = {}
+
+    @classmethod
+    def load(cls, root: Path, mirror: Optional[RecordsMirror] = None) -> "RecordsArchive":
+        arc = cls(root)
+        index_path = root / ARCHIVE_INDEX_FILENAME
+        data = _load_json(mirror.fetch(index_path) if mirror is not None else index_path)
+        if data and data.get("version") == ARCHIVE_INDEX_VERSION:
+            arc.entries = data.get("entries") or {}
+        return arc
+
+    def save(self) -> bool:
+        return _save_json_state(
+            self.root / ARCHIVE_INDEX_FILENAME,
+            {"version": ARCHIVE_INDEX_VERSION, "entries": self.entries},
+        )
+
+    def zip_path(self, month: str) -> Path:
+        return self.root / f"{month}.zip"
+
+    def add_month(self, month: str, items: List[Tuple[str, bytes, Dict[str, Any]]]) -> None:
+        """items: (元の相対パス, 内容, 索引エントリ)。同月分は zip を1回だけ開いて追記する。"""
+        self.root.mkdir(parents=True, exist_ok=True)
+        with zipfile.ZipFile(
+            self.zip_path(month), "a", compression=zipfile.ZIP_DEFLATED
+        ) as zf:
+            names = set(zf.namelist())
+            for rel, data, entry in items:
+                member = rel
+                if member in names:
+                    # 同じパスの別版（再作成されたファイル）は mtime 付きで並べて残す
+                    member = f"{rel}@{int(entry['mtime'])}"
+                zf.writestr(member, data)
+                names.add(member)
+                self.entries[rel] = dict(entry, month=month, member=member)
+
+    def find(self, query: str) -> List[Tuple[str, Dict[str, Any]]]:
+        """ID / パスの完全一致を優先し、無ければ ID・パス・タイトルの部分一致（大小無視）。"""
+        exact = [
+            (rel, e)
+            for rel, e in self.entries.items()
+            if query in (e.get("id"), rel, Path(rel).name)
+        ]
+        if exact:
+            return sorted(exact)
+        q = query.lower()
+        return sorted(
+            (rel, e)
+            for rel, e in self.entries.items()
+            if q in str(e.get("id", "")).lower()
+            or q in rel.lower()
+            or q in str(e.get("title", "")).lower()
+        )
+
+    def read(self, rel: str) -> str:
+        e = self.entries[rel]
+        with zipfile.ZipFile(self.zip_path(e["month"])) as zf:
+            return zf.read(e["member"]).decode("utf-8")
+
+    def archived_paths(self, proj_root: Path) -> set:
+        """アーカイブ済みファイルの元の絶対パス（normcase 済み）。リンク検査用。"""
+        return {
+            os.path.normcase(os.path.abspath(proj_root / rel)) for rel in self.entries
+        }
+
+
+@dataclass
+class ArchiveResult(WriteResult):
+    # (kind, id, 元のパス, 月)
+    archived: List[Tuple[str, str, Path, str]] = field(default_factory=list)
+    dry_run: bool = False
+
+    def to_dict(self, repo_root: Optional[Path] = None) -> Dict[str, Any]:
+        d = super().to_dict(repo_root)
+        d["dry_run"] = self.dry_run
+        d["archived"] = [
+            {"kind": k, "id": i, "path": _rel_path(p, repo_root), "month": m}
+            for k, i, p, m in self.archived
+        ]
+        return d
+
+
+def _project_archive(ctx: RepoContext, project: str) -> RecordsArchive:
+    records_root = ctx.repo_root / str(ctx.config.get("records_root", "records"))
+    return RecordsArchive.load(
+        records_root / project / str(ctx.config.get("archive_dirname", "archive")),
+        ctx.records_mirror,
+    )
+
+
+def _request_id_from_name(ctx: RepoContext, name: str) -> str:
+    """codex_request_{task_id}.md のファイル名から task_id 部分を取り出す。"""
+    tmpl = str(ctx.config.get("codex_request_filename_template", "codex_request_{task_id}.md"))
+    head, _, tail = tmpl.partition("{task_id}")
+    if name.startswith(head) and name.endswith(tail) and len(name) > len(head) + len(tail):
+        return name[len(head) : len(name) - len(tail)]
+    return Path(name).stem
+
+
+def _first_heading(text: str) -> str:
+    for line in text.splitlines()[:20]:
+        if line.startswith("#"):
+            return line.lstrip("#").strip()
+    return ""
+
+
+def archive_records(
+    ctx: RepoContext,
+    project: Optional[str] = None,
+    days: Optional[int] = None,
+    dry_run: bool = False,
+) -> ArchiveResult:
+    """
+    days 日より古い（mtime 基準）handover / 依頼書 / decision を月別 zip に移す。
+    status.md で未完了のタスクの依頼書と _TEMPLATE_ は対象外（skipped に入る）。
+    """
+    project = _pick_project(ctx, project)
+    result = ArchiveResult(project=project, dry_run=dry_run)
+    if days is None:
+        days = int(ctx.config.get("archive_after_days", 30))
+    if days < 0:
+        result.errors.append(f"days は 0 以上を指定してください: {days}")
+        return result
+
+    records_root = ctx.repo_root / str(ctx.config.get("records_root", "records"))
+    proj_root = records_root / project
+    requests_dir = proj_root / str(ctx.config.get("codex_requests_dirname", "requests"))
+    handover_dir = proj_root / str(ctx.config.get("handover_dirname", "handover"))
+    decisions_dir = proj_root / str(ctx.config.get("decisions_dirname", "decisions"))
+    mirror = ctx.records_mirror
+    if mirror is not None:
+        # 元ファイルを消すので、同期間隔内でも最新の状態（更新時刻・内容）で判断する
+        mirror.sync(force=True)
+
+    # 未完了タスクの依頼書はこれから使うので残す
+    open_ids = set()
+    _, status_path = _resolve_plan_and_status(ctx, project)
+    if status_path and _is_file(status_path, ctx.records_mirror):
+        patterns = _compile_task_patterns(ctx.config.get("task_id_patterns", []))
+        open_ids = {
+            _safe_task_id(tid)
+            for tid, _ in _extract_open_tasks_from_status(
+                _read_text(status_path, mirror), patterns
+            )
+        }
+
+    candidates: List[Tuple[Path, str]] = []
+    candidates.extend((p, "request") for p in _scan_codex_requests(requests_dir, mirror))
+    candidates.extend((p, "handover") for p in _scan_record_files(handover_dir, mirror))
+    candidates.extend((p, "decision") for p in _scan_record_files(decisions_dir, mirror))
+
+    cutoff = time.time() - days * 86400
+    by_month: Dict[str, List[Tuple[Path, str, str, Any]]] = {}
+    for path, kind in candidates:
+        try:
+            st = _stat(path, mirror)
+        except OSError:
+            continue
+        if st.st_mtime >= cutoff:
+            continue
+        if kind == "request":
+            rec_id = _request_id_from_name(ctx, path.name)
+            if rec_id in open_ids:
+                result.skipped.append(path)
+                continue
+        elif kind == "handover":
+            rec_id = path.stem[len("handover_") :] if path.stem.startswith("handover_") else path.stem
+        else:
+            rec_id = path.stem
+        month = _dt.datetime.fromtimestamp(st.st_mtime).strftime("%Y-%m")
+        by_month.setdefault(month, []).append((path, kind, rec_id, st))
+
+    if not by_month:
+        return result
+
+    archive = _project_archive(ctx, project)
+    for month in sorted(by_month):
+        items: List[Tuple[str, bytes, Dict[str, Any]]] = []
+        for path, kind, rec_id, st in by_month[month]:
+            result.archived.append((kind, rec_id, path, month))
+            if dry_run:
+                continue
+            data = (mirror.fetch(path) if mirror is not None else path).read_bytes()
+            entry = {
+                "id": rec_id,
+                "kind": kind,
+                "size": st.st_size,
+                "mtime": st.st_mtime,
+                "title": _first_heading(data.decode("utf-8", errors="replace")),
+            }
+            items.append((path.relative_to(proj_root).as_posix(), data, entry))
+        if not dry_run:
+            archive.add_month(month, items)
+            result.written.append(archive.zip_path(month))
+    if dry_run:
+        return result
+
+    # 索引を書けてから元ファイルを消す（途中で落ちても二重に残るだけで失われない）
+    saved = archive.save()
+    if mirror is not None:
+        mirror.refresh([archive.root / ARCHIVE_INDEX_FILENAME, *result.written])
+    if not saved:
+        result.errors.append(f"索引を保存できません: {archive.root / ARCHIVE_INDEX_FILENAME}")
+        return result
+    for _, _, path, _ in result.archived:
+        with contextlib.suppress(FileNotFoundError):
+            path.unlink()
+        if mirror is not None:
+            mirror.forget(path)
+    if ctx.records_index is not None:
+        ctx.records_index.invalidate()
+    _flush_state(ctx)
+    return result
+
+
+def find_archived(
+    ctx: RepoContext, query: str, project: Optional[str] = None
+) -> List[Tuple[str, Dict[str, Any]]]:
+    """アーカイブ索引を ID / パス / タイトルで引く。"""
+    return _project_archive(ctx, _pick_project(ctx, project)).find(query)
+
+
+def read_archived(ctx: RepoContext, rel: str, project: Optional[str] = None) -> str:
+    """find_archived が返した相対パスの内容を zip から読む。"""
+    return _project_archive(ctx, _pick_project(ctx, project)).read(rel)
+
+
+# -------------------------
+# CLI（上の API を呼んで表示するだけ）
+# -------------------------
+
+
+def _print_json(ctx: RepoContext, result: WriteResult) -> None:
+    print(json.dumps(result.to_dict(ctx.repo_root), ensure_ascii=False, indent=2))
+
+
+def cmd_init(ctx: RepoContext, args: argparse.Namespace) -> int:
+    res = init_records(ctx, args.project, force=args.force)
+    if getattr(args, "json", False):
+        _print_json(ctx, res)
+        return res.exit_code
+    if res.errors:
+        for e in res.errors:
+            print(f"[ERR] {e}")
+        print("      テンプレートを修正してから再実行してください（何も書き込んでいません）。")
+        return res.exit_code
+
+    for p in res.written:
+        print(f"[OK] wrote {p.relative_to(ctx.repo_root)}")
+    for p in res.skipped:
+        print(f"[SKIP] exists {p.relative_to(ctx.repo_root)}")
+
+    print("\nNext:")
+    print("  - status.md の Now/Next を埋める")
+    print(
+        "  - 実装計画を {project}_implementation_plan.md に書く（Task: WP1.1 ... の形式推奨）"
+    )
+    return 0
+
+
+def cmd_codex_request(ctx: RepoContext, args: argparse.Namespace) -> Tuple[int, Optional[Path]]:
+    if getattr(args, "all_open", False):
+        return cmd_codex_request_batch(ctx, args), None
+
+    res = create_codex_request(
+        ctx, RequestSpec.from_args(args), args.project, force=args.force
+    )
+    if getattr(args, "json", False):
+        _print_json(ctx, res)
+        return res.exit_code, res.path
+    if res.errors:
+        for e in res.errors:
+            print(f"[ERR] {e}")
+        return res.exit_code, None
+
+    out_path = res.path
+    assert out_path is not None
+    if res.skipped:
+        print(
+            f"[SKIP] exists {out_path.relative_to(ctx.repo_root)}  (use --force to overwrite)"
+        )
+        return 0, out_path
+
+    print(f"[OK] wrote {out_path.relative_to(ctx.repo_root)}")
+    print("\nHints:")
+    print("  - 依頼書の TODO を埋めてから Codex CLI に渡してください。")
+    print("  - 自動ループ（推奨）: python .cursor/scripts/codex_loop.py --request <path> --min-coverage 80")
+    return 0, out_path
+
+
+def cmd_codex_request_batch(ctx: RepoContext, args: argparse.Namespace) -> int:
+    res = create_codex_requests_for_open_tasks(
+        ctx, RequestSpec.from_args(args), args.project, force=args.force
+    )
+    if getattr(args, "json", False):
+        _print_json(ctx, res)
+        return res.exit_code
+    if res.errors:
+        for e in res.errors:
+            print(f"[ERR] {e}")
+        return res.exit_code
+    if not res.requests:
+        _, status_path = _resolve_plan_and_status(ctx, res.project)
+        rel = status_path.relative_to(ctx.repo_root) if status_path else "status.md"
+        print(f"[SKIP] 未チェックのタスクがありません: {rel}")
+        return 0
+
+    # サマリ表
+    written = set(res.written)
+    rows = [
+        ("OK" if p in written else "SKIP", tid, p.relative_to(ctx.repo_root).as_posix())
+        for tid, p in res.requests
+    ]
+    w_tid = max(len("TASK"), *(len(r[1]) for r in rows))
+    print(f"{'STATUS':<6}  {'TASK':<{w_tid}}  FILE")
+    for st, tid, rel in rows:
+        print(f"{st:<6}  {tid:<{w_tid}}  {rel}")
+    print(
+        f"\n[OK] {len(res.written)} written, {len(rows) - len(res.written)} skipped "
+        f"(open tasks: {len(rows)})"
+    )
+    return 0
+
+
+def cmd_handover(ctx: RepoContext, args: argparse.Namespace) -> int:
+    res = create_handover(ctx, args.project, force=args.force)
+    if getattr(args, "json", False):
+        _print_json(ctx, res)
+        return res.exit_code
+    if res.errors:
+        for e in res.errors:
+            print(f"[ERR] {e}")
+        return res.exit_code
+
+    out_path = res.path
+    assert out_path is not None
+    if res.skipped:
+        print(
+            f"[SKIP] exists {out_path.relative_to(ctx.repo_root)}  (use --force to overwrite)"
+        )
+        return 0
+
+    print(f"[OK] wrote {out_path.relative_to(ctx.repo_root)}")
+
+    # 参照情報も出す
+    if res.plan_path:
+        print(f"  plan   : {res.plan_path.relative_to(ctx.repo_root)}")
+    if res.status_path:
+        print(f"  status : {res.status_path.relative_to(ctx.repo_root)}")
+    return 0
+
+
+def cmd_archive(ctx: RepoContext, args: argparse.Namespace) -> int:
+    query = args.show or args.find
+    if query:
+        project = _pick_project(ctx, args.project)
+        matches = find_archived(ctx, query, project)
+        if args.json and args.find:
+            print(
+                json.dumps(
+                    {"project": project, "matches": [dict(e, path=rel) for rel, e in matches]},
+                    ensure_ascii=False,
+                    indent=2,
+                )
+            )
+            return 0
+        if not matches:
+            print(f"[SKIP] アーカイブに見つかりません: {query}")
+            return 1
+        if args.show:
+            if len(matches) > 1:
+                print(f"[ERR] 複数に一致しました（パスで指定してください）: {query}")
+                for rel, e in matches:
+                    print(f"  - {rel}  ({e['month']})")
+                return 2
+            rel, _ = matches[0]
+            print(read_archived(ctx, rel, project), end="")
+            return 0
+        w_id = max(len("ID"), *(len(str(e["id"])) for _, e in matches))
+        print(f"{'KIND':<8}  {'ID':<{w_id}}  MONTH    PATH / TITLE")
+        for rel, e in matches:
+            print(f"{e['kind']:<8}  {e['id']:<{w_id}}  {e['month']}  {rel}  {e.get('title', '')}")
+        return 0
+
+    res = archive_records(ctx, args.project, days=args.days, dry_run=args.dry_run)
+    if args.json:
+        _print_json(ctx, res)
+        return res.exit_code
+    if res.errors:
+        for e in res.errors:
+            print(f"[ERR] {e}")
+        return res.exit_code
+    if not res.archived:
+        print("[SKIP] アーカイブ対象のファイルはありません")
+        return 0
+
+    tag = "DRY" if res.dry_run else "OK"
+    w_id = max(len("ID"), *(len(r[1]) for r in res.archived))
+    print(f"{'KIND':<8}  {'ID':<{w_id}}  MONTH    FILE")
+    for kind, rec_id, path, month in res.archived:
+        print(f"{kind:<8}  {rec_id:<{w_id}}  {month}  {path.relative_to(ctx.repo_root)}")
+    months = len({r[3] for r in res.archived})
+    print(f"\n[{tag}] {len(res.archived)} files → {months} monthly archives", end="")
+    print(f", {len(res.skipped)} kept (open tasks)" if res.skipped else "")
+    return 0
+
+
+class PlaceholderScanner:
+    """
+    プレースホルダ（TODO 等）を1パスで検出するスキャナ。
+    - 全マーカーを1本の正規表現（最長一致優先の alternation）にまとめる
+    - ファイルは mmap で読み、全体を str に展開しない
+    - マーカーごとの件数と行番号（先頭 _SCAN_MAX_LINES 件）を返す
+    """
+
+    def __init__(self, markers: Iterable[str]) -> None:
+        uniq = sorted({m for m in markers if m}, key=lambda m: (-len(m), m))
+        self.markers: List[str] = uniq
+        self._by_bytes = {m.encode("utf-8"): m for m in uniq}
+        self._rx: Optional[re.Pattern] = (
+            re.compile(b"|".join(re.escape(b) for b in self._by_bytes)) if uniq else None
+        )
+
+    @property
+    def signature(self) -> str:
+        return "\x1f".join(self.markers)
+
+    def scan(self, buf: Any) -> Dict[str, Dict[str, Any]]:
+        """bytes / mmap を走査して {marker: {"count": n, "lines": [...]}} を返す。"""
+        hits: Dict[str, Dict[str, Any]] = {}
+        if self._rx is None:
+            return hits
+        line = 1
+        pos = 0
+        for m in self._rx.finditer(buf):
+            start = m.start()
+            line += buf[pos:start].count(b"\n")
+            pos = start
+            h = hits.setdefault(self._by_bytes[m.group(0)], {"count": 0, "lines": []})
+            h["count"] += 1
+            if len(h["lines"]) < _SCAN_MAX_LINES and (not h["lines"] or h["lines"][-1] != line):
+                h["lines"].append(line)
+        return hits
+
+    def scan_file(
+        self, path: Path
+    ) -> Tuple[str, Dict[str, Dict[str, Any]], List[str]]:
+        """ファイルを mmap で1回だけ読み、(sha1, 検出結果, @参照リンク) を返す。"""
+        with path.open("rb") as f:
+            try:
+                buf: Any = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except (ValueError, OSError):
+                # 空ファイル等は mmap できない
+                buf = f.read()
+            try:
+                return hashlib.sha1(buf).hexdigest(), self.scan(buf), _extract_links(buf)
+            finally:
+                if isinstance(buf, mmap.mmap):
+                    buf.close()
+
+
+# Markdown 内の `@records/...` 形式の参照（メールアドレス等は前後の文字で除外）
+_LINK_RE = re.compile(rb"(?<![\w@./])@((?:\./)?[^\s`'\"<>()\[\]|*]+/[^\s`'\"<>()\[\]|*]*)")
+# 日本語の括弧・句読点が直後に続く場合はそこでパスを切る
+_LINK_STOP_RE = re.compile(r"[（）「」『』、。，：；]")
+
+
+def _extract_links(buf: Any) -> List[str]:
+    """@参照リンクのターゲット（repo_root 相対、重複除去・出現順）。"""
+    out: List[str] = []
+    seen = set()
+    for m in _LINK_RE.finditer(buf):
+        target = m.group(1).decode("utf-8", errors="replace")
+        target = _LINK_STOP_RE.split(target, maxsplit=1)[0].rstrip(".,:;!?")
+        if "{" in target or target in seen:
+            continue  # 未展開のテンプレート変数は対象外
+        seen.add(target)
+        out.append(target)
+    return out
+
+
+@lru_cache(maxsize=8)
+def _compile_scanner(markers: Tuple[str, ...]) -> PlaceholderScanner:
+    return PlaceholderScanner(markers)
+
+
+def _placeholder_scanner(ctx: RepoContext) -> PlaceholderScanner:
+    markers = ctx.config.get("placeholder_markers") or []
+    return _compile_scanner(tuple(str(m) for m in markers))
+
+
+def _format_hits(hits: Dict[str, Dict[str, Any]]) -> str:
+    parts: List[str] = []
+    for marker, h in hits.items():
+        lines = ", ".join(f"L{n}" for n in h["lines"])
+        more = ", ..." if len(h["lines"]) >= _SCAN_MAX_LINES else ""
+        parts.append(f"{marker}×{h['count']} ({lines}{more})")
+    return "; ".join(parts)
+
+
+class ValidationCache:
+    """
+    ファイル単位の検証結果キャッシュ。
+    キー: (path, size, mtime_ns, sha1)。size/mtime が一致すれば読まずに再利用し、
+    ずれていても内容ハッシュが一致すれば再利用する（touch だけの変更対策）。
+    """
+
+    def __init__(self, path: Optional[Path] = None, signature: str = "") -> None:
+        self.path = path
+        # 検知ルール（マーカー一覧）が変わったらキャッシュ全体を捨てる
+        self.signature = signature
+        # rel_path -> {"kind", "size", "mtime_ns", "sha1", "problems", "warnings", "links"}
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: Path, signature: str = "") -> "ValidationCache":
+        cache = cls(path, signature)
+        data = _load_json(path)
+        if (
+            data
+            and data.get("version") == VALIDATE_CACHE_VERSION
+            and data.get("signature") == signature
+            and isinstance(data.get("entries"), dict)
+        ):
+            cache._entries = data["entries"]
+        return cache
+
+    def save(self) -> None:
+        if not self._dirty or self.path is None:
+            return
+        with self._lock:
+            payload = {
+                "version": VALIDATE_CACHE_VERSION,
+                "signature": self.signature,
+                "entries": dict(self._entries),
+            }
+        if _save_json_state(self.path, payload):
+            self._dirty = False
+
+    def check(
+        self, ctx: RepoContext, path: Path, kind: str, use_cache: bool = True
+    ) -> Tuple[List[str], List[str], bool]:
+        """戻り値は (problems, warnings, キャッシュヒットか)。スレッドセーフ。"""
+        rel = _rel_display(ctx, path)
+        try:
+            st = _stat(path, ctx.records_mirror)
+        except OSError:
+            return [f"{rel} を読めません"], [], False
+        with self._lock:
+            entry = self._entries.get(rel)
+        if (
+            use_cache
+            and entry
+            and entry.get("kind") == kind
+            and entry.get("size") == st.st_size
+            and entry.get("mtime_ns") == st.st_mtime_ns
+        ):
+            return list(entry["problems"]), list(entry["warnings"]), True
+
+        try:
+            src = ctx.records_mirror.fetch(path) if ctx.records_mirror else path
+            digest, hits, links = _placeholder_scanner(ctx).scan_file(src)
+        except OSError:
+            return [f"{rel} を読めません"], [], False
+        hit = bool(
+            use_cache and entry and entry.get("kind") == kind and entry.get("sha1") == digest
+        )
+        if hit:
+            problems, warnings = list(entry["problems"]), list(entry["warnings"])
+        else:
+            problems, warnings = _check_record_hits(kind, rel, hits)
+
+        mtime_ns = st.st_mtime_ns
+        if time.time() - mtime_ns / 1e9 < _INDEX_MTIME_SLACK_SEC:
+            # 同一 mtime 内の再編集を取りこぼさないよう、次回はハッシュ比較させる
+            mtime_ns = -1
+        with self._lock:
+            self._entries[rel] = {
+                "kind": kind,
+                "size": st.st_size,
+                "mtime_ns": mtime_ns,
+                "sha1": digest,
+                "problems": problems,
+                "warnings": warnings,
+                "links": links,
+            }
+            self._dirty = True
+        return list(problems), list(warnings), hit
+
+    def links(self, ctx: RepoContext, path: Path) -> List[str]:
+        """check() 済みファイルの @参照リンク。"""
+        with self._lock:
+            entry = self._entries.get(_rel_display(ctx, path))
+        return list(entry.get("links", [])) if entry else []
+
+    def prune(self, prefix: str, keep: Iterable[str]) -> None:
+        """prefix 配下で今回の対象に含まれないエントリ（削除済みファイル）を落とす。"""
+        keep_set = set(keep)
+        with self._lock:
+            for k in list(self._entries):
+                if k.startswith(prefix) and k not in keep_set:
+                    del self._entries[k]
+                    self._dirty = True
+
+
+def _rel_display(ctx: RepoContext, path: Path) -> str:
+    try:
+        return path.relative_to(ctx.repo_root).as_posix()
+    except ValueError:
+        return path.as_posix()
+
+
+def _check_record_hits(
+    kind: str, rel: str, hits: Dict[str, Dict[str, Any]]
+) -> Tuple[List[str], List[str]]:
+    """records 1ファイル分のプレースホルダ検知結果を (problems, warnings) にする。"""
+    problems: List[str] = []
+    warnings: List[str] = []
+    if not hits:
+        return problems, warnings
+    names = " / ".join(hits)
+    detail = _format_hits(hits)
+    if kind == "status":
+        warnings.append(
+            f"status.md に {names} が残っています（運用開始前に埋める推奨）: {detail}"
+        )
+    elif kind == "plan":
+        warnings.append(f"実装計画に {names} が残っています（必要に応じて）: {detail}")
+    elif kind == "request":
+        warnings.append(f"{rel} に未埋めのプレースホルダが残っています: {detail}")
+    else:
+        warnings.append(f"{rel} に {names} が残っています: {detail}")
+    return problems, warnings
+
+
+def _scan_record_files(
+    directory: Path, mirror: Optional[RecordsMirror] = None
+) -> List[Path]:
+    """handover / decisions 配下の md（_TEMPLATE_ は除く）。"""
+    return [
+        p for p in _list_md(directory, "*.md", mirror) if not p.name.startswith("_TEMPLATE_")
+    ]
+
+
+class _StatCache:
+    """
+    リンク先の存在確認を、ターゲットごとに1回の stat で済ませる共有キャッシュ。
+    mirror を渡すと、records_root 配下はミラーのマニフェストで答える（元ストレージを stat しない）。
+    """
+
+    def __init__(self, mirror: Optional[RecordsMirror] = None) -> None:
+        self.mirror = mirror
+        self._kinds: Dict[str, Optional[str]] = {}
+        self._lock = threading.Lock()
+
+    def kind(self, path: Path) -> Optional[str]:
+        """'file' / 'dir' / None（存在しない）。"""
+        key = str(path)
+        with self._lock:
+            if key in self._kinds:
+                return self._kinds[key]
+        if self.mirror is not None and self.mirror.covers(path):
+            return self.mirror.kind(path)
+        try:
+            mode = os.stat(key).st_mode
+            k: Optional[str] = "dir" if stat.S_ISDIR(mode) else "file"
+        except OSError:
+            k = None
+        with self._lock:
+            self._kinds[key] = k
+        return k
+
+    def prefetch(self, paths: Iterable[Path], jobs: Optional[int] = None) -> None:
+        """遅いストレージでも直列にならないよう、未確認のパスをスレッドプールで stat する。"""
+        with self._lock:
+            todo = [
+                p
+                for p in {str(p): p for p in paths if str(p) not in self._kinds}.values()
+                if self.mirror is None or not self.mirror.covers(p)
+            ]
+        if not todo:
+            return
+        workers = max(1, min(len(todo), jobs or (os.cpu_count() or 1) * 4))
+        if workers == 1:
+            for p in todo:
+                self.kind(p)
+            return
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            list(ex.map(self.kind, todo))
+
+
+def _link_candidates(ctx: RepoContext, target: str) -> List[Path]:
+    """@参照を実パス候補にする（repo_root 相対。records/ は records_root 側も見る）。"""
+    rel = target[2:] if target.startswith("./") else target
+    rel = rel.rstrip("/")
+    out = [ctx.repo_root / rel]
+    records_root = ctx.repo_root / str(ctx.config.get("records_root", "records"))
+    if rel.startswith("records/") and records_root != ctx.repo_root / "records":
+        out.append(records_root / rel[len("records/") :])
+    return out
+
+
+def _check_links(
+    ctx: RepoContext,
+    report: "ValidationReport",
+    sources: List[Tuple[Path, str]],
+    cache: ValidationCache,
+    stats: _StatCache,
+    jobs: Optional[int] = None,
+    archived: Optional[set] = None,
+) -> None:
+    """
+    参照リンクのグラフを作り、リンク切れ（problems）と孤立ファイル（warnings）を report に足す。
+    孤立 = request / decision のうち、他のどのファイルからも（ディレクトリ参照含め）参照されないもの。
+    archived（ops.py archive で退避済みの元パス）への参照はリンク切れにしない。
+    """
+    graph: Dict[Path, List[str]] = {path: cache.links(ctx, path) for path, _ in sources}
+    stats.prefetch(
+        (c for targets in graph.values() for t in targets for c in _link_candidates(ctx, t)),
+        jobs,
+    )
+
+    referenced_files = set()
+    referenced_dirs: List[str] = []
+    for src, targets in graph.items():
+        for t in targets:
+            resolved = None
+            for cand in _link_candidates(ctx, t):
+                kind = stats.kind(cand)
+                if kind:
+                    resolved = (cand, kind)
+                    break
+            if resolved is None:
+                if archived and any(
+                    os.path.normcase(os.path.abspath(c)) in archived
+                    for c in _link_candidates(ctx, t)
+                ):
+                    continue
+                report.broken_links.append(
+                    {"source": _rel_display(ctx, src), "target": t}
+                )
+                continue
+            cand, kind = resolved
+            key = os.path.normcase(os.path.abspath(cand))
+            if kind == "dir":
+                referenced_dirs.append(key + os.sep)
+            elif cand != src:
+                referenced_files.add(key)
+
+    for path, kind in sources:
+        if kind not in ("request", "decision"):
+            continue
+        key = os.path.normcase(os.path.abspath(path))
+        if key in referenced_files or any(key.startswith(d) for d in referenced_dirs):
+            continue
+        report.orphans.append(_rel_display(ctx, path))
+
+    for bl in report.broken_links:
+        report.problems.append(f"リンク切れ: {bl['source']} → @{bl['target']}")
+    for o in report.orphans:
+        report.warnings.append(f"孤立ファイル（どこからも参照されていません）: {o}")
+
+
+@dataclass
+class ValidationReport:
+    project: str
+    problems: List[str] = field(default_factory=list)
+    warnings: List[str] = field(default_factory=list)
+    checked: int = 0
+    scanned: int = 0
+    cached: int = 0
+    broken_links: List[Dict[str, str]] = field(default_factory=list)
+    orphans: List[str] = field(default_factory=list)
+
+    @property
+    def exit_code(self) -> int:
+        return 1 if self.problems else 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "project": self.project,
+            "exit_code": self.exit_code,
+            "problems": self.problems,
+            "warnings": self.warnings,
+            "checked": self.checked,
+            "scanned": self.scanned,
+            "cached": self.cached,
+            "broken_links": self.broken_links,
+            "orphans": self.orphans,
+        }
+
+
+def _record_targets(
+    ctx: RepoContext,
+    project: str,
+    plan_path: Optional[Path],
+    status_path: Optional[Path],
+) -> List[Tuple[Path, str]]:
+    """プロジェクトの records ファイル一覧 (path, kind)。kind: status/plan/request/handover/decision。"""
+    proj_root = ctx.repo_root / str(ctx.config.get("records_root", "records")) / project
+    requests_dir = proj_root / str(ctx.config.get("codex_requests_dirname", "requests"))
+    handover_dir = proj_root / str(ctx.config.get("handover_dirname", "handover"))
+    decisions_dir = proj_root / str(ctx.config.get("decisions_dirname", "decisions"))
+
+    targets: List[Tuple[Path, str]] = []
+    if status_path and _is_file(status_path, ctx.records_mirror):
+        targets.append((status_path, "status"))
+    if plan_path and _is_file(plan_path, ctx.records_mirror):
+        targets.append((plan_path, "plan"))
+    targets.extend(
+        (rp, "request") for rp in _scan_codex_requests(requests_dir, ctx.records_mirror)
+    )
+    targets.extend(
+        (hp, "handover") for hp in _scan_record_files(handover_dir, ctx.records_mirror)
+    )
+    targets.extend(
+        (dp, "decision") for dp in _scan_record_files(decisions_dir, ctx.records_mirror)
+    )
+    return targets
+
+
+def _validate_project(
+    ctx: RepoContext,
+    project: str,
+    cache: ValidationCache,
+    full: bool = False,
+    stats: Optional[_StatCache] = None,
+) -> ValidationReport:
+    """stats を渡すとリンク検査（リンク切れ / 孤立ファイル）も行う。"""
+    plan_path, status_path = _resolve_plan_and_status(ctx, project)
+    proj_root = ctx.repo_root / str(ctx.config.get("records_root", "records")) / project
+
+    report = ValidationReport(project=project)
+
+    if not plan_path:
+        report.problems.append("実装計画が見つかりません（config の candidates を確認）")
+    if not status_path:
+        report.problems.append("status.md が見つかりません（config の candidates を確認）")
+
+    # TODO / プレースホルダ検知（全ファイル。未変更ファイルはキャッシュを再利用）
+    targets = _record_targets(ctx, project, plan_path, status_path)
+    if not any(kind == "request" for _, kind in targets):
+        report.warnings.append("Codex依頼書（codex_request_*.md）がまだありません")
+
+    for path, kind in targets:
+        p, w, hit = cache.check(ctx, path, kind, use_cache=not full)
+        report.problems.extend(p)
+        report.warnings.extend(w)
+        if hit:
+            report.cached += 1
+        else:
+            report.scanned += 1
+    report.checked = len(targets)
+    if stats is not None:
+        archived = _project_archive(ctx, project).archived_paths(proj_root)
+        _check_links(ctx, report, targets, cache, stats, archived=archived)
+    cache.prune(
+        _rel_display(ctx, proj_root) + "/",
+        (_rel_display(ctx, path) for path, _ in targets),
+    )
+    return report
+
+
+def _print_validation_report(report: ValidationReport) -> None:
+    if report.problems:
         print("[FAIL] problems:")
-        for p in problems:
+        for p in report.problems:
             print(f"  - {p}")
-    if warnings:
+    if report.warnings:
         print("[WARN] warnings:")
-        for w in warnings:
+        for w in report.warnings:
             print(f"  - {w}")
-    if not problems and not warnings:
+    if not report.problems and not report.warnings:
         print("[OK] records looks consistent")
+    print(
+        f"  (checked {report.checked} files: "
+        f"{report.scanned} scanned, {report.cached} cached)"
+    )
+
+
+def _validate_all_projects(
+    ctx: RepoContext,
+    cache: ValidationCache,
+    full: bool,
+    jobs: Optional[int],
+    stats: Optional[_StatCache] = None,
+) -> List[ValidationReport]:
+    """
+    records_root 配下の全プロジェクトをスレッドプールで並列検証する。
+    処理の大半はファイル I/O（遅いストレージ前提）なので、プロセスではなくスレッドで
+    並列化し、キャッシュとインデックスは1つを共有する。
+    """
+    records_root = ctx.repo_root / str(ctx.config.get("records_root", "records"))
+    projects = _detect_projects(records_root, ctx.records_mirror)
+    if not projects:
+        return []
+    workers = max(1, min(len(projects), jobs or (os.cpu_count() or 1) * 2))
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        return list(
+            ex.map(lambda pj: _validate_project(ctx, pj, cache, full, stats), projects)
+        )
+
+
+class _PollingWatcher:
+    """
+    mtime ポーリングによる変更検知（inotify が使えない環境向け）。
+    ディレクトリは mtime が変わったときだけ一覧を取り直し、既知ファイルは stat だけで比較する。
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = interval
+        self._dirs: Dict[Path, int] = {}
+        self._files: Dict[Path, Tuple[int, int]] = {}
+
+    def add(self, directory: Path) -> bool:
+        try:
+            self._dirs[directory] = directory.stat().st_mtime_ns
+        except OSError:
+            return False
+        # 一覧の取得に失敗しても監視は続ける（次回 mtime が変われば poll() で取り直す）
+        with contextlib.suppress(OSError):
+            for p in directory.iterdir():
+                with contextlib.suppress(OSError):
+                    st = p.stat()
+                    if stat.S_ISREG(st.st_mode):
+                        self._files[p] = (st.st_size, st.st_mtime_ns)
+        return True
+
+    def poll(self, timeout: float) -> set:
+        time.sleep(min(timeout, self.interval))
+        changed = set()
+        for d, mtime in list(self._dirs.items()):
+            try:
+                cur = d.stat().st_mtime_ns
+            except OSError:
+                del self._dirs[d]
+                continue
+            if cur == mtime:
+                continue
+            self._dirs[d] = cur
+            with contextlib.suppress(OSError):
+                for p in d.iterdir():
+                    if p not in self._files and p.is_file():
+                        self._files[p] = (-1, -1)
+        for p, sig in list(self._files.items()):
+            try:
+                st = p.stat()
+            except OSError:
+                del self._files[p]
+                changed.add(p)
+                continue
+            cur_sig = (st.st_size, st.st_mtime_ns)
+            if cur_sig != sig:
+                self._files[p] = cur_sig
+                changed.add(p)
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+class _InotifyWatcher:
+    """Linux inotify（ctypes 経由、標準ライブラリのみ）による変更検知。"""
+
+    _IN_ATTRIB = 0x004
+    _IN_CLOSE_WRITE = 0x008
+    _IN_MOVED_FROM = 0x040
+    _IN_MOVED_TO = 0x080
+    _IN_CREATE = 0x100
+    _IN_DELETE = 0x200
+    _IN_ISDIR = 0x40000000
+    _MASK = (
+        _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO | _IN_CREATE | _IN_DELETE
+    )
+    _EVENT_HEADER = 16  # struct inotify_event { int wd; uint32 mask, cookie, len; }
+
+    def __init__(self) -> None:
+        name = ctypes.util.find_library("c")
+        if not sys.platform.startswith("linux") or not name:
+            raise OSError("inotify is not available")
+        self._libc = ctypes.CDLL(name, use_errno=True)
+        fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._fd = fd
+        self._wds: Dict[int, Path] = {}
+
+    def add(self, directory: Path) -> bool:
+        wd = self._libc.inotify_add_watch(
+            self._fd, os.fsencode(str(directory)), self._MASK
+        )
+        if wd < 0:
+            return False
+        self._wds[wd] = directory
+        return True
+
+    def poll(self, timeout: float) -> set:
+        changed = set()
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return changed
+        # 保存は複数イベントに分かれるので、少し待ってまとめて読む
+        time.sleep(0.05)
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            pos = 0
+            while pos + self._EVENT_HEADER <= len(data):
+                wd, mask, _cookie, length = struct.unpack_from("iIII", data, pos)
+                raw = data[pos + self._EVENT_HEADER : pos + self._EVENT_HEADER + length]
+                pos += self._EVENT_HEADER + length
+                name = raw.rstrip(b"\0")
+                if name and not mask & self._IN_ISDIR and wd in self._wds:
+                    changed.add(self._wds[wd] / os.fsdecode(name))
+        return changed
+
+    def close(self) -> None:
+        with contextlib.suppress(OSError):
+            os.close(self._fd)
+
+
+def _make_watcher(interval: float) -> Any:
+    try:
+        return _InotifyWatcher()
+    except (OSError, AttributeError):
+        return _PollingWatcher(interval)
+
+
+class _ValidateWatch:
+    """
+    validate --watch の状態。ファイル単位の検証結果を保持し、変更されたファイルだけ再検証する。
+    records ツリー全体の glob はしない（plan/status の候補名が変わったときだけ再解決する）。
+    """
+
+    def __init__(
+        self, ctx: RepoContext, project: str, cache: ValidationCache
+    ) -> None:
+        self.ctx = ctx
+        self.project = project
+        self.cache = cache
+        proj_root = ctx.repo_root / str(ctx.config.get("records_root", "records")) / project
+        self.proj_root = proj_root
+        self.dir_kinds: Dict[Path, str] = {
+            proj_root / str(ctx.config.get("codex_requests_dirname", "requests")): "request",
+            proj_root / str(ctx.config.get("handover_dirname", "handover")): "handover",
+            proj_root / str(ctx.config.get("decisions_dirname", "decisions")): "decision",
+        }
+        self.plan_path: Optional[Path] = None
+        self.status_path: Optional[Path] = None
+        self.results: Dict[Path, Tuple[List[str], List[str]]] = {}
+
+    def _kind_of(self, path: Path) -> Optional[str]:
+        if path == self.status_path:
+            return "status"
+        if path == self.plan_path:
+            return "plan"
+        kind = self.dir_kinds.get(path.parent)
+        if kind is None or path.suffix != ".md":
+            return None
+        if kind == "request":
+            return kind if fnmatch.fnmatch(path.name, "codex_request_*.md") else None
+        return None if path.name.startswith("_TEMPLATE_") else kind
+
+    def _recheck(self, path: Path) -> None:
+        kind = self._kind_of(path)
+        if kind is None or not _is_file(path, self.ctx.records_mirror):
+            self.results.pop(path, None)
+            return
+        p, w, _ = self.cache.check(self.ctx, path, kind)
+        self.results[path] = (p, w)
+
+    def watch_dirs(self) -> List[Path]:
+        dirs = {self.proj_root, *self.dir_kinds}
+        for p in (self.plan_path, self.status_path):
+            if p is not None:
+                dirs.add(p.parent)
+        return sorted(dirs)
+
+    def initial(self) -> None:
+        report = _validate_project(self.ctx, self.project, self.cache)
+        self.plan_path, self.status_path = _resolve_plan_and_status(self.ctx, self.project)
+        paths = [p for p in (self.status_path, self.plan_path) if p]
+        for d, kind in self.dir_kinds.items():
+            if kind == "request":
+                paths.extend(_scan_codex_requests(d, self.ctx.records_mirror))
+            else:
+                paths.extend(_scan_record_files(d, self.ctx.records_mirror))
+        for p in paths:
+            self._recheck(p)
+        _print_validation_report(report)
+
+    def messages(self) -> set:
+        out = set()
+        if not self.plan_path:
+            out.add(("FAIL", "実装計画が見つかりません（config の candidates を確認）"))
+        if not self.status_path:
+            out.add(("FAIL", "status.md が見つかりません（config の candidates を確認）"))
+        if not any(self._kind_of(p) == "request" for p in self.results):
+            out.add(("WARN", "Codex依頼書（codex_request_*.md）がまだありません"))
+        for problems, warnings in self.results.values():
+            out.update(("FAIL", m) for m in problems)
+            out.update(("WARN", m) for m in warnings)
+        return out
+
+    def apply(self, changed: Iterable[Path]) -> Tuple[set, set, int]:
+        """変更ファイルを再検証し、(新規メッセージ, 解消メッセージ, 再検証数) を返す。"""
+        before = self.messages()
+        changed = set(changed)
+        if self.ctx.records_mirror is not None:
+            # 検知したファイルだけ元を確認してミラーに反映する（同期間隔を待たない）
+            self.ctx.records_mirror.refresh(changed)
+        names = " ".join(p.name.lower() for p in changed)
+        if "status" in names or "implementation_plan" in names:
+            if self.ctx.records_index is not None:
+                self.ctx.records_index.invalidate()
+            old = (self.plan_path, self.status_path)
+            self.plan_path, self.status_path = _resolve_plan_and_status(
+                self.ctx, self.project
+            )
+            for p in old:
+                if p is not None:
+                    self.results.pop(p, None)
+            changed.update(p for p in (self.plan_path, self.status_path) if p)
+        for p in changed:
+            self._recheck(p)
+        after = self.messages()
+        return after - before, before - after, len(changed)
 
-    return 1 if problems else 0
+
+def _watch_validate(ctx: RepoContext, args: argparse.Namespace, cache: ValidationCache) -> int:
+    project = _pick_project(ctx, args.project)
+    state = _ValidateWatch(ctx, project, cache)
+    state.initial()
+    cache.save()
+
+    watcher = _make_watcher(args.interval)
+    watched = set()
+
+    def _sync_watches() -> None:
+        for d in state.watch_dirs():
+            if d not in watched and d.is_dir() and watcher.add(d):
+                watched.add(d)
+
+    _sync_watches()
+    mode = "inotify" if isinstance(watcher, _InotifyWatcher) else f"polling {args.interval}s"
+    print(f"\n[WATCH] {project} ({mode}, Ctrl-C で終了)", flush=True)
+    try:
+        while True:
+            changed = watcher.poll(args.interval)
+            _sync_watches()  # 後から作られた handover/ 等も拾う
+            if not changed:
+                continue
+            t0 = time.perf_counter()
+            added, resolved, n = state.apply(changed)
+            cache.save()
+            ms = (time.perf_counter() - t0) * 1000
+            stamp = _dt.datetime.now().strftime("%H:%M:%S")
+            if not added and not resolved:
+                print(f"[{stamp}] rechecked {n} files, no change ({ms:.1f}ms)", flush=True)
+                continue
+            print(f"[{stamp}] rechecked {n} files ({ms:.1f}ms)")
+            for level, msg in sorted(added):
+                print(f"  + [{level}] {msg}")
+            for level, msg in sorted(resolved):
+                print(f"  - [{level}] {msg}  (resolved)")
+            sys.stdout.flush()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        cache.save()
+    return 1 if any(level == "FAIL" for level, _ in state.messages()) else 0
+
+
+@dataclass
+class ValidationResult:
+    reports: List[ValidationReport] = field(default_factory=list)
+
+    @property
+    def exit_code(self) -> int:
+        # プロジェクトが1つも無い場合も失敗扱い
+        return max((r.exit_code for r in self.reports), default=1)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"exit_code": self.exit_code, "projects": [r.to_dict() for r in self.reports]}
+
+
+def _load_validation_cache(ctx: RepoContext) -> ValidationCache:
+    return ValidationCache.load(
+        ctx.cursor_root / STATE_DIRNAME / "ops" / VALIDATE_CACHE_FILENAME,
+        _placeholder_scanner(ctx).signature,
+    )
+
+
+def validate_records(
+    ctx: RepoContext,
+    project: Optional[str] = None,
+    all_projects: bool = False,
+    full: bool = False,
+    links: bool = False,
+    jobs: Optional[int] = None,
+) -> ValidationResult:
+    """records の整合性チェック（all_projects=True なら records_root 配下を並列に）。"""
+    cache = _load_validation_cache(ctx)
+    stats = _StatCache(ctx.records_mirror) if links else None
+    if all_projects:
+        reports = _validate_all_projects(ctx, cache, full, jobs, stats)
+    else:
+        reports = [_validate_project(ctx, _pick_project(ctx, project), cache, full, stats)]
+    cache.save()
+    _flush_state(ctx)
+    return ValidationResult(reports=reports)
+
+
+def cmd_validate(ctx: RepoContext, args: argparse.Namespace) -> int:
+    as_json = bool(getattr(args, "json", False))
+    all_projects = bool(getattr(args, "all_projects", False))
+
+    if getattr(args, "watch", False):
+        if all_projects or as_json:
+            print("[ERR] --watch は --all-projects / --json と併用できません")
+            return 2
+        return _watch_validate(ctx, args, _load_validation_cache(ctx))
+
+    result = validate_records(
+        ctx,
+        args.project,
+        all_projects=all_projects,
+        full=bool(getattr(args, "full", False)),
+        links=bool(getattr(args, "links", False)),
+        jobs=getattr(args, "jobs", None),
+    )
+    reports = result.reports
+    rc = result.exit_code
+
+    # 出力
+    if as_json:
+        print(json.dumps(result.to_dict(), ensure_ascii=False, indent=2))
+        return rc
+    if not reports:
+        print("[FAIL] problems:")
+        print("  - records_root 配下にプロジェクトがありません")
+        return rc
+    if len(reports) == 1 and not all_projects:
+        _print_validation_report(reports[0])
+        return rc
+    for r in reports:
+        print(f"\n=== {r.project} ===")
+        _print_validation_report(r)
+    failed = [r.project for r in reports if r.exit_code]
+    print(
+        f"\n[SUMMARY] {len(reports)} projects, {len(failed)} failed"
+        + (f": {', '.join(failed)}" if failed else "")
+    )
+    return rc
 
 
 def cmd_uow(ctx: RepoContext, args: argparse.Namespace) -> int:
@@ -622,6 +3382,495 @@ def cmd_uow(ctx: RepoContext, args: argparse.Namespace) -> int:
     return 0
 
 
+def cmd_tasks(ctx: RepoContext, args: argparse.Namespace) -> int:
+    """plan / status のタスクモデルに対するフィルタ・ソート照会。"""
+    project = _pick_project(ctx, args.project)
+    model = _load_task_model(ctx, project)
+    plan_path, status_path = model.plan_path, model.status_path
+    tasks = model.query(
+        source=args.source,
+        state=args.state,
+        id_prefix=args.id,
+        section=args.section,
+        grep=args.grep,
+    )
+
+    if args.sort == "id":
+        tasks.sort(key=lambda t: (_task_sort_key(t.task_id), t.source, t.line))
+    elif args.sort == "state":
+        order = {"open": 0, "none": 1, "done": 2}
+        tasks.sort(key=lambda t: (order.get(t.state, 9), t.source, t.line))
+    elif args.sort == "section":
+        tasks.sort(key=lambda t: (t.section, t.source, t.line))
+    else:
+        tasks.sort(key=lambda t: (t.source, t.line))
+    if args.limit:
+        tasks = tasks[: args.limit]
+
+    if args.json:
+        print(
+            json.dumps(
+                {
+                    "project": project,
+                    "plan": _rel_display(ctx, plan_path) if plan_path else None,
+                    "status": _rel_display(ctx, status_path) if status_path else None,
+                    "tasks": [t.to_dict() for t in tasks],
+                },
+                ensure_ascii=False,
+                indent=2,
+            )
+        )
+        return 0
+
+    if not tasks:
+        print("[SKIP] 条件に合うタスクがありません")
+        return 0
+    w_id = max(len("TASK"), *(len(t.task_id) for t in tasks))
+    w_sec = min(30, max(len("SECTION"), *(len(t.section) for t in tasks)))
+    print(f"{'TASK':<{w_id}}  STATE  SOURCE  LINE   {'SECTION':<{w_sec}}  TITLE")
+    for t in tasks:
+        print(
+            f"{t.task_id:<{w_id}}  {t.state:<5}  {t.source:<6}  {t.line:<5}  "
+            f"{t.section[:w_sec]:<{w_sec}}  {t.title}"
+        )
+    return 0
+
+
+def cmd_next(ctx: RepoContext, args: argparse.Namespace) -> int:
+    """依存グラフから、並行して着手できるタスクを選ぶ。"""
+    res = next_tasks(ctx, args.project, parallel=args.parallel)
+    if args.json:
+        print(json.dumps(res.to_dict(), ensure_ascii=False, indent=2))
+        return 0 if res.ready else 1
+
+    if res.ready:
+        w_id = max(len("TASK"), *(len(n.task_id) for n in res.ready))
+        print(f"{'#':>2}  {'TASK':<{w_id}}  TITLE")
+        for i, n in enumerate(res.ready, 1):
+            print(f"{i:>2}  {n.task_id:<{w_id}}  {n.title}")
+        print(
+            f"\n[OK] {len(res.ready)} of {res.ready_total} ready "
+            f"(open {res.open_total}, done {res.done_total})"
+        )
+    else:
+        print(
+            f"[SKIP] 着手可能なタスクがありません (open {res.open_total}, done {res.done_total})"
+        )
+    if res.cyclic:
+        print(f"[WARN] 循環依存のため着手できません: {', '.join(res.cyclic)}")
+    for tid, missing in res.unknown.items():
+        print(f"[WARN] 不明な依存先: {tid} → {', '.join(missing)}")
+    return 0 if res.ready else 1
+
+
+# -------------------------
+# Search (ops.py search)
+# -------------------------
+
+SEARCH_INDEX_FILENAME = "search_index.json"
+SEARCH_INDEX_VERSION = 1
+# BM25 のパラメータ
+_BM25_K1 = 1.2
+_BM25_B = 0.75
+# 英数字の語 / かな・漢字の連続（2-gram に分割する）
+_SEARCH_WORD_RE = r"[0-9A-Za-z_]+"
+_SEARCH_CJK_RE = r"[぀-ヿ㐀-鿿豈-﫿ｦ-ﾟ]+"
+_QUERY_CHUNK_RE = re.compile(r'"([^"]+)"|(\S+)')
+
+
+@lru_cache(maxsize=8)
+def _compile_tokenizer(task_patterns: Tuple[str, ...]) -> re.Pattern:
+    # Task ID は分割せず1トークンにする（WP1.2 を wp1 / 2 にしない）
+    alts = [f"(?P<tid>{'|'.join(task_patterns)})"] if task_patterns else []
+    alts += [f"(?P<word>{_SEARCH_WORD_RE})", f"(?P<cjk>{_SEARCH_CJK_RE})"]
+    # 小文字で書かれた Task ID（wp1.2）も同じトークンにする
+    return re.compile("|".join(alts), re.IGNORECASE)
+
+
+def _tokenize(text: str, tokenizer: re.Pattern) -> List[str]:
+    """小文字化した語の列。かな・漢字は重なりありの 2-gram（1文字だけならそのまま）。"""
+    out: List[str] = []
+    for m in tokenizer.finditer(text):
+        if m.lastgroup == "cjk":
+            run = m.group()
+            if len(run) == 1:
+                out.append(run)
+            else:
+                out.extend(run[i : i + 2] for i in range(len(run) - 1))
+        else:
+            out.append(m.group().lower())
+    return out
+
+
+class SearchIndex:
+    """
+    records の転置インデックス（.cursor/.hook_state/ops/search_index.json）。
+    文書ごとに (size, mtime_ns) を持ち、refresh では変わったファイルだけ読み直す。
+    語の出現位置も持つのでフレーズ検索はファイルを読まずに判定できる。
+    位置はカンマ区切りの文字列で持ち（読み込みを軽くするため）、フレーズ判定時だけ展開する。
+    """
+
+    def __init__(self, path: Optional[Path] = None, signature: str = "") -> None:
+        self.path = path
+        # Task ID パターン（トークン化の規則）が変わったら作り直す
+        self.signature = signature
+        # rel -> {"project", "kind", "size", "mtime_ns", "title", "len", "terms": {term: "p,p,..."}}
+        self.docs: Dict[str, Dict[str, Any]] = {}
+        # term -> {rel: "p,p,..."}
+        self.postings: Dict[str, Dict[str, str]] = {}
+        self._dirty = False
+
+    @classmethod
+    def load(cls, path: Path, signature: str = "") -> "SearchIndex":
+        index = cls(path, signature)
+        data = _load_json(path)
+        if (
+            data
+            and data.get("version") == SEARCH_INDEX_VERSION
+            and data.get("signature") == signature
+            and isinstance(data.get("docs"), dict)
+        ):
+            for rel, doc in data["docs"].items():
+                index._add(rel, doc)
+        return index
+
+    def save(self) -> None:
+        if not self._dirty or self.path is None:
+            return
+        payload = {
+            "version": SEARCH_INDEX_VERSION,
+            "signature": self.signature,
+            "docs": self.docs,
+        }
+        if _save_json_state(self.path, payload):
+            self._dirty = False
+
+    def _add(self, rel: str, doc: Dict[str, Any]) -> None:
+        self.docs[rel] = doc
+        for term, pos in doc["terms"].items():
+            self.postings.setdefault(term, {})[rel] = pos
+
+    def _remove(self, rel: str) -> None:
+        doc = self.docs.pop(rel, None)
+        if doc is None:
+            return
+        for term in doc["terms"]:
+            plist = self.postings.get(term)
+            if plist is not None:
+                plist.pop(rel, None)
+                if not plist:
+                    del self.postings[term]
+
+    def refresh(
+        self,
+        ctx: RepoContext,
+        sources: List[Tuple[Path, str, str]],
+        tokenizer: re.Pattern,
+    ) -> int:
+        """sources: (path, project, kind)。読み直した文書数を返す。"""
+        seen = set()
+        updated = 0
+        for path, project, kind in sources:
+            rel = _rel_display(ctx, path)
+            seen.add(rel)
+            try:
+                st = _stat(path, ctx.records_mirror)
+            except OSError:
+                continue
+            doc = self.docs.get(rel)
+            if (
+                doc is not None
+                and doc["size"] == st.st_size
+                and doc["mtime_ns"] == st.st_mtime_ns
+                and doc["kind"] == kind
+            ):
+                continue
+            try:
+                text = _read_text(path, ctx.records_mirror)
+            except (OSError, UnicodeDecodeError):
+                continue
+            terms: Dict[str, List[int]] = {}
+            tokens = _tokenize(text, tokenizer)
+            for i, tok in enumerate(tokens):
+                terms.setdefault(tok, []).append(i)
+            mtime_ns = st.st_mtime_ns
+            if time.time() - st.st_mtime < _INDEX_MTIME_SLACK_SEC:
+                mtime_ns = -1
+            self._remove(rel)
+            self._add(
+                rel,
+                {
+                    "project": project,
+                    "kind": kind,
+                    "size": st.st_size,
+                    "mtime_ns": mtime_ns,
+                    "title": _first_heading(text),
+                    "len": len(tokens),
+                    "terms": {t: ",".join(map(str, pos)) for t, pos in terms.items()},
+                },
+            )
+            updated += 1
+            self._dirty = True
+        for rel in [r for r in self.docs if r not in seen]:
+            self._remove(rel)
+            self._dirty = True
+        return updated
+
+    def _match(self, tokens: List[str], prefix: bool) -> Dict[str, int]:
+        """クエリ1要素（語 / 前方一致 / フレーズ）に一致する文書と出現回数。"""
+        if prefix:
+            out: Dict[str, int] = {}
+            for term, plist in self.postings.items():
+                if term.startswith(tokens[0]):
+                    for rel, pos in plist.items():
+                        out[rel] = out.get(rel, 0) + pos.count(",") + 1
+            return out
+        if len(tokens) == 1:
+            return {
+                rel: pos.count(",") + 1
+                for rel, pos in self.postings.get(tokens[0], {}).items()
+            }
+        plists = [self.postings.get(t) for t in tokens]
+        if not all(plists):
+            return {}
+        rels = set(plists[0])
+        for plist in plists[1:]:
+            rels &= set(plist)
+        out = {}
+        for rel in rels:
+            # フレーズ先頭の位置 = 各語の位置 - 語順
+            starts = set(map(int, plists[0][rel].split(",")))
+            for i, plist in enumerate(plists[1:], 1):
+                starts &= {int(p) - i for p in plist[rel].split(",")}
+                if not starts:
+                    break
+            if starts:
+                out[rel] = len(starts)
+        return out
+
+    def query(
+        self,
+        chunks: List[Tuple[List[str], bool]],
+        tokenizer: re.Pattern,
+        projects: Optional[set] = None,
+        kinds: Optional[set] = None,
+    ) -> List[Tuple[float, str, int]]:
+        """
+        全要素を含む文書を BM25 の降順で返す: [(score, rel, 出現回数)]。
+        タイトル（最初の見出し）に現れる要素はもう1回分加点する。
+        """
+        docs = {
+            rel: d
+            for rel, d in self.docs.items()
+            if (projects is None or d["project"] in projects)
+            and (kinds is None or d["kind"] in kinds)
+        }
+        if not docs or not chunks:
+            return []
+        n_docs = len(docs)
+        avg_len = sum(d["len"] for d in docs.values()) / n_docs or 1.0
+        scores: Optional[Dict[str, float]] = None
+        counts: Dict[str, int] = {}
+        for tokens, prefix in chunks:
+            matched = {r: tf for r, tf in self._match(tokens, prefix).items() if r in docs}
+            if not matched:
+                return []
+            idf = math.log(1.0 + (n_docs - len(matched) + 0.5) / (len(matched) + 0.5))
+            # フレーズは語数ぶん重みを上げる（単語の偶然の並びより具体的）
+            weight = idf * len(tokens)
+            part: Dict[str, float] = {}
+            for rel, tf in matched.items():
+                norm = 1 - _BM25_B + _BM25_B * docs[rel]["len"] / avg_len
+                part[rel] = weight * tf * (_BM25_K1 + 1) / (tf + _BM25_K1 * norm)
+                counts[rel] = counts.get(rel, 0) + tf
+                if _contains_tokens(_tokenize(docs[rel].get("title", ""), tokenizer), tokens, prefix):
+                    part[rel] += weight
+            if scores is None:
+                scores = part
+            else:
+                scores = {r: v + part[r] for r, v in scores.items() if r in part}
+            if not scores:
+                return []
+        assert scores is not None
+        return sorted(
+            ((v, r, counts[r]) for r, v in scores.items()), key=lambda x: (-x[0], x[1])
+        )
+
+
+def _contains_tokens(haystack: List[str], tokens: List[str], prefix: bool) -> bool:
+    if prefix:
+        return any(t.startswith(tokens[0]) for t in haystack)
+    n = len(tokens)
+    return any(haystack[i : i + n] == tokens for i in range(len(haystack) - n + 1))
+
+
+def _parse_query(query: str, tokenizer: re.Pattern) -> List[Tuple[List[str], bool]]:
+    """
+    空白区切りの各要素を AND。"..." はフレーズ、末尾 * は前方一致。
+    区切りなしの日本語（2-gram が複数になる語）や foo.py のような語も自動でフレーズ扱い。
+    """
+    chunks: List[Tuple[List[str], bool]] = []
+    for m in _QUERY_CHUNK_RE.finditer(query):
+        raw = m.group(1) or m.group(2)
+        prefix = m.group(2) is not None and raw.endswith("*")
+        tokens = _tokenize(raw.rstrip("*") if prefix else raw, tokenizer)
+        if not tokens:
+            continue
+        # 前方一致は1語のときだけ（複数語なら最後の語以外を含むフレーズとして扱う）
+        chunks.append((tokens, prefix and len(tokens) == 1))
+    return chunks
+
+
+def _snippet(
+    ctx: RepoContext, path: Path, query: str, tokenizer: re.Pattern
+) -> Tuple[int, str]:
+    """最初に一致した行 (行番号, 行)。ヒット表示用なので上位の結果だけ読む。"""
+    try:
+        text = _read_text(path, ctx.records_mirror)
+    except (OSError, UnicodeDecodeError):
+        return 0, ""
+    needles = [
+        (m.group(1) or m.group(2)).rstrip("*").lower() for m in _QUERY_CHUNK_RE.finditer(query)
+    ]
+    wanted = [_tokenize(n, tokenizer) for n in needles]
+    for no, line in enumerate(text.splitlines(), 1):
+        low = line.lower()
+        if any(n and n in low for n in needles):
+            return no, line.strip()
+        toks = _tokenize(line, tokenizer)
+        if any(w and all(t in toks for t in w) for w in wanted):
+            return no, line.strip()
+    return 0, ""
+
+
+@dataclass
+class SearchHit:
+    project: str
+    kind: str
+    path: Path
+    title: str
+    score: float
+    matches: int
+    line: int = 0
+    snippet: str = ""
+
+    def to_dict(self, repo_root: Optional[Path] = None) -> Dict[str, Any]:
+        return {
+            "project": self.project,
+            "kind": self.kind,
+            "path": _rel_path(self.path, repo_root),
+            "title": self.title,
+            "score": round(self.score, 4),
+            "matches": self.matches,
+            "line": self.line,
+            "snippet": self.snippet,
+        }
+
+
+@dataclass
+class SearchResult:
+    query: str
+    hits: List[SearchHit] = field(default_factory=list)
+    total: int = 0
+    indexed: int = 0
+    updated: int = 0
+
+    def to_dict(self, repo_root: Optional[Path] = None) -> Dict[str, Any]:
+        return {
+            "query": self.query,
+            "total": self.total,
+            "indexed": self.indexed,
+            "updated": self.updated,
+            "hits": [h.to_dict(repo_root) for h in self.hits],
+        }
+
+
+def search_records(
+    ctx: RepoContext,
+    query: str,
+    project: Optional[str] = None,
+    all_projects: bool = False,
+    kinds: Optional[Iterable[str]] = None,
+    limit: int = 20,
+) -> SearchResult:
+    """
+    requests / handover / decisions / plan / status の全文検索。
+    インデックスは全プロジェクト分を持ち、呼ぶたびに変更ファイルだけ更新する。
+    """
+    patterns = tuple(str(p) for p in ctx.config.get("task_id_patterns", []))
+    tokenizer = _compile_tokenizer(patterns)
+    index = SearchIndex.load(
+        ctx.cursor_root / STATE_DIRNAME / "ops" / SEARCH_INDEX_FILENAME,
+        hashlib.sha1("\0".join(patterns).encode("utf-8")).hexdigest(),
+    )
+
+    records_root = ctx.repo_root / str(ctx.config.get("records_root", "records"))
+    sources: List[Tuple[Path, str, str]] = []
+    seen_paths = set()
+    for pj in _detect_projects(records_root, ctx.records_mirror):
+        plan_path, status_path = _resolve_plan_and_status(ctx, pj)
+        for path, kind in _record_targets(ctx, pj, plan_path, status_path):
+            # plan / status の候補 glob が他プロジェクトのファイルを拾った場合の重複を除く
+            if path not in seen_paths:
+                seen_paths.add(path)
+                sources.append((path, pj, kind))
+    result = SearchResult(query=query)
+    result.updated = index.refresh(ctx, sources, tokenizer)
+    result.indexed = len(index.docs)
+    index.save()
+    _flush_state(ctx)
+
+    projects = None if all_projects else {_pick_project(ctx, project)}
+    ranked = index.query(
+        _parse_query(query, tokenizer), tokenizer, projects, set(kinds) if kinds else None
+    )
+    result.total = len(ranked)
+    for score, rel, count in ranked[: max(0, limit)] if limit else ranked:
+        doc = index.docs[rel]
+        path = ctx.repo_root / rel
+        line, snippet = _snippet(ctx, path, query, tokenizer)
+        result.hits.append(
+            SearchHit(
+                project=doc["project"],
+                kind=doc["kind"],
+                path=path,
+                title=doc.get("title", ""),
+                score=score,
+                matches=count,
+                line=line,
+                snippet=snippet,
+            )
+        )
+    return result
+
+
+def cmd_search(ctx: RepoContext, args: argparse.Namespace) -> int:
+    query = " ".join(args.query)
+    kinds = [k.strip() for k in args.kind.split(",") if k.strip()] if args.kind else None
+    res = search_records(
+        ctx,
+        query,
+        args.project,
+        all_projects=args.all_projects,
+        kinds=kinds,
+        limit=args.limit,
+    )
+    if args.json:
+        print(json.dumps(res.to_dict(ctx.repo_root), ensure_ascii=False, indent=2))
+        return 0 if res.hits else 1
+    if not res.hits:
+        print(f"[SKIP] 一致なし: {query}  (indexed {res.indexed} files)")
+        return 1
+    for h in res.hits:
+        loc = _rel_path(h.path, ctx.repo_root) + (f":{h.line}" if h.line else "")
+        print(f"{h.score:6.2f}  {h.kind:<8}  {loc}  {h.title}")
+        if h.snippet:
+            print(f"        {h.snippet[:160]}")
+    more = f" (showing {len(res.hits)})" if res.total > len(res.hits) else ""
+    print(f"\n[OK] {res.total} hits{more}  (indexed {res.indexed} files, {res.updated} updated)")
+    return 0
+
+
 def build_parser() -> argparse.ArgumentParser:
     p = argparse.ArgumentParser(
         prog="ops.py", description="Cursor運用テンプレ用の補助スクリプト"
@@ -637,6 +3886,7 @@ def build_parser() -> argparse.ArgumentParser:
     # init
     sp_init = sub.add_parser("init", help="records テンプレを作成（初期化）")
     add_common(sp_init)
+    sp_init.add_argument("--json", action="store_true", help="結果を JSON で出力")
 
     # codex-request
     sp_req = sub.add_parser("codex-request", help="Codex依頼書を生成")
@@ -658,14 +3908,51 @@ def build_parser() -> argparse.ArgumentParser:
     sp_req.add_argument("--tasks", help="実装タスク（箇条書き文字列）")
     sp_req.add_argument("--dod", help="DoD（チェックリスト文字列）")
     sp_req.add_argument("--tests", help="テスト方針（箇条書き文字列）")
+    sp_req.add_argument(
+        "--all-open",
+        dest="all_open",
+        action="store_true",
+        help="status.md の未チェック項目すべての依頼書をまとめて生成（既存はスキップ）",
+    )
+    sp_req.add_argument("--json", action="store_true", help="結果を JSON で出力")
 
     # validate
     sp_val = sub.add_parser("validate", help="records の整合性チェック")
     add_common(sp_val)
+    sp_val.add_argument(
+        "--full", action="store_true", help="検証キャッシュを使わず全ファイルを読み直す"
+    )
+    sp_val.add_argument(
+        "--all-projects",
+        dest="all_projects",
+        action="store_true",
+        help="records_root 配下の全プロジェクトを並列に検証",
+    )
+    sp_val.add_argument(
+        "--jobs", type=int, help="--all-projects の並列数（省略時は CPU 数×2）"
+    )
+    sp_val.add_argument("--json", action="store_true", help="結果を JSON で出力")
+    sp_val.add_argument(
+        "--links",
+        action="store_true",
+        help="@参照リンクのリンク切れ / 孤立ファイルも検査",
+    )
+    sp_val.add_argument(
+        "--watch",
+        action="store_true",
+        help="常駐して変更ファイルだけ再検証し、差分（新規/解消）を表示",
+    )
+    sp_val.add_argument(
+        "--interval",
+        type=float,
+        default=1.0,
+        help="--watch のポーリング間隔（秒、inotify 非対応環境向け）",
+    )
 
     # handover
     sp_ho = sub.add_parser("handover", help="handover テンプレを生成")
     add_common(sp_ho)
+    sp_ho.add_argument("--json", action="store_true", help="結果を JSON で出力")
 
     # uow
     sp_uow = sub.add_parser("uow", help="UoW: 依頼書+handover+validate をまとめて実行")
@@ -690,14 +3977,103 @@ def build_parser() -> argparse.ArgumentParser:
     sp_uow.add_argument("--dod", help="DoD（チェックリスト文字列）")
     sp_uow.add_argument("--tests", help="テスト方針（箇条書き文字列）")
 
+    # tasks
+    sp_tasks = sub.add_parser("tasks", help="plan / status のタスク一覧を照会")
+    add_common(sp_tasks)
+    sp_tasks.add_argument(
+        "--source", choices=["all", "plan", "status"], default="all", help="対象ファイル"
+    )
+    sp_tasks.add_argument(
+        "--state",
+        choices=["any", "open", "done", "none"],
+        default="any",
+        help="チェックボックス状態（none=見出し等）",
+    )
+    sp_tasks.add_argument("--id", help="Task ID の前方一致（例: WP1.）")
+    sp_tasks.add_argument("--section", help="見出しの部分一致")
+    sp_tasks.add_argument("--grep", help="タイトル / ID の部分一致")
+    sp_tasks.add_argument(
+        "--sort",
+        choices=["line", "id", "state", "section"],
+        default="line",
+        help="並び順（既定: ファイル内の出現順）",
+    )
+    sp_tasks.add_argument("--limit", type=int, help="最大件数")
+    sp_tasks.add_argument("--json", action="store_true", help="結果を JSON で出力")
+
+    # next
+    sp_next = sub.add_parser(
+        "next", help="依存グラフから並行して着手できるタスクを選ぶ"
+    )
+    sp_next.add_argument(
+        "--project", help="records 配下のプロジェクト名（省略時は自動/設定）"
+    )
+    sp_next.add_argument(
+        "--parallel", type=int, default=1, help="同時に着手するタスク数（互いに独立なものだけ）"
+    )
+    sp_next.add_argument("--json", action="store_true", help="結果を JSON で出力")
+
+    # archive
+    sp_arc = sub.add_parser(
+        "archive", help="古い handover / 依頼書 / decision を月別 zip に退避（ID で参照可）"
+    )
+    sp_arc.add_argument(
+        "--project", help="records 配下のプロジェクト名（省略時は自動/設定）"
+    )
+    sp_arc.add_argument(
+        "--days", type=int, help="この日数より古いファイルを対象（既定: config の archive_after_days）"
+    )
+    sp_arc.add_argument(
+        "--dry-run", dest="dry_run", action="store_true", help="対象の一覧だけ表示"
+    )
+    sp_arc.add_argument("--find", help="アーカイブ索引を ID / パス / タイトルで検索")
+    sp_arc.add_argument("--show", help="アーカイブ済みファイルの内容を表示（ID またはパス）")
+    sp_arc.add_argument("--json", action="store_true", help="結果を JSON で出力")
+
+    # search
+    sp_search = sub.add_parser(
+        "search", help="records の全文検索（Task ID / \"フレーズ\" / 前方一致*）"
+    )
+    sp_search.add_argument("query", nargs="+", help="検索語（空白区切りは AND）")
+    sp_search.add_argument(
+        "--project", help="records 配下のプロジェクト名（省略時は自動/設定）"
+    )
+    sp_search.add_argument(
+        "--all-projects", dest="all_projects", action="store_true", help="全プロジェクトを検索"
+    )
+    sp_search.add_argument(
+        "--kind", help="対象の種類（カンマ区切り: request,handover,decision,plan,status）"
+    )
+    sp_search.add_argument("--limit", type=int, default=20, help="最大件数（0 = 全件）")
+    sp_search.add_argument("--json", action="store_true", help="結果を JSON で出力")
+
+    # serve
+    sp_serve = sub.add_parser(
+        "serve", help="常駐して Unix ソケットでコマンドを受け付ける（validate/tasks 等を高速化）"
+    )
+    sp_serve.add_argument("--socket", help="ソケットパス（省略時は .cursor/.hook_state/ops/ops.sock）")
+    sp_serve.add_argument(
+        "--idle-timeout",
+        dest="idle_timeout",
+        type=float,
+        default=0,
+        help="この秒数リクエストが無ければ終了（0 = 無期限）",
+    )
+    sp_serve.add_argument("--stop", action="store_true", help="起動中の daemon を止める")
+    sp_serve.add_argument("--status", action="store_true", help="daemon の生存確認")
+
     return p
 
 
-def main() -> int:
-    ctx = get_repo_context()
-    parser = build_parser()
-    args = parser.parse_args()
+def _dispatch(ctx: RepoContext, args: argparse.Namespace) -> int:
+    try:
+        return _dispatch_cmd(ctx, args)
+    finally:
+        if ctx.records_mirror is not None:
+            ctx.records_mirror.save()
 
+
+def _dispatch_cmd(ctx: RepoContext, args: argparse.Namespace) -> int:
     if args.cmd == "init":
         return cmd_init(ctx, args)
     if args.cmd == "codex-request":
@@ -709,10 +4085,241 @@ def main() -> int:
         return cmd_handover(ctx, args)
     if args.cmd == "uow":
         return cmd_uow(ctx, args)
+    if args.cmd == "tasks":
+        return cmd_tasks(ctx, args)
+    if args.cmd == "archive":
+        return cmd_archive(ctx, args)
+    if args.cmd == "search":
+        return cmd_search(ctx, args)
+    if args.cmd == "next":
+        return cmd_next(ctx, args)
+    if args.cmd == "serve":
+        return cmd_serve(ctx, args)
 
     print(f"[ERR] unknown cmd: {args.cmd}")
     return 2
 
 
+# -------------------------
+# Daemon (ops.py serve)
+# -------------------------
+
+DAEMON_SOCKET_FILENAME = "ops.sock"
+# serve 経由で実行できるサブコマンド
+DAEMON_COMMANDS = {"validate", "codex-request", "handover", "uow", "tasks", "search", "next"}
+# 環境変数でクライアント側の daemon 利用を無効化できる
+DAEMON_DISABLE_ENV = "OPS_NO_DAEMON"
+_DAEMON_CONNECT_TIMEOUT_SEC = 0.2
+# AF_UNIX のパス長上限（OS により 104〜108 バイト）に余裕を持たせる
+_UNIX_PATH_MAX = 100
+
+
+def _daemon_socket_path(repo_root: Path) -> Path:
+    path = repo_root / ".cursor" / STATE_DIRNAME / "ops" / DAEMON_SOCKET_FILENAME
+    if len(str(path).encode("utf-8")) <= _UNIX_PATH_MAX:
+        return path
+    digest = hashlib.sha1(str(repo_root).encode("utf-8")).hexdigest()[:12]
+    return Path(tempfile.gettempdir()) / f"ops-{digest}.sock"
+
+
+def _daemon_request(
+    sock_path: Path, payload: Dict[str, Any], timeout: Optional[float] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    daemon に1リクエスト送って応答を返す。接続できなければ None（呼び出し側でフォールバック）。
+    接続後の失敗は daemon 側で処理が進んでいる可能性があるため、例外のまま返す。
+    """
+    if not hasattr(socket, "AF_UNIX") or not sock_path.exists():
+        return None
+    conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        conn.settimeout(_DAEMON_CONNECT_TIMEOUT_SEC)
+        try:
+            conn.connect(str(sock_path))
+        except OSError:
+            return None
+        conn.settimeout(timeout)
+        conn.sendall((json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8"))
+        with conn.makefile("rb") as f:
+            line = f.readline()
+        if not line:
+            raise ConnectionError("daemon closed the connection without a response")
+        return json.loads(line.decode("utf-8"))
+    finally:
+        conn.close()
+
+
+class _DaemonState:
+    """serve プロセス内で温めておく状態（RepoContext と records インデックス）。"""
+
+    def __init__(self, ctx: RepoContext) -> None:
+        self.ctx = ctx
+        self.stop = False
+        self._config_mtime = self._stat_config()
+
+    def _stat_config(self) -> Optional[int]:
+        try:
+            return self.ctx.config_path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _refresh(self) -> None:
+        # ops_config.json が更新されていれば読み直す（インデックス / ミラーは引き継ぐ）
+        mtime = self._stat_config()
+        if mtime != self._config_mtime:
+            fresh = get_repo_context(self.ctx.repo_root)
+            index = self.ctx.records_index if fresh.records_index is not None else None
+            mirror = fresh.records_mirror
+            old = self.ctx.records_mirror
+            if mirror is not None and old is not None and (
+                (old.source, old.local, old.alias) == (mirror.source, mirror.local, mirror.alias)
+            ):
+                old.sync_interval = mirror.sync_interval
+                mirror = old
+            self.ctx = replace(fresh, records_index=index, records_mirror=mirror)
+            self._config_mtime = mtime
+        if self.ctx.records_index is not None:
+            # ディレクトリ mtime の再確認だけ行う（glob の全走査はしない）
+            self.ctx.records_index.invalidate()
+
+    def execute(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        op = req.get("op", "run")
+        if op == "ping":
+            return {"rc": 0, "stdout": f"pong {os.getpid()}\n"}
+        if op == "shutdown":
+            self.stop = True
+            return {"rc": 0, "stdout": "[OK] daemon stopping\n"}
+
+        argv = [str(a) for a in req.get("argv", [])]
+        buf = StringIO()
+        rc = 1
+        with contextlib.redirect_stdout(buf), contextlib.redirect_stderr(buf):
+            try:
+                args = build_parser().parse_args(argv)
+                if args.cmd not in DAEMON_COMMANDS or getattr(args, "watch", False):
+                    print(f"[ERR] not served by daemon: {' '.join(argv)}")
+                    rc = 2
+                else:
+                    self._refresh()
+                    rc = _dispatch(self.ctx, args)
+            except SystemExit as e:
+                rc = e.code if isinstance(e.code, int) else 2
+            except Exception:
+                traceback.print_exc()
+                rc = 1
+        return {"rc": rc, "stdout": buf.getvalue()}
+
+
+class _DaemonHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        try:
+            req = json.loads(self.rfile.readline().decode("utf-8") or "{}")
+        except ValueError:
+            req = {"op": "invalid"}
+        if req.get("op") == "invalid":
+            resp: Dict[str, Any] = {"rc": 2, "stdout": "[ERR] invalid request\n"}
+        else:
+            resp = self.server.ops_state.execute(req)  # type: ignore[attr-defined]
+        self.wfile.write((json.dumps(resp, ensure_ascii=False) + "\n").encode("utf-8"))
+
+
+class _DaemonServer(socketserver.UnixStreamServer):
+    def __init__(self, path: str, state: _DaemonState) -> None:
+        super().__init__(path, _DaemonHandler)
+        self.ops_state = state
+        self.timed_out = False
+
+    def handle_timeout(self) -> None:
+        self.timed_out = True
+
+
+def cmd_serve(ctx: RepoContext, args: argparse.Namespace) -> int:
+    """
+    RepoContext と records インデックスを温めたまま、Unix ソケットでサブコマンドを受け付ける。
+    リクエストは1件ずつ順に処理する（stdout を差し替えて出力を返すため）。
+    """
+    sock_path = Path(args.socket) if args.socket else _daemon_socket_path(ctx.repo_root)
+
+    if args.stop or args.status:
+        try:
+            resp = _daemon_request(
+                sock_path, {"op": "shutdown" if args.stop else "ping"}, timeout=5
+            )
+        except (OSError, ValueError) as e:
+            print(f"[ERR] daemon error: {e}")
+            return 1
+        if resp is None:
+            print(f"[SKIP] daemon is not running ({sock_path})")
+            return 1 if args.status else 0
+        print(resp.get("stdout", ""), end="")
+        return int(resp.get("rc", 0))
+
+    if not hasattr(socket, "AF_UNIX"):
+        print("[ERR] この環境では Unix ソケットが使えません（serve 非対応）")
+        return 2
+    if sock_path.exists():
+        if _daemon_request(sock_path, {"op": "ping"}, timeout=5) is not None:
+            print(f"[SKIP] daemon already running ({sock_path})")
+            return 0
+        sock_path.unlink()  # 前回の残骸
+    sock_path.parent.mkdir(parents=True, exist_ok=True)
+
+    state = _DaemonState(ctx)
+    # bind の時点で 0600 にする（後から chmod すると、その間に他ユーザーが接続できる）
+    old_umask = os.umask(0o177)
+    try:
+        server = _DaemonServer(str(sock_path), state)
+    finally:
+        os.umask(old_umask)
+    server.timeout = args.idle_timeout or None
+    print(f"[OK] serving on {sock_path} (pid {os.getpid()})", flush=True)
+    try:
+        while not state.stop:
+            server.handle_request()
+            if server.timed_out:
+                print("[OK] idle timeout, stopping", flush=True)
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        with contextlib.suppress(OSError):
+            sock_path.unlink()
+    return 0
+
+
+def _try_daemon(argv: List[str]) -> Optional[int]:
+    """daemon が動いていればそちらで実行し rc を返す。動いていなければ None。"""
+    if os.environ.get(DAEMON_DISABLE_ENV):
+        return None
+    repo_root = _find_repo_root(Path.cwd())
+    try:
+        resp = _daemon_request(
+            _daemon_socket_path(repo_root), {"op": "run", "argv": argv}
+        )
+    except (OSError, ValueError) as e:
+        print(f"[ERR] daemon error: {e}")
+        return 1
+    if resp is None:
+        return None
+    print(resp.get("stdout", ""), end="")
+    return int(resp.get("rc", 1))
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+
+    # daemon が動いていれば引数の解釈ごと任せる（クライアント側は最小限の処理だけ）
+    if argv and argv[0] in DAEMON_COMMANDS and not {"-h", "--help", "--watch"} & set(argv):
+        rc = _try_daemon(argv)
+        if rc is not None:
+            return rc
+
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    ctx = get_repo_context()
+    return _dispatch(ctx, args)
+
+
 if __name__ == "__main__":
     raise SystemExit(main())